@@ -0,0 +1,118 @@
+"""Compare per-image background loading with the shared background cache
+
+Usage:
+    python benchmark_backgrounds.py [--size 3000x2000] [--images N] [--repeat R]
+
+Composites a batch of cutouts over one background image twice: the
+previous way, which opens the file and stretches it for every image, and
+through BackgroundCache, which decodes and resizes it once for the batch.
+A mixed-size batch, as auto-crop produces, decodes the background once
+and only resizes it for each new size.
+A second table times the previous float64 gradient against
+ImageOperations.gradient_array().
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from bgremover.app.core.backgrounds import BackgroundCache
+from bgremover.app.core.image_ops import ImageOperations
+from bgremover.app.core.postprocess import PostProcessor
+
+
+def cutout(width, height):
+    """A noisy RGBA buffer with a soft-edged opaque block"""
+    rng = np.random.default_rng(0)
+    buffer = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+    buffer[:, :, 3] = 0
+    buffer[height // 4:-height // 4, width // 4:-width // 4, 3] = 255
+    buffer[height // 4 - 8:height // 4, width // 4:-width // 4, 3] = 128
+    return buffer
+
+
+def previous_gradient(size, color1, color2):
+    """The previous vertical gradient: three float64 planes"""
+    width, height = size
+    gradient = np.repeat(np.linspace(0, 1, height).reshape(-1, 1), width, axis=1)
+    channels = [(color1[i] * (1 - gradient) + color2[i] * gradient).astype(np.uint8) for i in range(3)]
+    return np.stack(channels, axis=2)
+
+
+def timed(func, repeat):
+    """Best wall time of repeat runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Background cache benchmark")
+    parser.add_argument("--size", default="3000x2000", help="Image size WIDTHxHEIGHT (default: 3000x2000)")
+    parser.add_argument("--images", type=int, default=8, help="Images in the batch (default: 8)")
+    parser.add_argument("--repeat", type=int, default=2, help="Runs per measurement (default: 2)")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    template = cutout(width, height)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        background_path = Path(tmp) / "background.jpg"
+        rng = np.random.default_rng(1)
+        Image.fromarray(rng.integers(0, 256, (3000, 4000, 3), dtype=np.uint8)).save(background_path, quality=90)
+
+        def per_image():
+            for _ in range(args.images):
+                buffer = template.copy()
+                with Image.open(background_path) as background:
+                    PostProcessor.blend_image(buffer, background)
+
+        def cached():
+            cache = BackgroundCache()
+            for _ in range(args.images):
+                buffer = template.copy()
+                PostProcessor.blend_image(buffer, cache.image(background_path, (width, height)))
+
+        def mixed():
+            cache = BackgroundCache()
+            for i in range(args.images):
+                # Each image cropped to a slightly different size
+                size = (width - 16 * i, height - 12 * i)
+                buffer = template[:size[1], :size[0]].copy()
+                PostProcessor.blend_image(buffer, cache.image(background_path, size))
+            return cache
+
+        per_image_time = timed(per_image, args.repeat)
+        cached_time = timed(cached, args.repeat)
+        mixed_time = timed(mixed, args.repeat)
+        decodes = mixed().decodes
+
+    print(f"Batch: {args.images} images of {width}x{height}, 4000x3000 JPEG background")
+    print("=" * 52)
+    print(f"{'per image (s)':>14} {'cached (s)':>12} {'speedup':>9}")
+    print(f"{per_image_time:14.3f} {cached_time:12.3f} {per_image_time / cached_time:8.1f}x")
+    print(f"Mixed sizes: {mixed_time:.3f} s, {decodes} decode(s) for {args.images} sizes")
+    print()
+
+    print(f"{'gradient':<12} {'previous (s)':>13} {'uint8 (s)':>10}")
+    colors = ((255, 255, 255), (40, 40, 40))
+    previous_time = timed(lambda: previous_gradient((width, height), *colors), args.repeat)
+    for direction in ("vertical", "diagonal"):
+        new_time = timed(
+            lambda: np.ascontiguousarray(ImageOperations.gradient_array((width, height), *colors, direction)),
+            args.repeat
+        )
+        print(f"{direction:<12} {previous_time:13.3f} {new_time:10.3f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,76 @@
+"""Benchmark batched inference throughput on CPU
+
+Usage:
+    python benchmark_batch.py [image_dir] [--images N] [--sizes 1,4,8,16]
+
+Measures images/sec of BackgroundRemovalPipeline.predict_masks for each
+batch size. Uses the images in image_dir when given, otherwise synthetic
+640×480 images.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from bgremover.app.core.pipeline import BackgroundRemovalPipeline
+from bgremover.cli import find_images
+
+
+def load_images(image_dir, count):
+    """Load up to count images, or create synthetic ones"""
+    if image_dir:
+        paths = find_images(Path(image_dir))[:count]
+        images = [Image.open(p).convert("RGB") for p in paths]
+        # Repeat the folder contents if it holds fewer than count images
+        while images and len(images) < count:
+            images.extend(images[:count - len(images)])
+        if images:
+            return images
+
+    rng = np.random.default_rng(0)
+    return [
+        Image.fromarray(rng.integers(0, 256, (480, 640, 3), dtype=np.uint8))
+        for _ in range(count)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batched inference benchmark")
+    parser.add_argument("image_dir", nargs="?", help="Directory with sample images")
+    parser.add_argument("--images", type=int, default=32, help="Images per run (default: 32)")
+    parser.add_argument("--sizes", type=str, default="1,4,8,16", help="Batch sizes (default: 1,4,8,16)")
+    parser.add_argument("--model", type=str, default="u2net", help="Model name (default: u2net)")
+    args = parser.parse_args()
+
+    batch_sizes = [int(s) for s in args.sizes.split(",")]
+    images = load_images(args.image_dir, args.images)
+
+    print(f"Model: {args.model}")
+    print(f"Images per run: {len(images)}")
+    print("=" * 50)
+
+    pipeline = BackgroundRemovalPipeline(args.model)
+    if pipeline.session is None:
+        print("✗ Model could not be initialized")
+        return 1
+
+    # Warm-up run so session initialization is not measured
+    pipeline.predict_masks(images[:1])
+
+    for batch_size in batch_sizes:
+        start = time.perf_counter()
+        for i in range(0, len(images), batch_size):
+            pipeline.predict_masks(images[i:i + batch_size])
+        elapsed = time.perf_counter() - start
+
+        print(f"batch={batch_size:<3} {len(images) / elapsed:8.2f} images/sec  ({elapsed:.2f}s)")
+
+    print("=" * 50)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
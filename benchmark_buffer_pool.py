@@ -0,0 +1,118 @@
+"""Compare post-processing with and without the buffer pool on a long run
+
+Usage:
+    python benchmark_buffer_pool.py [--size 4000x3000] [--images N] [--pool-mb MB]
+
+Renders and encodes N same-sized images one after another, the way a
+catalog batch does, once with the pool disabled and once with it enabled.
+Each run happens in a fresh interpreter so their memory does not mix, and
+reports time per image, minor page faults per image (the cost of faulting
+in freshly mapped buffers), and resident memory at its peak and at the end.
+"""
+
+import argparse
+import io
+import json
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+
+def resident_mb():
+    """Current resident set size in MB"""
+    with open("/proc/self/statm") as statm:
+        pages = int(statm.read().split()[1])
+    return pages * resource.getpagesize() / (1024 * 1024)
+
+
+def run(width, height, images, pool_mb):
+    """Render images in this process and return the measurements"""
+    from bgremover.app.core.buffer_pool import BufferPool
+    from bgremover.app.core.image_ops import ImageOperations
+    from bgremover.app.core.postprocess import PostProcessor
+    from bgremover.app.core.render_plan import RenderPlan
+    from bgremover.app.core.settings import OutputSettings, QualitySettings
+
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[height // 8:-height // 8, width // 6:-width // 6] = 255
+
+    plan = RenderPlan.compile(
+        OutputSettings(format="png", feather_edges=2, auto_crop=True),
+        QualitySettings(remove_small_objects=False, edge_smooth_kernel=5)
+    )
+    postprocessor = PostProcessor()
+    pool = BufferPool(max_mb=pool_mb)
+
+    def refine(alpha):
+        return ImageOperations.refine_mask_morphology(
+            alpha, remove_small_objects=False, kernel=plan.smooth_kernel, out=alpha
+        )
+
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt
+    peak = 0.0
+    start = time.perf_counter()
+    for _ in range(images):
+        with pool.lease() as lease:
+            buffer = postprocessor.to_buffer(image, lease)
+            output = postprocessor.execute(buffer, plan, mask, refine, lease)
+            # Uncompressed TIFF keeps the encoder from dominating the timing
+            output.save(io.BytesIO(), "TIFF")
+        peak = max(peak, resident_mb())
+    seconds = time.perf_counter() - start
+    faults = resource.getrusage(resource.RUSAGE_SELF).ru_minflt - faults
+
+    return {
+        "ms": seconds / images * 1000,
+        "faults": faults / images,
+        "peak_mb": peak,
+        "final_mb": resident_mb(),
+        "pool": pool.describe()
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Buffer pool benchmark")
+    parser.add_argument("--size", default="4000x3000", help="Image size WIDTHxHEIGHT (default: 4000x3000)")
+    parser.add_argument("--images", type=int, default=40, help="Images rendered per run (default: 40)")
+    parser.add_argument("--pool-mb", type=int, default=512, help="Pool limit of the pooled run (default: 512)")
+    parser.add_argument("--child", type=int, metavar="POOL_MB", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    if args.child is not None:
+        print(json.dumps(run(width, height, args.images, args.child)))
+        return 0
+
+    results = {}
+    for label, pool_mb in (("no pool", 0), ("pool", args.pool_mb)):
+        output = subprocess.run(
+            [sys.executable, __file__, "--size", args.size, "--images", str(args.images), "--child", str(pool_mb)],
+            capture_output=True,
+            text=True,
+            check=True
+        ).stdout
+        results[label] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{args.images} images of {width}x{height}, refine + feather + auto-crop, TIFF encode")
+    print("=" * 66)
+    print(f"{'run':<9} {'ms/image':>9} {'faults/image':>13} {'peak RSS MB':>12} {'final RSS MB':>13}")
+    for label, result in results.items():
+        print(
+            f"{label:<9} {result['ms']:9.1f} {result['faults']:13.0f} "
+            f"{result['peak_mb']:12.0f} {result['final_mb']:13.0f}"
+        )
+    print()
+    print(f"Pool: {results['pool']['pool']}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
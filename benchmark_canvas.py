@@ -0,0 +1,83 @@
+"""Compare canvas placement before and after cropping to content
+
+Usage:
+    python benchmark_canvas.py [--size 6000x4000] [--canvas 2400x3000] [--repeat R]
+
+Places a cut-out object on a catalog-style canvas over an opaque color two
+ways: the previous path, which composites the whole image onto the color,
+shrinks all of it with thumbnail() and pastes it through its own alpha,
+and ImageOperations.resize_with_padding() on the RGBA cutout, which
+resamples and composites only the object's region. Objects of several
+sizes are used, since the new path's cost follows the object's area.
+"""
+
+import argparse
+import time
+
+import numpy as np
+from PIL import Image
+
+from bgremover.app.core.image_ops import ImageOperations
+
+
+def cutout(width, height, fraction):
+    """A noisy opaque block covering about fraction of the image, on transparency"""
+    rng = np.random.default_rng(0)
+    pixels = np.zeros((height, width, 4), dtype=np.uint8)
+    block_w, block_h = int(width * fraction ** 0.5), int(height * fraction ** 0.5)
+    x, y = (width - block_w) // 2, (height - block_h) // 2
+    pixels[y:y + block_h, x:x + block_w, :3] = rng.integers(0, 256, (block_h, block_w, 3), dtype=np.uint8)
+    pixels[y:y + block_h, x:x + block_w, 3] = 255
+    return Image.fromarray(pixels)
+
+
+def previous(image, target_size, color):
+    """Composite everything, thumbnail in place, paste through the mask"""
+    flat = Image.new("RGB", image.size, color[:3])
+    flat.paste(image, (0, 0), image)
+    flat.thumbnail(target_size, Image.Resampling.LANCZOS)
+    canvas = Image.new("RGB", target_size, color[:3])
+    canvas.paste(flat, ((target_size[0] - flat.width) // 2, (target_size[1] - flat.height) // 2))
+    return canvas
+
+
+def timed(func, repeat):
+    """Best wall time of repeat runs, and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Canvas placement benchmark")
+    parser.add_argument("--size", default="6000x4000", help="Image size WIDTHxHEIGHT (default: 6000x4000)")
+    parser.add_argument("--canvas", default="2400x3000", help="Canvas size WIDTHxHEIGHT (default: 2400x3000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (default: 3)")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    target_size = tuple(int(v) for v in args.canvas.lower().split("x"))
+    color = (255, 255, 255, 255)
+
+    print(f"Image: {width}x{height} -> canvas {target_size[0]}x{target_size[1]}")
+    print("=" * 58)
+    print(f"{'object area':>12} {'previous (s)':>13} {'cropped (s)':>12} {'speedup':>9} {'mean diff':>10}")
+
+    for fraction in (0.02, 0.1, 0.3, 0.6):
+        image = cutout(width, height, fraction)
+        old_time, old = timed(lambda: previous(image.copy(), target_size, color), args.repeat)
+        new_time, new = timed(
+            lambda: ImageOperations.resize_with_padding(image, target_size, bg_color=color), args.repeat
+        )
+        diff = np.abs(np.asarray(old).astype(int) - np.asarray(new).astype(int)).mean()
+
+        print(f"{fraction:11.0%} {old_time:13.3f} {new_time:12.3f} {old_time / new_time:8.1f}x {diff:10.3f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,89 @@
+"""Compare contour-loop and connected-component small-object removal
+
+Usage:
+    python benchmark_components.py [--size 6000x4000] [--counts 10,100,1000,10000,50000] [--repeat R]
+
+For each speck count, a synthetic mask (one large object plus that many
+small specks) is cleaned with the old findContours/contourArea/drawContours
+loop and with ImageOperations.remove_small_components(), and both times are
+reported with the number of pixels on which the results differ (the old
+path measures polygon area, the new one pixel area).
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from bgremover.app.core.image_ops import ImageOperations
+
+
+def synthetic_mask(width, height, specks):
+    """One large ellipse plus randomly placed specks of 1-6 px per side"""
+    rng = np.random.default_rng(0)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.ellipse(mask, (width // 2, height // 2), (width // 4, height // 3), 0, 0, 360, 255, -1)
+    
+    sides = rng.integers(1, 7, specks)
+    xs = rng.integers(0, width - 6, specks)
+    ys = rng.integers(0, height - 6, specks)
+    for x, y, side in zip(xs, ys, sides):
+        mask[y:y + side, x:x + side] = 255
+    
+    return mask
+
+
+def contour_loop(mask, min_size):
+    """The previous implementation: one Python iteration per external contour"""
+    result = mask.copy()
+    contours, _ = cv2.findContours(result, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    for contour in contours:
+        if cv2.contourArea(contour) < min_size:
+            cv2.drawContours(result, [contour], -1, 0, -1)
+    return result
+
+
+def components(mask, min_size):
+    """The connected-component lookup-table implementation"""
+    return ImageOperations.remove_small_components(mask.copy(), min_size)
+
+
+def timed(func, repeat):
+    """Best wall time of repeat runs, and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Small-object removal benchmark")
+    parser.add_argument("--size", default="6000x4000", help="Mask size WIDTHxHEIGHT (default: 6000x4000)")
+    parser.add_argument("--counts", default="10,100,1000,10000,50000", help="Speck counts (default: 10,100,1000,10000,50000)")
+    parser.add_argument("--min-size", type=int, default=100, help="Minimum object size (default: 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (default: 3)")
+    args = parser.parse_args()
+    
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    counts = [int(c) for c in args.counts.split(",")]
+    
+    print(f"Mask: {width}x{height}, minimum object size {args.min_size} px")
+    print("=" * 60)
+    print(f"{'Specks':>8} {'contours (s)':>14} {'components (s)':>16} {'speedup':>9} {'diff px':>9}")
+    
+    for count in counts:
+        mask = synthetic_mask(width, height, count)
+        loop_time, loop_result = timed(lambda: contour_loop(mask, args.min_size), args.repeat)
+        cc_time, cc_result = timed(lambda: components(mask, args.min_size), args.repeat)
+        differing = int(np.count_nonzero(loop_result != cc_result))
+        
+        print(f"{count:8d} {loop_time:14.3f} {cc_time:16.3f} {loop_time / cc_time:8.1f}x {differing:9d}")
+    
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+"""Compare whole-image PIL feathering with edge-band feathering
+
+Usage:
+    python benchmark_feather.py [--size 6000x4000] [--radii 2,8,20,50] [--repeat R]
+
+Feathers the alpha channel of a synthetic mask twice per radius: with
+PIL's GaussianBlur over the whole channel (what PostProcessor did before)
+and with ImageOperations.feather_alpha(), which blurs only the tiles near
+an edge. Two masks are used, a large object and a small one, since the
+band's cost follows the length of the edge. A second table compares
+OpenCV's Gaussian with the three-pass box approximation on a whole
+image, which is where FEATHER_BOX_SIGMA comes from.
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+from bgremover.app.core.image_ops import ImageOperations
+
+
+def masks(width, height):
+    """A large ellipse and a small square, each on its own mask"""
+    large = np.zeros((height, width), dtype=np.uint8)
+    cv2.ellipse(large, (width // 2, height // 2), (width // 4, height // 3), 0, 0, 360, 255, -1)
+
+    small = np.zeros((height, width), dtype=np.uint8)
+    small[height // 2 - 100:height // 2 + 100, width // 2 - 100:width // 2 + 100] = 255
+
+    return {"large object": large, "small object": small}
+
+
+def timed(func, repeat):
+    """Best wall time of repeat runs, and the last result"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def pil_feather(alpha, radius):
+    """The previous feathering: PIL blur of the whole channel"""
+    return np.asarray(Image.fromarray(alpha).filter(ImageFilter.GaussianBlur(radius=radius)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Feathering benchmark")
+    parser.add_argument("--size", default="6000x4000", help="Mask size WIDTHxHEIGHT (default: 6000x4000)")
+    parser.add_argument("--radii", default="2,8,20,50", help="Feather radii (default: 2,8,20,50)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (default: 3)")
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+    radii = [int(r) for r in args.radii.split(",")]
+
+    print(f"Mask: {width}x{height}")
+    print("=" * 66)
+    print(f"{'Mask':<14} {'radius':>6} {'PIL (s)':>9} {'band (s)':>10} {'speedup':>9} {'max diff':>10}")
+
+    for name, mask in masks(width, height).items():
+        for radius in radii:
+            pil_time, pil_result = timed(lambda: pil_feather(mask, radius), args.repeat)
+            band_time, band_result = timed(lambda: ImageOperations.feather_alpha(mask.copy(), radius), args.repeat)
+            diff = int(np.abs(pil_result.astype(int) - band_result).max())
+
+            print(f"{name:<14} {radius:6d} {pil_time:9.3f} {band_time:10.3f} {pil_time / band_time:8.1f}x {diff:10d}")
+
+    print()
+    print(f"{'sigma':>6} {'Gaussian (s)':>14} {'3 x box (s)':>13}")
+
+    mask = masks(width, height)["large object"]
+    for sigma in (2, 4, 6, 8, 10, 12, 16, 20):
+        half = int(np.ceil(3 * sigma))
+        gauss_time, _ = timed(lambda: cv2.GaussianBlur(mask, (2 * half + 1, 2 * half + 1), sigma), args.repeat)
+        widths = ImageOperations._box_widths(sigma)
+
+        def box():
+            image = mask
+            for width in widths:
+                image = cv2.blur(image, (width, width))
+            return image
+
+        box_time, _ = timed(box, args.repeat)
+        print(f"{sigma:6d} {gauss_time:14.3f} {box_time:13.3f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
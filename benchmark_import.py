@@ -0,0 +1,90 @@
+"""Benchmark GUI startup import time
+
+Usage:
+    python benchmark_import.py [--module MODULE] [--top N] [--max-ms MS]
+
+Runs `python -X importtime -c "import MODULE"` in a fresh interpreter and
+reports the total import time and the slowest modules. With --max-ms the
+script exits with status 1 when the total exceeds the threshold, so it can
+guard against heavy imports (rembg, onnxruntime, numba) creeping back into
+the startup path.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+# import time:   self [us] | cumulative | imported package
+LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+# Modules that must not be imported before the window is shown
+HEAVY_MODULES = ("rembg", "onnxruntime", "pymatting", "numba")
+
+
+def measure(module):
+    """Import module in a fresh interpreter and parse -X importtime output"""
+    env = dict(os.environ)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env=env
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr}")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append((name, int(self_us), int(cumulative_us), len(indent)))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup import time benchmark")
+    parser.add_argument("--module", type=str, default="bgremover.app.ui.main_window",
+                        help="Module to import (default: bgremover.app.ui.main_window)")
+    parser.add_argument("--top", type=int, default=15, help="Slowest modules to show (default: 15)")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail if the total exceeds this many ms")
+    args = parser.parse_args()
+
+    entries = measure(args.module)
+    if not entries:
+        print("✗ No importtime output")
+        return 1
+
+    # Top-level imports have the smallest indent; their cumulative times add up to the total
+    min_indent = min(indent for _, _, _, indent in entries)
+    total_ms = sum(cum for _, _, cum, indent in entries if indent == min_indent) / 1000
+
+    print(f"Module: {args.module}")
+    print(f"Total import time: {total_ms:.1f} ms ({len(entries)} modules)")
+    print("=" * 50)
+
+    slowest = sorted(entries, key=lambda e: e[1], reverse=True)[:args.top]
+    for name, self_us, cumulative_us, _ in slowest:
+        print(f"{self_us / 1000:8.1f} ms self {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    print("=" * 50)
+
+    status = 0
+    heavy = sorted({name for name, _, _, _ in entries if name.split(".")[0] in HEAVY_MODULES})
+    if heavy:
+        print(f"✗ Heavy modules imported at startup: {', '.join(heavy[:5])}")
+        status = 1
+
+    if args.max_ms is not None and total_ms > args.max_ms:
+        print(f"✗ Import time {total_ms:.1f} ms exceeds {args.max_ms:.1f} ms")
+        status = 1
+
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,133 @@
+"""Measure per-model costs for budget-based model selection
+
+Usage:
+    python benchmark_models.py [model ...] [--repeat R]
+    python benchmark_models.py --register NAME PATH [--family u2net|isnet]
+
+Every model is run in a fresh process on a single thread, on synthetic
+images of two sizes. The fixed cost per image, the cost per megapixel and
+the process's peak resident memory are recorded in models/profiles.json,
+where they replace the estimates the model registry starts from. Without
+model names, every model that is already available locally is measured.
+
+--register adds an ONNX file from disk to the model store first, then
+measures it.
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from bgremover.app.core.model_registry import get_model_registry
+from bgremover.app.core.model_store import get_model_store
+
+
+# Synthetic image sizes (pixels per side) the cost line is fitted through
+SMALL_SIZE = 512
+LARGE_SIZE = 2048
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process, in MB"""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def synthetic_image(size):
+    """Gradient image with a bright square in the middle"""
+    gradient = np.linspace(0, 255, size, dtype=np.uint8)
+    pixels = np.dstack([np.tile(gradient, (size, 1))] * 3)
+    pixels[size // 4:3 * size // 4, size // 4:3 * size // 4] = (220, 180, 140)
+    return Image.fromarray(pixels)
+
+
+def measure(model_name, repeat):
+    """Best milliseconds per image at both sizes and the peak RSS, in a worker process"""
+    from bgremover.app.core.pipeline import BackgroundRemovalPipeline
+    from bgremover.app.core.session_manager import get_session_manager
+
+    get_session_manager().configure(1, workers=1)
+    pipeline = BackgroundRemovalPipeline(model_name, warmup=True)
+    if pipeline.session is None:
+        raise RuntimeError(f"Model {model_name} could not be initialized")
+
+    timings = []
+    for size in (SMALL_SIZE, LARGE_SIZE):
+        image = synthetic_image(size)
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            pipeline.predict_mask(image)
+            best = min(best, time.perf_counter() - start)
+        timings.append(best * 1000)
+
+    return timings, peak_rss_mb()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Model cost benchmark")
+    parser.add_argument("models", nargs="*", help="Models to measure (default: all available)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per image size (default: 3)")
+    parser.add_argument("--register", nargs=2, metavar=("NAME", "PATH"), help="Register a local ONNX file")
+    parser.add_argument("--family", choices=["u2net", "isnet"], default="u2net", help="Family of the registered model")
+    args = parser.parse_args()
+
+    store = get_model_store()
+    registry = get_model_registry()
+
+    models = list(args.models)
+    if args.register:
+        name, path = args.register
+        if not store.register_local(name, Path(path), family=args.family):
+            print(f"✗ Could not register {name}")
+            return 1
+        models.append(name)
+
+    if not models:
+        models = [name for name in store.MODELS if store.verify_model(name)]
+    if not models:
+        print("✗ No models available; pass model names to download them")
+        return 1
+
+    small_mp = SMALL_SIZE * SMALL_SIZE / 1_000_000
+    large_mp = LARGE_SIZE * LARGE_SIZE / 1_000_000
+
+    print(f"{'Model':<20} {'ms/image':>10} {'ms/MP':>8} {'peak MB':>9}")
+    print("=" * 50)
+
+    for name in models:
+        if store.get_model_path(name) is None:
+            print(f"✗ Model {name} is not available")
+            continue
+
+        # A fresh process per model, so peak memory is the model's own
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            (small_ms, large_ms), peak_mb = executor.submit(measure, name, args.repeat).result()
+
+        ms_per_megapixel = max(0.0, (large_ms - small_ms) / (large_mp - small_mp))
+        ms_per_image = max(0.0, small_ms - ms_per_megapixel * small_mp)
+        registry.record_measurement(name, ms_per_image, ms_per_megapixel, peak_mb)
+
+        print(f"{name:<20} {ms_per_image:10.1f} {ms_per_megapixel:8.1f} {peak_mb:9.0f}")
+
+    print("=" * 50)
+    print(f"Saved to {registry.profiles_file}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,85 @@
+"""Measure alpha matting start-up with an empty and a populated numba cache
+
+Usage:
+    python benchmark_numba_cache.py [--runs N] [--size 1200x900]
+
+Starts fresh interpreters against a temporary NUMBA_CACHE_DIR: the first
+one finds it empty and compiles pymatting's kernels, the later ones load
+them from it, as every new worker process and CLI run does after the first.
+Each reports the pipeline import time (rembg imports pymatting, which is
+where the kernels are compiled), the first closed-form matting call and a
+second one on the same image.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def child(width, height):
+    """Import the pipeline and time two matting calls in this process"""
+    start = time.perf_counter()
+    # rembg, imported by the pipeline, imports pymatting
+    from bgremover.app.core import pipeline
+    import_seconds = time.perf_counter() - start
+
+    import cv2
+    import numpy as np
+    from PIL import Image
+    from bgremover.app.core.matting import alpha_matting_cutout_tiled
+
+    image = np.full((height, width, 3), 40, dtype=np.uint8)
+    cv2.circle(image, (width // 2, height // 2), min(width, height) // 3, (220, 180, 150), -1)
+    mask = np.zeros((height, width), dtype=np.uint8)
+    cv2.circle(mask, (width // 2, height // 2), min(width, height) // 3, 255, -1)
+    mask = cv2.GaussianBlur(mask, (15, 15), 0)
+
+    calls = []
+    for _ in range(2):
+        start = time.perf_counter()
+        alpha_matting_cutout_tiled(Image.fromarray(image), mask, 240, 10, 10)
+        calls.append(time.perf_counter() - start)
+
+    return {"import": import_seconds, "first": calls[0], "second": calls[1]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Numba cache start-up benchmark")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh processes to start (default: 3)")
+    parser.add_argument("--size", default="1200x900", help="Image size WIDTHxHEIGHT (default: 1200x900)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.lower().split("x"))
+
+    if args.child:
+        print(json.dumps(child(width, height)))
+        return 0
+
+    print(f"Closed-form matting of a {width}x{height} disc, one fresh process per row")
+    print("=" * 62)
+    print(f"{'process':<16} {'import (s)':>11} {'1st call (s)':>13} {'2nd call (s)':>13}")
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = dict(os.environ, NUMBA_CACHE_DIR=cache_dir)
+        for run in range(args.runs):
+            output = subprocess.run(
+                [sys.executable, __file__, "--size", args.size, "--child"],
+                capture_output=True,
+                text=True,
+                env=env,
+                check=True
+            ).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            label = "empty cache" if run == 0 else "cached"
+            print(f"{label:<16} {result['import']:11.2f} {result['first']:13.2f} {result['second']:13.2f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
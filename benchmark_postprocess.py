@@ -0,0 +1,168 @@
+"""Compare PIL-based post-processing with the fused single-buffer engine
+
+Usage:
+    python benchmark_postprocess.py [--size 6000x4000] [--repeat R] [--bg transparent|color|image] [--feather F]
+
+Renders a synthetic image and mask (24 MP by default) with refinement,
+feathering and a background, once through the stage-by-stage PIL path the
+pipeline used before and once through PostProcessor. Each path runs in a
+fresh process, so the reported peak RSS is that worker's own.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image, ImageFilter
+
+from bgremover.app.core.image_ops import ImageOperations
+from bgremover.app.core.postprocess import PostProcessor, parse_hex_color
+from bgremover.app.core.settings import OutputSettings, QualitySettings
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process, in MB"""
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def synthetic_sample(width, height):
+    """Create a textured image and a soft mask of an ellipse on it"""
+    rng = np.random.default_rng(0)
+    image = rng.integers(30, 90, (height, width, 3), dtype=np.uint8)
+
+    mask = np.zeros((height, width), dtype=np.uint8)
+    center = (width // 2, height // 2)
+    axes = (width // 4, height // 3)
+    cv2.ellipse(mask, center, axes, 0, 0, 360, 255, -1)
+    cv2.ellipse(image, center, axes, 0, 0, 360, (200, 170, 140), -1)
+    mask = cv2.GaussianBlur(mask, (0, 0), 3)
+
+    return Image.fromarray(image), mask
+
+
+def legacy_render(image, mask, output_settings, quality_settings):
+    """The pipeline's render() before the fused engine: one PIL image per stage"""
+    ops = ImageOperations()
+
+    empty = Image.new("RGBA", image.size, 0)
+    output_image = Image.composite(image, empty, Image.fromarray(mask))
+
+    alpha = ops.refine_mask_morphology(
+        np.array(output_image.getchannel("A")),
+        remove_small_objects=quality_settings.remove_small_objects,
+        min_object_size=quality_settings.min_object_size,
+        smooth_edges=quality_settings.smooth_edges,
+        kernel_size=quality_settings.edge_smooth_kernel
+    )
+    output_image.putalpha(Image.fromarray(alpha))
+
+    if output_settings.feather_edges > 0:
+        feathered = output_image.getchannel("A").filter(ImageFilter.GaussianBlur(radius=output_settings.feather_edges))
+        result = Image.new("RGBA", output_image.size)
+        result.paste(output_image, (0, 0))
+        result.putalpha(feathered)
+        output_image = result
+
+    if output_settings.background_type == "color":
+        background = Image.new("RGB", output_image.size, parse_hex_color(output_settings.background_color))
+        background.paste(output_image, (0, 0), output_image)
+        output_image = background
+    elif output_settings.background_type == "image":
+        background = Image.open(output_settings.background_image).resize(output_image.size, Image.Resampling.LANCZOS)
+        output_image = Image.alpha_composite(background.convert("RGBA"), output_image)
+
+    return output_image
+
+
+def fused_render(image, mask, output_settings, quality_settings):
+    """The pipeline's render() with PostProcessor"""
+    ops = ImageOperations()
+
+    def refine(alpha):
+        return ops.refine_mask_morphology(
+            alpha,
+            remove_small_objects=quality_settings.remove_small_objects,
+            min_object_size=quality_settings.min_object_size,
+            smooth_edges=quality_settings.smooth_edges,
+            kernel_size=quality_settings.edge_smooth_kernel
+        )
+
+    return PostProcessor(ops).run(
+        PostProcessor.to_buffer(image),
+        output_settings,
+        quality_settings,
+        mask=mask,
+        refine=refine
+    )
+
+
+def measure(name, size, repeat, output_settings, quality_settings):
+    """Best seconds per image and the peak RSS of the post-processing, in a worker process"""
+    image, mask = synthetic_sample(*size)
+    baseline = peak_rss_mb()
+    render = legacy_render if name == "legacy" else fused_render
+
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output_image = render(image, mask, output_settings, quality_settings)
+        best = min(best, time.perf_counter() - start)
+        del output_image
+
+    return best, baseline, peak_rss_mb()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post-processing benchmark")
+    parser.add_argument("--size", default="6000x4000", help="Image size WIDTHxHEIGHT (default: 6000x4000)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per path (default: 3)")
+    parser.add_argument("--bg", choices=["transparent", "color", "image"], default="color", help="Background (default: color)")
+    parser.add_argument("--feather", type=int, default=2, help="Feather radius (default: 2)")
+    args = parser.parse_args()
+
+    size = tuple(int(value) for value in args.size.lower().split("x"))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        background_path = Path(temp_dir) / "background.jpg"
+        if args.bg == "image":
+            Image.new("RGB", (1920, 1280), (40, 80, 160)).save(background_path)
+
+        output_settings = OutputSettings(
+            background_type=args.bg,
+            background_color="#FFFFFF",
+            background_image=str(background_path) if args.bg == "image" else None,
+            feather_edges=args.feather
+        )
+        quality_settings = QualitySettings()
+
+        print(f"Image: {size[0]}x{size[1]} ({size[0] * size[1] / 1_000_000:.0f} MP), background {args.bg}, feather {args.feather}")
+        print("=" * 60)
+        print(f"{'Path':<10} {'s/image':>9} {'input MB':>10} {'peak MB':>9} {'added MB':>10}")
+
+        for name in ("legacy", "fused"):
+            # A fresh process per path, so peak memory is that path's own
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                seconds, baseline, peak = executor.submit(
+                    measure, name, size, args.repeat, output_settings, quality_settings
+                ).result()
+            print(f"{name:<10} {seconds:9.3f} {baseline:10.0f} {peak:9.0f} {peak - baseline:10.0f}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
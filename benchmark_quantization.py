@@ -0,0 +1,112 @@
+"""Compare the fp32 u2net model with its INT8 variant
+
+Usage:
+    python benchmark_quantization.py [image_dir] [--images N] [--repeat R]
+
+Builds u2net_int8 through the ModelStore if needed (requires the onnx
+package), then reports both models' file sizes, steady-state latency per
+image, and how far the INT8 masks are from the fp32 ones (mean absolute
+error, and IoU of the masks thresholded at 128). Without image_dir,
+synthetic images are used, which is enough for timing but not for judging
+mask quality.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from bgremover.app.core.model_store import get_model_store
+
+
+def synthetic_images(count, size=1024):
+    """Create textured images with a bright ellipse in the middle"""
+    rng = np.random.default_rng(0)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(30, 90, (size, size, 3), dtype=np.uint8)
+        axes = (int(rng.integers(size // 6, size // 3)), int(rng.integers(size // 6, size // 3)))
+        cv2.ellipse(pixels, (size // 2, size // 2), axes, 0, 0, 360, (200, 170, 140), -1)
+        images.append(Image.fromarray(pixels))
+    return images
+
+
+def load_images(image_dir, count):
+    """Load images from a folder"""
+    from bgremover.cli import find_images
+
+    return [Image.open(path).convert("RGB") for path in find_images(Path(image_dir))[:count]]
+
+
+def run_model(model_name, images, repeat):
+    """Predict every image repeat times; best seconds per image and the masks"""
+    # Imported here so building the variant does not need rembg
+    from bgremover.app.core.pipeline import BackgroundRemovalPipeline
+
+    pipeline = BackgroundRemovalPipeline(model_name, warmup=True)
+    if pipeline.session is None:
+        raise RuntimeError(f"Model {model_name} could not be initialized")
+
+    best = float("inf")
+    masks = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        masks = [pipeline.predict_mask(image) for image in images]
+        best = min(best, (time.perf_counter() - start) / len(images))
+    return best, masks
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 quantization benchmark")
+    parser.add_argument("image_dir", nargs="?", help="Directory with sample images")
+    parser.add_argument("--images", type=int, default=8, help="Images to predict (default: 8)")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per model (default: 3)")
+    args = parser.parse_args()
+
+    images = load_images(args.image_dir, args.images) if args.image_dir else synthetic_images(args.images)
+    if not images:
+        print("✗ No images found")
+        return 1
+
+    store = get_model_store()
+    paths = {name: store.get_model_path(name) for name in ("u2net", "u2net_int8")}
+    for name, path in paths.items():
+        if path is None:
+            print(f"✗ Model {name} is not available")
+            return 1
+
+    print(f"Images: {len(images)}, {'samples from ' + args.image_dir if args.image_dir else 'synthetic'}")
+    print("=" * 60)
+
+    results = {}
+    for name, path in paths.items():
+        latency, masks = run_model(name, images, args.repeat)
+        results[name] = (latency, masks)
+        size_mb = path.stat().st_size / (1024 * 1024)
+        print(f"{name:<12} {size_mb:7.1f} MB  {latency * 1000:8.1f} ms/image")
+
+    fp32_latency, fp32_masks = results["u2net"]
+    int8_latency, int8_masks = results["u2net_int8"]
+
+    errors = []
+    ious = []
+    for reference, mask in zip(fp32_masks, int8_masks):
+        errors.append(np.mean(np.abs(mask.astype(np.int16) - reference.astype(np.int16))))
+        reference_fg = reference >= 128
+        mask_fg = mask >= 128
+        union = np.logical_or(reference_fg, mask_fg).sum()
+        ious.append(np.logical_and(reference_fg, mask_fg).sum() / union if union else 1.0)
+
+    print("=" * 60)
+    print(f"Speedup:  {fp32_latency / int8_latency:.2f}x")
+    print(f"Mask MAE: {np.mean(errors):.2f} (worst {np.max(errors):.2f})")
+    print(f"Mask IoU: {np.mean(ious):.4f} (worst {np.min(ious):.4f})")
+
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
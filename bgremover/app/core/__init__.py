@@ -4,8 +4,18 @@ __all__ = [
     "logger",
     "settings",
     "model_store",
+    "model_registry",
     "pipeline",
     "presets",
     "batch_worker",
-    "image_ops"
+    "image_ops",
+    "backgrounds",
+    "render_plan",
+    "buffer_pool",
+    "mask_cache",
+    "process_backend",
+    "streaming",
+    "session_manager",
+    "model_loader",
+    "matting"
 ]
@@ -0,0 +1,202 @@
+"""Shared cache of decoded and resized background assets"""
+
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Hashable, Optional, Tuple, Union
+import numpy as np
+import cv2
+from PIL import Image
+from loguru import logger
+
+from bgremover.app.core.image_ops import ImageOperations
+
+
+# Memory kept for backgrounds; a decoded 24 MP background is ~92 MB
+DEFAULT_MAX_MB = 512
+
+
+def owner(array: np.ndarray) -> np.ndarray:
+    """The array that owns a view's memory (e.g. a broadcast gradient's single row)"""
+    while isinstance(array.base, np.ndarray):
+        array = array.base
+    return array
+
+
+class BackgroundCache:
+    """
+    In-memory LRU cache of backgrounds, ready to composite at a given size
+    
+    Entries are read-only uint8 arrays, so every worker thread can
+    composite from the same one. A background image is decoded once per
+    path and modification time, so an edited file is decoded again; each
+    output size is resized from that decoded source rather than from the
+    file. Gradients are kept as the broadcast views gradient_array()
+    returns. Each entry is built once even when several workers ask for it
+    at the same time, and the cache is bounded by the bytes its entries
+    keep alive.
+    """
+    
+    def __init__(self, max_mb: int = DEFAULT_MAX_MB):
+        """
+        Initialize background cache
+        
+        Args:
+            max_mb: Memory kept for backgrounds; least recently used ones are
+                dropped beyond it, except the one just built
+        """
+        self.max_bytes = max(0, max_mb) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+        self._entries: "OrderedDict[Hashable, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.decodes = 0
+    
+    def image(self, path: Union[str, Path], size: Tuple[int, int]) -> np.ndarray:
+        """
+        Get a background image stretched to a size
+        
+        Args:
+            path: Background image file
+            size: (width, height) to stretch it to
+        
+        Returns:
+            Read-only (height, width, 3) uint8 RGB array, or RGBA if the
+            image has transparency
+        
+        Raises:
+            OSError: If the file cannot be read or decoded
+        """
+        path = Path(path).resolve()
+        source_key = ("source", str(path), os.stat(path).st_mtime_ns)
+        key = source_key[1:] + (tuple(size),)
+        
+        def resize() -> np.ndarray:
+            source = self._get(source_key, lambda: self._load_image(path))
+            if source.shape[1::-1] == tuple(size):
+                return source
+            
+            # Area averaging when shrinking, Lanczos when enlarging
+            shrinking = size[0] * size[1] < source.shape[0] * source.shape[1]
+            resized = cv2.resize(
+                source,
+                tuple(size),
+                interpolation=cv2.INTER_AREA if shrinking else cv2.INTER_LANCZOS4
+            )
+            logger.debug(f"Resized background {path.name} to {size[0]}x{size[1]}")
+            return resized
+        
+        return self._get(("image",) + key, resize)
+    
+    def gradient(
+        self,
+        size: Tuple[int, int],
+        color1: Tuple[int, int, int],
+        color2: Tuple[int, int, int],
+        direction: str = "vertical"
+    ) -> np.ndarray:
+        """
+        Get a gradient background of a size
+        
+        Args:
+            size: (width, height)
+            color1: Start color (R, G, B)
+            color2: End color (R, G, B)
+            direction: "vertical", "horizontal", "diagonal"
+        
+        Returns:
+            Read-only (height, width, 3) uint8 RGB array; vertical and
+            horizontal ones are broadcast views of a single column or row
+        """
+        key = ("gradient", tuple(size), tuple(color1), tuple(color2), direction)
+        return self._get(key, lambda: ImageOperations.gradient_array(size, color1, color2, direction))
+    
+    def clear(self) -> None:
+        """Drop all cached backgrounds"""
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+    
+    def size_mb(self) -> float:
+        """Memory kept alive by the cached backgrounds, in MB"""
+        with self._lock:
+            return self._size_bytes() / (1024 * 1024)
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def _get(self, key: Hashable, build) -> np.ndarray:
+        """Look up an entry, building it under its own lock on a miss"""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                return entry
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        
+        with key_lock:
+            # Another worker may have built it while this one waited
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    return entry
+                if key[0] == "source":
+                    self.decodes += 1
+                else:
+                    self.misses += 1
+            
+            entry = build()
+            entry.setflags(write=False)
+            
+            with self._lock:
+                self._entries[key] = entry
+                self._trim()
+                self._key_locks.pop(key, None)
+        
+        return entry
+    
+    def _lookup(self, key: Hashable) -> Optional[np.ndarray]:
+        """Return a cached entry and mark it recently used; call with the lock held"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            if key[0] != "source":
+                self.hits += 1
+        return entry
+    
+    def _size_bytes(self) -> int:
+        """Bytes the entries keep alive, counting shared memory once; call with the lock held"""
+        owners = {id(owner(entry)): owner(entry).nbytes for entry in self._entries.values()}
+        return sum(owners.values())
+    
+    def _trim(self) -> None:
+        """Drop least recently used entries until within the limit; call with the lock held"""
+        while len(self._entries) > 1 and self._size_bytes() > self.max_bytes:
+            evicted, _ = self._entries.popitem(last=False)
+            self._key_locks.pop(evicted, None)
+    
+    @staticmethod
+    def _load_image(path: Path) -> np.ndarray:
+        """Decode a background image at its own size, keeping alpha only if it has any"""
+        with Image.open(path) as image:
+            transparent = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if transparent else "RGB")
+        
+        logger.debug(f"Loaded background {path.name} ({image.width}x{image.height})")
+        return np.asarray(image).copy()
+
+
+# Singleton instance
+_background_cache_instance: Optional[BackgroundCache] = None
+_background_cache_lock = threading.Lock()
+
+
+def get_background_cache() -> BackgroundCache:
+    """Get singleton background cache instance"""
+    global _background_cache_instance
+    if _background_cache_instance is None:
+        with _background_cache_lock:
+            if _background_cache_instance is None:
+                _background_cache_instance = BackgroundCache()
+    return _background_cache_instance
@@ -7,8 +7,19 @@ from enum import Enum
 from PySide6.QtCore import QObject, Signal, QRunnable, QThreadPool, Slot
 from loguru import logger
 
-from bgremover.app.core.pipeline import get_pipeline
-from bgremover.app.core.settings import OutputSettings, QualitySettings
+from bgremover.app.core.settings import OutputSettings, QualitySettings, DEFAULT_BUFFER_POOL_MB
+from bgremover.app.core.mask_cache import DEFAULT_CACHE_DIR
+from bgremover.app.core.process_backend import ProcessPoolBackend
+from bgremover.app.core.streaming import StagedPipeline, StageConfig
+from bgremover.app.core.render_plan import RenderPlan
+
+
+def _get_pipeline():
+    """Get the shared pipeline, importing the inference stack on first use"""
+    # Deferred so that importing this module (and so opening the main window)
+    # does not load rembg, onnxruntime and numba
+    from bgremover.app.core.pipeline import get_pipeline
+    return get_pipeline()
 
 
 class TaskStatus(Enum):
@@ -49,13 +60,17 @@ class ProcessingWorker(QRunnable):
         task: ProcessingTask,
         output_settings: OutputSettings,
         quality_settings: QualitySettings,
-        signals: WorkerSignals
+        signals: WorkerSignals,
+        pipeline=None,
+        plan: Optional[RenderPlan] = None
     ):
         super().__init__()
         self.task = task
         self.output_settings = output_settings
         self.quality_settings = quality_settings
         self.signals = signals
+        self.pipeline = pipeline
+        self.plan = plan
         self._cancelled = False
     
     def cancel(self):
@@ -73,15 +88,16 @@ class ProcessingWorker(QRunnable):
             # Emit start signal
             self.signals.task_started.emit(self.task.id)
             
-            # Get pipeline
-            pipeline = get_pipeline()
+            # Get pipeline (or process pool backend)
+            pipeline = self.pipeline or _get_pipeline()
             
             # Process image
             success = pipeline.process_image(
                 self.task.input_path,
                 self.task.output_path,
                 self.output_settings,
-                self.quality_settings
+                self.quality_settings,
+                plan=self.plan
             )
             
             if self._cancelled:
@@ -98,6 +114,135 @@ class ProcessingWorker(QRunnable):
             self.signals.task_failed.emit(self.task.id, str(e))
 
 
+class BatchProcessingWorker(QRunnable):
+    """Worker for processing several tasks with one batched inference run"""
+    
+    def __init__(
+        self,
+        tasks: List[ProcessingTask],
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        signals: WorkerSignals,
+        pipeline=None,
+        plan: Optional[RenderPlan] = None
+    ):
+        super().__init__()
+        self.tasks = tasks
+        self.output_settings = output_settings
+        self.quality_settings = quality_settings
+        self.signals = signals
+        self.pipeline = pipeline
+        self.plan = plan
+        self._cancelled = False
+    
+    def cancel(self):
+        """Cancel this worker"""
+        self._cancelled = True
+    
+    @Slot()
+    def run(self):
+        """Execute the processing tasks"""
+        if self._cancelled:
+            for task in self.tasks:
+                self.signals.task_failed.emit(task.id, "Cancelled")
+            return
+        
+        try:
+            for task in self.tasks:
+                self.signals.task_started.emit(task.id)
+            
+            # Get pipeline (or process pool backend)
+            pipeline = self.pipeline or _get_pipeline()
+            
+            # Process images
+            results = pipeline.process_batch(
+                [task.input_path for task in self.tasks],
+                [task.output_path for task in self.tasks],
+                self.output_settings,
+                self.quality_settings,
+                batch_size=len(self.tasks),
+                plan=self.plan
+            )
+            
+            for task, success in zip(self.tasks, results):
+                if self._cancelled:
+                    self.signals.task_failed.emit(task.id, "Cancelled")
+                elif success:
+                    self.signals.task_completed.emit(task.id, task.output_path)
+                else:
+                    self.signals.task_failed.emit(task.id, "Processing failed")
+        
+        except Exception as e:
+            logger.error(f"Worker error for tasks {[task.id for task in self.tasks]}: {e}")
+            for task in self.tasks:
+                self.signals.task_failed.emit(task.id, str(e))
+
+
+class StreamingWorker(QRunnable):
+    """Worker streaming many tasks through the decode/infer/post-process/encode stages"""
+    
+    def __init__(
+        self,
+        tasks: List[ProcessingTask],
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        signals: WorkerSignals,
+        stage_config: StageConfig,
+        batch_size: int = 1,
+        plan: Optional[RenderPlan] = None
+    ):
+        super().__init__()
+        self.tasks = tasks
+        self.output_settings = output_settings
+        self.quality_settings = quality_settings
+        self.signals = signals
+        self.stage_config = stage_config
+        self.batch_size = batch_size
+        self.plan = plan
+        self._cancelled = False
+    
+    def cancel(self):
+        """Cancel this worker"""
+        self._cancelled = True
+    
+    @Slot()
+    def run(self):
+        """Execute the processing tasks"""
+        reported = set()
+        
+        def on_start(index: int):
+            self.signals.task_started.emit(self.tasks[index].id)
+        
+        def on_result(index: int, success: bool):
+            task = self.tasks[index]
+            reported.add(index)
+            if success:
+                self.signals.task_completed.emit(task.id, task.output_path)
+            else:
+                self.signals.task_failed.emit(task.id, "Processing failed")
+        
+        try:
+            staged = StagedPipeline(_get_pipeline(), self.stage_config)
+            staged.process_batch(
+                [task.input_path for task in self.tasks],
+                [task.output_path for task in self.tasks],
+                self.output_settings,
+                self.quality_settings,
+                batch_size=self.batch_size,
+                on_start=on_start,
+                on_result=on_result,
+                should_stop=lambda: self._cancelled,
+                plan=self.plan
+            )
+        except Exception as e:
+            logger.error(f"Streaming worker error: {e}")
+        
+        # Tasks that never finished were cancelled or hit an error
+        for index, task in enumerate(self.tasks):
+            if index not in reported:
+                self.signals.task_failed.emit(task.id, "Cancelled" if self._cancelled else "Processing failed")
+
+
 class BatchWorker(QObject):
     """Manages batch processing of multiple tasks"""
     
@@ -109,15 +254,31 @@ class BatchWorker(QObject):
     batch_progress = Signal(int, int)  # completed, total
     batch_completed = Signal(int, int)  # successful, failed
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(
+        self,
+        max_workers: int = 4,
+        batch_size: int = 1,
+        backend: str = "thread",
+        stage_config: Optional[StageConfig] = None,
+        thread_budget: int = 0,
+        model_name: str = "u2net",
+        buffer_pool_mb: int = DEFAULT_BUFFER_POOL_MB
+    ):
         super().__init__()
         
         self.max_workers = max_workers
+        self.batch_size = max(1, batch_size)
+        self.backend = backend
+        self.stage_config = stage_config
+        self.thread_budget = thread_budget
+        self.model_name = model_name
+        self.buffer_pool_mb = buffer_pool_mb
+        self.process_backend: Optional[ProcessPoolBackend] = None
         self.thread_pool = QThreadPool()
         self.thread_pool.setMaxThreadCount(max_workers)
         
         self.tasks: List[ProcessingTask] = []
-        self.workers: List[ProcessingWorker] = []
+        self.workers: List[QRunnable] = []
         self.output_settings: Optional[OutputSettings] = None
         self.quality_settings: Optional[QualitySettings] = None
         
@@ -202,14 +363,54 @@ class BatchWorker(QObject):
         
         logger.info(f"Starting batch processing: {len(self.tasks)} tasks")
         
+        # Settings are resolved once for the whole batch; every worker shares the plan
+        plan = RenderPlan.compile(self.output_settings, self.quality_settings)
+        
+        # Worker processes are reused across batches; the backend prepares the
+        # model and starts them when a worker thread submits the first chunk
+        if self.backend == "process":
+            self._ensure_process_backend()
+        else:
+            self.shutdown()
+        
         # Create and start workers
-        for task in self.tasks:
-            if task.status == TaskStatus.PENDING:
+        pending = [task for task in self.tasks if task.status == TaskStatus.PENDING]
+        
+        if self.backend == "thread" and self.stage_config is not None:
+            worker = StreamingWorker(
+                pending,
+                self.output_settings,
+                self.quality_settings,
+                self.signals,
+                self.stage_config,
+                self.batch_size,
+                plan=plan
+            )
+            
+            self.workers.append(worker)
+            self.thread_pool.start(worker)
+        elif self.batch_size > 1:
+            for start in range(0, len(pending), self.batch_size):
+                worker = BatchProcessingWorker(
+                    pending[start:start + self.batch_size],
+                    self.output_settings,
+                    self.quality_settings,
+                    self.signals,
+                    self.process_backend,
+                    plan=plan
+                )
+                
+                self.workers.append(worker)
+                self.thread_pool.start(worker)
+        else:
+            for task in pending:
                 worker = ProcessingWorker(
                     task,
                     self.output_settings,
                     self.quality_settings,
-                    self.signals
+                    self.signals,
+                    self.process_backend,
+                    plan=plan
                 )
                 
                 self.workers.append(worker)
@@ -217,6 +418,58 @@ class BatchWorker(QObject):
         
         return True
     
+    def configure(
+        self,
+        max_workers: int,
+        batch_size: int,
+        backend: str,
+        stage_config: Optional[StageConfig],
+        thread_budget: int,
+        model_name: str,
+        buffer_pool_mb: int
+    ):
+        """
+        Apply new settings; they take effect with the next start()
+        
+        Args:
+            max_workers: Number of concurrent workers (processes on the process backend)
+            batch_size: Images per inference run
+            backend: "thread" or "process"
+            stage_config: Streaming stage layout for the thread backend
+            thread_budget: Total threads across all inference workers (0 = number of CPUs)
+            model_name: Model used for inference
+            buffer_pool_mb: Image buffer memory kept for reuse
+        """
+        self.max_workers = max_workers
+        self.batch_size = max(1, batch_size)
+        self.backend = backend
+        self.stage_config = stage_config
+        self.thread_budget = thread_budget
+        self.model_name = model_name
+        self.buffer_pool_mb = buffer_pool_mb
+        self.thread_pool.setMaxThreadCount(max_workers)
+    
+    def _ensure_process_backend(self):
+        """Create the process pool, replacing one started with other settings"""
+        backend = self.process_backend
+        if backend is not None and (
+            backend.model_name != self.model_name
+            or backend.max_workers != self.max_workers
+            or backend.thread_budget != self.thread_budget
+            or backend.buffer_pool_mb != self.buffer_pool_mb
+        ):
+            logger.info("Process pool settings changed; restarting worker processes")
+            self.shutdown()
+        
+        if self.process_backend is None:
+            self.process_backend = ProcessPoolBackend(
+                max_workers=self.max_workers,
+                model_name=self.model_name,
+                cache_dir=DEFAULT_CACHE_DIR,
+                thread_budget=self.thread_budget,
+                buffer_pool_mb=self.buffer_pool_mb
+            )
+    
     def pause(self):
         """Pause batch processing"""
         self._paused = True
@@ -252,6 +505,12 @@ class BatchWorker(QObject):
         self.workers.clear()
         logger.info("Batch cleared")
     
+    def shutdown(self):
+        """Stop worker processes, if any"""
+        if self.process_backend is not None:
+            self.process_backend.shutdown()
+            self.process_backend = None
+    
     def get_status(self) -> dict:
         """
         Get current batch status
@@ -0,0 +1,199 @@
+"""Reusable full-size arrays for batch post-processing"""
+
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+import numpy as np
+
+from bgremover.app.core.settings import DEFAULT_BUFFER_POOL_MB
+
+
+class BufferLease:
+    """
+    Arrays borrowed from a pool for one image
+    
+    Everything taken through the lease goes back to the pool when it is
+    released, so it must stay open for as long as anything built on the
+    arrays is in use: an RGBA output image shares its buffer's memory until
+    it has been saved.
+    """
+    
+    def __init__(self, pool: "BufferPool"):
+        self.pool = pool
+        self._arrays: List[np.ndarray] = []
+    
+    def empty(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Borrow an uninitialized array for the lifetime of the lease
+        
+        Args:
+            shape: Array shape
+            dtype: Array data type
+        
+        Returns:
+            C-contiguous array with undefined contents
+        """
+        array = self.pool.acquire(shape, dtype)
+        self._arrays.append(array)
+        return array
+    
+    def release(self) -> None:
+        """Return every borrowed array to the pool"""
+        arrays, self._arrays = self._arrays, []
+        for array in arrays:
+            self.pool.release(array)
+    
+    def __enter__(self) -> "BufferLease":
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.release()
+
+
+def borrow(shape: Tuple[int, ...], dtype=np.uint8, lease: Optional[BufferLease] = None) -> np.ndarray:
+    """
+    Borrow an uninitialized array through a lease, or allocate one without
+    
+    Args:
+        shape: Array shape
+        dtype: Array data type
+        lease: Lease the array is returned with (None = plain allocation)
+    
+    Returns:
+        C-contiguous array with undefined contents
+    """
+    if lease is None:
+        return np.empty(shape, dtype=dtype)
+    return lease.empty(shape, dtype)
+
+
+class BufferPool:
+    """
+    Free lists of arrays keyed by (shape, dtype)
+    
+    Batches of same-sized images borrow the same few buffers over and over
+    instead of mapping and faulting in fresh memory for every image, which
+    keeps resident memory flat over long runs. Returned arrays are kept up
+    to a byte limit; beyond it the least recently returned shapes are
+    dropped first.
+    """
+    
+    def __init__(self, max_mb: int = DEFAULT_BUFFER_POOL_MB):
+        """
+        Initialize buffer pool
+        
+        Args:
+            max_mb: Memory kept for reuse (0 = keep nothing)
+        """
+        self._lock = threading.Lock()
+        self._free: "OrderedDict[tuple, List[np.ndarray]]" = OrderedDict()
+        self._retained_bytes = 0
+        self.max_bytes = max(0, max_mb) * 1024 * 1024
+        
+        self.allocations = 0
+        self.reuses = 0
+        self.drops = 0
+    
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """
+        Take an array from the pool, or allocate one
+        
+        Args:
+            shape: Array shape
+            dtype: Array data type
+        
+        Returns:
+            C-contiguous array with undefined contents
+        """
+        key = (tuple(shape), np.dtype(dtype).str)
+        
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                array = free.pop()
+                self._retained_bytes -= array.nbytes
+                if not free:
+                    del self._free[key]
+                self.reuses += 1
+                return array
+            self.allocations += 1
+        
+        return np.empty(shape, dtype=dtype)
+    
+    def release(self, array: np.ndarray) -> None:
+        """
+        Give an array back for reuse
+        
+        The caller must not use the array afterwards. Views and arrays the
+        pool cannot hand out again unchanged are ignored.
+        
+        Args:
+            array: Array from acquire()
+        """
+        if array.base is not None or not array.flags.c_contiguous or not array.flags.writeable:
+            return
+        
+        key = (array.shape, array.dtype.str)
+        
+        with self._lock:
+            self._free.setdefault(key, []).append(array)
+            self._free.move_to_end(key)
+            self._retained_bytes += array.nbytes
+            self._trim()
+    
+    def lease(self) -> BufferLease:
+        """Start borrowing arrays for one image"""
+        return BufferLease(self)
+    
+    def set_max_size(self, max_mb: int) -> None:
+        """
+        Change the memory kept for reuse
+        
+        Args:
+            max_mb: Memory kept for reuse (0 = keep nothing)
+        """
+        with self._lock:
+            self.max_bytes = max(0, max_mb) * 1024 * 1024
+            self._trim()
+    
+    def clear(self) -> None:
+        """Drop all retained arrays"""
+        with self._lock:
+            self._free.clear()
+            self._retained_bytes = 0
+    
+    def retained_mb(self) -> float:
+        """Memory currently kept for reuse, in MB"""
+        return self._retained_bytes / (1024 * 1024)
+    
+    def describe(self) -> str:
+        """Human readable summary for the logs"""
+        return (
+            f"{self.retained_mb():.0f} MB of {self.max_bytes / (1024 * 1024):.0f} MB retained; "
+            f"{self.allocations} allocation(s), {self.reuses} reuse(s), {self.drops} drop(s)"
+        )
+    
+    def _trim(self) -> None:
+        """Drop arrays, least recently returned shape first, until within the limit; call with the lock held"""
+        while self._retained_bytes > self.max_bytes and self._free:
+            key, free = next(iter(self._free.items()))
+            array = free.pop(0)
+            if not free:
+                del self._free[key]
+            self._retained_bytes -= array.nbytes
+            self.drops += 1
+
+
+# Singleton instance
+_buffer_pool_instance: Optional[BufferPool] = None
+_buffer_pool_lock = threading.Lock()
+
+
+def get_buffer_pool() -> BufferPool:
+    """Get singleton buffer pool instance"""
+    global _buffer_pool_instance
+    if _buffer_pool_instance is None:
+        with _buffer_pool_lock:
+            if _buffer_pool_instance is None:
+                _buffer_pool_instance = BufferPool()
+    return _buffer_pool_instance
@@ -1,12 +1,23 @@
 """Image processing operations"""
 
-from typing import Tuple, Optional
+from typing import Callable, List, Tuple, Optional, Union
 import numpy as np
-from PIL import Image, ImageFilter, ImageOps
+from PIL import Image, ImageOps
 import cv2
 from loguru import logger
 
 
+# Feather radii (Gaussian sigma) above this use three box-filter passes,
+# whose cost does not grow with the radius
+FEATHER_BOX_SIGMA = 4
+
+# Tile width, in pixels, of the edge search for feathering
+FEATHER_TILE_SIZE = 64
+
+# Rows composited at a time; keeps the per-strip temporaries small
+COMPOSITE_STRIP_ROWS = 256
+
+
 class ImageOperations:
     """Image processing utilities"""
     
@@ -26,33 +37,151 @@ class ImageOperations:
         if feather_amount <= 0:
             return image
         
-        # Apply Gaussian blur to mask
-        mask_blurred = mask.filter(ImageFilter.GaussianBlur(radius=feather_amount))
+        alpha = np.array(mask.convert("L"))
+        ImageOperations.feather_alpha(alpha, feather_amount)
         
-        # Apply mask to image
-        result = Image.new("RGBA", image.size)
-        result.paste(image, (0, 0))
-        result.putalpha(mask_blurred)
+        result = image.convert("RGBA") if image.mode != "RGBA" else image.copy()
+        result.putalpha(Image.fromarray(alpha))
         
         return result
     
+    @staticmethod
+    def feather_alpha(alpha: np.ndarray, radius: int, tile_size: int = FEATHER_TILE_SIZE) -> np.ndarray:
+        """
+        Gaussian-blur an alpha channel in place, only around its edges
+        
+        A pixel farther than the filter's reach from any change in alpha
+        keeps its value, so only tiles near an edge are blurred (with the
+        reach as context) and the cost follows the length of the edges
+        rather than the image area.
+        
+        Args:
+            alpha: (H, W) uint8 alpha, may be a strided view; modified in place
+            radius: Gaussian sigma in pixels, as PIL's GaussianBlur radius
+            tile_size: Tile width of the edge search in pixels
+        
+        Returns:
+            The alpha channel
+        """
+        if radius <= 0:
+            return alpha
+        
+        height, width = alpha.shape[:2]
+        blur, reach = ImageOperations._feather_filter(radius)
+        
+        # Tall tiles keep the vertical context small next to the blurred rows
+        tile_height = max(tile_size, 2 * reach)
+        starts = np.arange(0, width, tile_size)
+        edges = np.array([
+            np.maximum.reduceat(strip.max(axis=0), starts) != np.minimum.reduceat(strip.min(axis=0), starts)
+            for strip in (alpha[y0:y0 + tile_height] for y0 in range(0, height, tile_height))
+        ], dtype=np.uint8)
+        if not edges.any():
+            return alpha
+        
+        # Flat tiles within reach of an edge change too
+        grow_y, grow_x = -(-reach // tile_height), -(-reach // tile_size)
+        edges = cv2.dilate(edges, np.ones((2 * grow_y + 1, 2 * grow_x + 1), np.uint8))
+        
+        # Blur runs of edge tiles from the original values, then write back
+        blurred = []
+        for ty, row in enumerate(edges):
+            bounds = np.flatnonzero(np.diff(np.concatenate(([0], row, [0]))))
+            y0, y1 = ty * tile_height, min((ty + 1) * tile_height, height)
+            py0, py1 = max(0, y0 - reach), min(height, y1 + reach)
+            
+            for tx0, tx1 in zip(bounds[::2], bounds[1::2]):
+                x0, x1 = tx0 * tile_size, min(tx1 * tile_size, width)
+                px0, px1 = max(0, x0 - reach), min(width, x1 + reach)
+                
+                region = blur(np.ascontiguousarray(alpha[py0:py1, px0:px1]))
+                blurred.append((y0, y1, x0, x1, region[y0 - py0:y1 - py0, x0 - px0:x1 - px0]))
+        
+        for y0, y1, x0, x1, values in blurred:
+            alpha[y0:y1, x0:x1] = values
+        
+        return alpha
+    
+    @staticmethod
+    def _feather_filter(radius: float) -> Tuple[Callable[[np.ndarray], np.ndarray], int]:
+        """The blur for a feather radius, and how far (in pixels) it reaches"""
+        sigma = float(radius)
+        
+        if sigma <= FEATHER_BOX_SIGMA:
+            half = int(np.ceil(3 * sigma))
+            
+            def blur(image):
+                return cv2.GaussianBlur(image, (2 * half + 1, 2 * half + 1), sigma, borderType=cv2.BORDER_REPLICATE)
+            
+            return blur, half
+        
+        widths = ImageOperations._box_widths(sigma)
+        
+        def blur(image):
+            for box in widths:
+                image = cv2.blur(image, (box, box), borderType=cv2.BORDER_REPLICATE)
+            return image
+        
+        return blur, sum(box // 2 for box in widths)
+    
+    @staticmethod
+    def _box_widths(sigma: float) -> List[int]:
+        """Three odd box widths, two neighbouring sizes, whose variances add up to sigma squared"""
+        ideal = np.sqrt(4 * sigma * sigma + 1)
+        lower = int(ideal) - (1 - int(ideal) % 2)
+        narrow = int(round((12 * sigma * sigma - 3 * lower * lower - 12 * lower - 9) / (-4 * lower - 4)))
+        narrow = min(3, max(0, narrow))
+        return [lower] * narrow + [lower + 2] * (3 - narrow)
+    
+    @staticmethod
+    def padded_canvas(
+        target_size: Tuple[int, int],
+        margin: int = 0,
+        bg_color: Tuple[int, int, int, int] = (255, 255, 255, 0)
+    ) -> Image.Image:
+        """
+        Empty canvas resize_with_padding() pastes onto
+        
+        Args:
+            target_size: (width, height) target size
+            margin: Margin from edges in pixels
+            bg_color: Background color (R, G, B, A)
+        
+        Returns:
+            Canvas filled with the color; RGB if it is opaque, since
+            everything is then composited onto it and needs no alpha
+        """
+        target_width, target_height = target_size
+        width = max(1, target_width - margin * 2) + margin * 2
+        height = max(1, target_height - margin * 2) + margin * 2
+        mode = "RGB" if bg_color[3] == 255 else "RGBA"
+        return Image.new(mode, (width, height), bg_color[:len(mode)])
+    
     @staticmethod
     def resize_with_padding(
         image: Image.Image,
         target_size: Tuple[int, int],
         center: bool = True,
         margin: int = 0,
-        bg_color: Tuple[int, int, int, int] = (255, 255, 255, 0)
+        bg_color: Tuple[int, int, int, int] = (255, 255, 255, 0),
+        canvas_template: Optional[Image.Image] = None
     ) -> Image.Image:
         """
         Resize image to fit target size with padding/margin
         
+        The image is scaled down (never up) to fit inside the margin, but
+        only the region its visible pixels cover is resampled and composited
+        onto the canvas, so the cost follows the object's size rather than
+        the image's. The caller's image is not modified.
+        
         Args:
             image: Source image
             target_size: (width, height) target size
             center: Center the image in canvas
             margin: Margin from edges in pixels
             bg_color: Background color (R, G, B, A)
+            canvas_template: padded_canvas() for the same size, margin and
+                color, filled once and copied for every image
         
         Returns:
             Resized and padded image
@@ -60,29 +189,87 @@ class ImageOperations:
         target_width, target_height = target_size
         
         # Apply margin
-        if margin > 0:
-            target_width -= margin * 2
-            target_height -= margin * 2
+        inner_width = max(1, target_width - margin * 2)
+        inner_height = max(1, target_height - margin * 2)
         
         # Calculate scaling to fit
-        image.thumbnail((target_width, target_height), Image.Resampling.LANCZOS)
+        scale = min(1.0, inner_width / image.width, inner_height / image.height)
+        new_width = max(1, round(image.width * scale))
+        new_height = max(1, round(image.height * scale))
         
         # Create canvas
-        canvas = Image.new("RGBA", (target_width + margin * 2, target_height + margin * 2), bg_color)
+        if canvas_template is not None:
+            canvas = canvas_template.copy()
+        else:
+            canvas = ImageOperations.padded_canvas(target_size, margin, bg_color)
+        mode = canvas.mode
         
         # Calculate position
         if center:
-            x = (canvas.width - image.width) // 2
-            y = (canvas.height - image.height) // 2
+            x = (canvas.width - new_width) // 2
+            y = (canvas.height - new_height) // 2
         else:
             x = margin
             y = margin
         
-        # Paste image onto canvas
-        canvas.paste(image, (x, y), image if image.mode == "RGBA" else None)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA")
+        
+        if image.mode == "RGBA":
+            bbox = ImageOperations.content_bbox(np.asarray(image.getchannel("A")))
+            if bbox is None:
+                return canvas
+        else:
+            bbox = (0, 0, image.width, image.height)
+        
+        if (new_width, new_height) == image.size:
+            region = image.crop(bbox)
+            left, top = bbox[0], bbox[1]
+        else:
+            # Destination pixels the content reaches, widened by Lanczos' support
+            scale_x, scale_y = new_width / image.width, new_height / image.height
+            left = max(0, int(bbox[0] * scale_x) - 4)
+            top = max(0, int(bbox[1] * scale_y) - 4)
+            right = min(new_width, int(np.ceil(bbox[2] * scale_x)) + 4)
+            bottom = min(new_height, int(np.ceil(bbox[3] * scale_y)) + 4)
+            
+            # The same samples a full resize would take there; Pillow
+            # resamples RGBA premultiplied, so edges do not darken
+            region = image.resize(
+                (right - left, bottom - top),
+                Image.Resampling.LANCZOS,
+                box=(left / scale_x, top / scale_y, right / scale_x, bottom / scale_y)
+            )
+        
+        if region.mode == "RGBA" and bg_color[3] > 0:
+            buffer = np.array(region)
+            ImageOperations.composite_over(buffer, bg_color)
+            region = Image.fromarray(buffer).convert(mode)
+        
+        canvas.paste(region, (x + left, y + top))
         
         return canvas
     
+    @staticmethod
+    def content_bbox(alpha: np.ndarray, threshold: int = 0) -> Optional[Tuple[int, int, int, int]]:
+        """
+        Bounding box of the pixels whose alpha is above a threshold
+        
+        Args:
+            alpha: (H, W) uint8 alpha, may be a strided view
+            threshold: Alpha at or below this counts as transparent
+        
+        Returns:
+            (left, top, right, bottom), or None if no pixel is above the threshold
+        """
+        visible = alpha > threshold
+        rows = np.flatnonzero(visible.any(axis=1))
+        if len(rows) == 0:
+            return None
+        
+        columns = np.flatnonzero(visible[rows[0]:rows[-1] + 1].any(axis=0))
+        return int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1
+    
     @staticmethod
     def apply_solid_background(
         image: Image.Image,
@@ -101,11 +288,10 @@ class ImageOperations:
         if image.mode != "RGBA":
             return image
         
-        # Create background
-        background = Image.new("RGB", image.size, bg_color)
-        background.paste(image, (0, 0), image)
+        buffer = np.array(image)
+        ImageOperations.composite_over(buffer, bg_color)
         
-        return background
+        return Image.fromarray(buffer).convert("RGB")
     
     @staticmethod
     def apply_image_background(
@@ -131,14 +317,78 @@ class ImageOperations:
         if resize_bg and background.size != foreground.size:
             background = background.resize(foreground.size, Image.Resampling.LANCZOS)
         
-        # Convert background to RGBA
-        if background.mode != "RGBA":
-            background = background.convert("RGBA")
+        buffer = np.array(foreground)
+        ImageOperations.composite_over(buffer, np.asarray(background.convert("RGBA")))
         
-        # Composite
-        result = Image.alpha_composite(background, foreground)
+        return Image.fromarray(buffer)
+    
+    @staticmethod
+    def composite_over(
+        buffer: np.ndarray,
+        background: Union[Tuple[int, ...], np.ndarray]
+    ) -> None:
+        """
+        Composite an RGBA buffer over a background, in place
         
-        return result
+        Porter-Duff "over" in premultiplied integer arithmetic, rounded to
+        nearest. Opaque foreground pixels are kept and transparent ones take
+        the background as is, so the arithmetic only runs on the partially
+        transparent pixels, which lie along the object's edges. The result
+        is straight (not premultiplied) RGBA; over an opaque background its
+        alpha is 255 everywhere.
+        
+        Args:
+            buffer: (H, W, 4) uint8 straight-alpha image, modified in place
+            background: (R, G, B) or (R, G, B, A) color, or an (H, W, 3|4)
+                uint8 image of the buffer's size
+        """
+        color = not isinstance(background, np.ndarray)
+        if color:
+            background = np.array(tuple(background) + (255,) * (4 - len(background)), dtype=np.uint8)
+            opaque = background[3] == 255
+        else:
+            opaque = background.shape[2] == 3 or bool((background[:, :, 3] == 255).all())
+        
+        filled = None
+        for y0 in range(0, buffer.shape[0], COMPOSITE_STRIP_ROWS):
+            strip = buffer[y0:y0 + COMPOSITE_STRIP_ROWS]
+            alpha = strip[:, :, 3]
+            
+            if color:
+                if filled is None or filled.shape != strip.shape:
+                    filled = np.empty_like(strip)
+                    filled[...] = background
+                back = filled
+            else:
+                back = background[y0:y0 + COMPOSITE_STRIP_ROWS]
+                if back.shape[2] == 3:
+                    back = cv2.cvtColor(back, cv2.COLOR_RGB2RGBA)
+            
+            # Edge pixels, read before the background is written anywhere
+            edge = cv2.findNonZero(cv2.inRange(alpha, 1, 254))
+            if edge is not None:
+                xs, ys = edge.reshape(-1, 2).T
+                front = strip[ys, xs].astype(np.uint32)
+            
+            cv2.copyTo(back, cv2.compare(alpha, 0, cv2.CMP_EQ), strip)
+            
+            if edge is not None:
+                behind = back[ys, xs].astype(np.uint32)
+                a = front[:, 3:4]
+                
+                if opaque:
+                    color_sum = front[:, :3] * a + behind[:, :3] * (255 - a)
+                    strip[ys, xs, :3] = (color_sum + 127) // 255
+                else:
+                    # Everything below in units of 1/255 of alpha
+                    back_weight = behind[:, 3:4] * (255 - a)
+                    out_alpha = a * 255 + back_weight
+                    color_sum = front[:, :3] * a * 255 + behind[:, :3] * back_weight
+                    strip[ys, xs, :3] = (color_sum + out_alpha // 2) // np.maximum(out_alpha, 1)
+                    strip[ys, xs, 3] = ((out_alpha + 127) // 255)[:, 0]
+            
+            if opaque:
+                alpha[:] = 255
     
     @staticmethod
     def refine_mask_morphology(
@@ -146,7 +396,11 @@ class ImageOperations:
         remove_small_objects: bool = True,
         min_object_size: int = 100,
         smooth_edges: bool = True,
-        kernel_size: int = 5
+        kernel_size: int = 5,
+        fill_holes: bool = False,
+        max_hole_size: int = 100,
+        kernel: Optional[np.ndarray] = None,
+        out: Optional[np.ndarray] = None
     ) -> np.ndarray:
         """
         Refine mask using morphological operations
@@ -154,40 +408,135 @@ class ImageOperations:
         Args:
             mask: Binary mask (0-255)
             remove_small_objects: Remove small isolated regions
-            min_object_size: Minimum object size to keep
+            min_object_size: Minimum object size to keep, in pixels
             smooth_edges: Apply morphological smoothing
             kernel_size: Kernel size for smoothing
+            fill_holes: Fill small enclosed background regions
+            max_hole_size: Largest hole to fill, in pixels
+            kernel: Prebuilt smoothing kernel, used instead of kernel_size
+            out: Contiguous array to refine into, which may be mask itself
+                (None = a new array)
         
         Returns:
             Refined mask
         """
-        mask_refined = mask.copy()
+        if out is None:
+            mask_refined = mask.copy()
+        else:
+            mask_refined = out
+            if out is not mask:
+                np.copyto(mask_refined, mask)
         
         # Remove small objects
-        if remove_small_objects:
-            # Find contours
-            contours, _ = cv2.findContours(
-                mask_refined,
-                cv2.RETR_EXTERNAL,
-                cv2.CHAIN_APPROX_SIMPLE
-            )
-            
-            # Filter by size
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                if area < min_object_size:
-                    cv2.drawContours(mask_refined, [contour], -1, 0, -1)
+        if remove_small_objects and min_object_size > 0:
+            ImageOperations.remove_small_components(mask_refined, min_object_size)
+        
+        # Fill small holes
+        if fill_holes and max_hole_size > 0:
+            ImageOperations.fill_small_holes(mask_refined, max_hole_size)
         
         # Smooth edges
         if smooth_edges and kernel_size > 0:
-            kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
-            # Opening (remove noise)
-            mask_refined = cv2.morphologyEx(mask_refined, cv2.MORPH_OPEN, kernel)
-            # Closing (fill gaps)
-            mask_refined = cv2.morphologyEx(mask_refined, cv2.MORPH_CLOSE, kernel)
+            if kernel is None:
+                kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (kernel_size, kernel_size))
+            # Opening (remove noise), then closing (fill gaps), in place
+            cv2.morphologyEx(mask_refined, cv2.MORPH_OPEN, kernel, dst=mask_refined)
+            cv2.morphologyEx(mask_refined, cv2.MORPH_CLOSE, kernel, dst=mask_refined)
         
         return mask_refined
     
+    @staticmethod
+    def _label_components(binary: np.ndarray, connectivity: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Label the regions of a 0/1 image, returning (labels, stats)"""
+        try:
+            # 16-bit labels halve the labelling cost but overflow past 65535 regions
+            _, labels, stats, _ = cv2.connectedComponentsWithStats(
+                binary, connectivity=connectivity, ltype=cv2.CV_16U
+            )
+        except cv2.error:
+            _, labels, stats, _ = cv2.connectedComponentsWithStats(
+                binary, connectivity=connectivity, ltype=cv2.CV_32S
+            )
+        return labels, stats
+    
+    @staticmethod
+    def _select_components(labels: np.ndarray, stats: np.ndarray, selected: np.ndarray) -> np.ndarray:
+        """
+        Build a 0/255 mask of the selected labels
+        
+        A few regions are drawn from their bounding boxes; otherwise every
+        pixel's label goes through the lookup table.
+        """
+        chosen = np.flatnonzero(selected)
+        boxes = stats[chosen, :4]
+        if len(chosen) > 64 or (boxes[:, 2] * boxes[:, 3]).sum() >= labels.size:
+            lookup = np.where(selected, 255, 0).astype(np.uint8)
+            return lookup[labels]
+        
+        result = np.zeros(labels.shape, dtype=np.uint8)
+        for label, (x, y, w, h) in zip(chosen, boxes):
+            region = result[y:y + h, x:x + w]
+            region |= cv2.compare(labels[y:y + h, x:x + w], int(label), cv2.CMP_EQ)
+        return result
+    
+    @staticmethod
+    def remove_small_components(mask: np.ndarray, min_size: int) -> np.ndarray:
+        """
+        Clear foreground regions smaller than min_size pixels, in place
+        
+        Every non-zero pixel counts as foreground; regions are 8-connected.
+        All regions are labelled in one pass and kept through a
+        label-to-keep lookup table, however many there are.
+        
+        Args:
+            mask: uint8 mask (0-255), modified in place
+            min_size: Minimum region area to keep, in pixels
+        
+        Returns:
+            The mask
+        """
+        labels, stats = ImageOperations._label_components((mask > 0).view(np.uint8), 8)
+        
+        keep = stats[:, cv2.CC_STAT_AREA] >= min_size
+        keep[0] = False  # background
+        if keep[1:].all():
+            return mask
+        
+        cv2.bitwise_and(mask, ImageOperations._select_components(labels, stats, keep), dst=mask)
+        
+        return mask
+    
+    @staticmethod
+    def fill_small_holes(mask: np.ndarray, max_size: int) -> np.ndarray:
+        """
+        Fill background regions enclosed by the foreground, in place
+        
+        Holes are 4-connected background regions (the complement of
+        8-connected foreground) that do not touch the image border.
+        
+        Args:
+            mask: uint8 mask (0-255), modified in place
+            max_size: Largest hole to fill, in pixels
+        
+        Returns:
+            The mask
+        """
+        height, width = mask.shape[:2]
+        labels, stats = ImageOperations._label_components((mask == 0).view(np.uint8), 4)
+        
+        left = stats[:, cv2.CC_STAT_LEFT]
+        top = stats[:, cv2.CC_STAT_TOP]
+        right = left + stats[:, cv2.CC_STAT_WIDTH]
+        bottom = top + stats[:, cv2.CC_STAT_HEIGHT]
+        enclosed = (left > 0) & (top > 0) & (right < width) & (bottom < height)
+        
+        fill = enclosed & (stats[:, cv2.CC_STAT_AREA] <= max_size)
+        fill[0] = False  # foreground
+        if fill.any():
+            cv2.bitwise_or(mask, ImageOperations._select_components(labels, stats, fill), dst=mask)
+        
+        return mask
+    
     @staticmethod
     def refine_mask_bilateral(
         mask: np.ndarray,
@@ -210,13 +559,286 @@ class ImageOperations:
         return cv2.bilateralFilter(mask, diameter, sigma_color, sigma_space)
     
     @staticmethod
-    def auto_crop_transparent(image: Image.Image, margin: int = 0) -> Image.Image:
+    def guided_upsample(
+        mask: np.ndarray,
+        guide: np.ndarray,
+        radius: int = 4,
+        eps: float = 1e-3,
+        tile_size: int = 32
+    ) -> np.ndarray:
+        """
+        Upsample a low-resolution mask to the guide's size, following its edges
+        
+        Fast guided filter: the local linear model alpha = a * I + b is fitted
+        at the mask's resolution and only the coefficients are upsampled.
+        Where the mask is flat the model reduces to the mask itself, so the
+        guided result is only evaluated in tiles that contain an edge; the
+        rest is a plain bilinear upsample.
+        
+        The guide must be the mask's size times an integer factor; leftover
+        rows/columns (as from floor division) extend the last mask pixels.
+        
+        Args:
+            mask: Low-resolution mask (0-255)
+            guide: Full-resolution RGB(A) image (H, W, 3|4) or grayscale (H, W)
+            radius: Filter radius in low-resolution pixels
+            eps: Regularization (larger = smoother, less edge-following)
+            tile_size: Tile side in low-resolution pixels
+        
+        Returns:
+            Mask (0-255) at the guide's size
+        """
+        height, width = guide.shape[:2]
+        low_height, low_width = mask.shape[:2]
+        factor = max(1, min(height // low_height, width // low_width))
+        
+        guide = ImageOperations._to_gray(guide)
+        guide_low = ImageOperations._downscale(guide, factor).astype(np.float32) / 255.0
+        p = mask.astype(np.float32) / 255.0
+        
+        ksize = (2 * radius + 1, 2 * radius + 1)
+        mean_i = cv2.boxFilter(guide_low, -1, ksize)
+        mean_p = cv2.boxFilter(p, -1, ksize)
+        cov_ip = cv2.boxFilter(guide_low * p, -1, ksize) - mean_i * mean_p
+        var_i = cv2.boxFilter(guide_low * guide_low, -1, ksize) - mean_i * mean_i
+        
+        a = cov_ip / (var_i + eps)
+        b = mean_p - a * mean_i
+        
+        # Coefficients of alpha (0-255) as a function of the 0-255 guide
+        coefficients = cv2.merge([cv2.boxFilter(a, -1, ksize), cv2.boxFilter(b, -1, ksize) * 255.0])
+        
+        return ImageOperations._evaluate_guided(mask, coefficients, guide, factor, radius, tile_size)
+    
+    @staticmethod
+    def refine_mask_guided(
+        mask: np.ndarray,
+        guide: np.ndarray,
+        radius: int = 16,
+        eps: float = 1e-4,
+        proxy_size: int = 1024,
+        tile_size: int = 32
+    ) -> np.ndarray:
+        """
+        Refine mask edges with a color guided filter
+        
+        Each output pixel is a local linear function of the RGB guide,
+        alpha = a . I + b, fitted to the mask in a window around it, so soft
+        edges such as hair follow the image instead of the mask's coarse
+        outline. The cost is a fixed number of box filters, independent of
+        the radius. As in guided_upsample(), the model is fitted at a
+        resolution whose long side is at most proxy_size and evaluated at
+        full resolution only in tiles along the mask's edges.
+        
+        Args:
+            mask: Mask (0-255) at the guide's size
+            guide: RGB(A) image (H, W, 3|4)
+            radius: Window radius in full-resolution pixels
+            eps: Regularization (larger = smoother, less edge-following)
+            proxy_size: Maximum long side of the fitting resolution in pixels
+            tile_size: Tile side in fitting-resolution pixels
+        
+        Returns:
+            Refined mask (0-255)
+        """
+        height, width = mask.shape[:2]
+        factor = -(-max(height, width) // proxy_size)
+        radius = max(1, round(radius / factor))
+        
+        mask_low = ImageOperations._downscale(mask, factor)
+        guide_low = ImageOperations._downscale(guide, factor)[:, :, :3].astype(np.float32) / 255.0
+        p = mask_low.astype(np.float32) / 255.0
+        
+        ksize = (2 * radius + 1, 2 * radius + 1)
+        
+        def mean(image):
+            return cv2.boxFilter(image, -1, ksize)
+        
+        mean_i = mean(guide_low)
+        mean_p = mean(p)
+        cov_ip = mean(guide_low * p[:, :, None]) - mean_i * mean_p[:, :, None]
+        
+        # Per-pixel 3x3 color covariance, regularized
+        sigma = np.empty(mask_low.shape + (3, 3), dtype=np.float32)
+        for i in range(3):
+            for j in range(i, 3):
+                var = mean(guide_low[:, :, i] * guide_low[:, :, j]) - mean_i[:, :, i] * mean_i[:, :, j]
+                sigma[:, :, i, j] = var
+                sigma[:, :, j, i] = var
+            sigma[:, :, i, i] += eps
+        
+        a = np.linalg.solve(sigma, cov_ip[:, :, :, None])[:, :, :, 0]
+        b = mean_p - (a * mean_i).sum(axis=2)
+        
+        # Coefficients of alpha (0-255) as a function of the 0-255 guide
+        coefficients = np.concatenate([mean(a), mean(b)[:, :, None] * 255.0], axis=2)
+        
+        return ImageOperations._evaluate_guided(mask_low, coefficients, guide, factor, radius, tile_size)
+    
+    @staticmethod
+    def _evaluate_guided(
+        mask: np.ndarray,
+        coefficients: np.ndarray,
+        guide: np.ndarray,
+        factor: int,
+        radius: int,
+        tile_size: int
+    ) -> np.ndarray:
+        """
+        Evaluate low-resolution guided filter coefficients against the full-resolution guide
+        
+        Args:
+            mask: Low-resolution mask (0-255) the coefficients were fitted to
+            coefficients: (h, w, C + 1) slopes for the C guide channels, then the offset
+            guide: Full-resolution image (H, W) or (H, W, C|C + 1), 0-255
+            factor: Integer scale from the mask to the guide
+            radius: Filter radius in low-resolution pixels
+            tile_size: Tile side in low-resolution pixels
+        
+        Returns:
+            Mask (0-255) at the guide's size
+        """
+        height, width = guide.shape[:2]
+        low_height, low_width = mask.shape[:2]
+        channels = coefficients.shape[2] - 1
+        
+        # One low-resolution pixel of context on every side for the tiles
+        coefficients = cv2.copyMakeBorder(coefficients, 1, 2, 1, 2, cv2.BORDER_REPLICATE)
+        
+        result = np.empty((height, width), dtype=np.uint8)
+        covered_height, covered_width = low_height * factor, low_width * factor
+        result[:covered_height, :covered_width] = cv2.resize(
+            mask,
+            (covered_width, covered_height),
+            interpolation=cv2.INTER_LINEAR
+        )
+        result[covered_height:, :covered_width] = result[covered_height - 1, :covered_width]
+        result[:, covered_width:] = result[:, covered_width - 1:covered_width]
+        
+        # The coefficients see 2 * radius pixels around each pixel, plus one
+        # for the bilinear upsampling; outside that band the mask is flat
+        band_kernel = np.ones((4 * radius + 3, 4 * radius + 3), np.uint8)
+        band = cv2.dilate(mask, band_kernel) != cv2.erode(mask, band_kernel)
+        
+        for ty in range(0, low_height, tile_size):
+            for tx in range(0, low_width, tile_size):
+                if not band[ty:ty + tile_size, tx:tx + tile_size].any():
+                    continue
+                
+                y0, x0 = ty * factor, tx * factor
+                y1 = height if ty + tile_size >= low_height else (ty + tile_size) * factor
+                x1 = width if tx + tile_size >= low_width else (tx + tile_size) * factor
+                
+                # Upsampling the tile plus its context by the integer factor
+                # samples the same positions as upsampling the whole mask
+                region = coefficients[ty:ty + tile_size + 2, tx:tx + tile_size + 2]
+                tile_ab = ImageOperations._upscale(region, factor)[factor:factor + y1 - y0, factor:factor + x1 - x0]
+                
+                if channels == 1:
+                    tile = tile_ab[:, :, 0] * guide[y0:y1, x0:x1] + tile_ab[:, :, 1]
+                else:
+                    tile = (tile_ab[:, :, :channels] * guide[y0:y1, x0:x1, :channels]).sum(axis=2) + tile_ab[:, :, channels]
+                np.clip(tile, 0.0, 255.0, out=tile)
+                result[y0:y1, x0:x1] = tile + 0.5
+        
+        return result
+    
+    @staticmethod
+    def refine_mask_proxy(
+        mask: np.ndarray,
+        guide: np.ndarray,
+        proxy_size: int = 1024,
+        remove_small_objects: bool = True,
+        min_object_size: int = 100,
+        smooth_edges: bool = True,
+        kernel_size: int = 5,
+        fill_holes: bool = False,
+        max_hole_size: int = 100
+    ) -> np.ndarray:
+        """
+        Refine mask at a reduced working resolution
+        
+        The mask is downscaled by the smallest integer factor that brings its
+        long side within proxy_size, refined with refine_mask_morphology()
+        (object size and kernel scaled to match), then brought back to full
+        size with guided_upsample().
+        
+        Args:
+            mask: Binary mask (0-255)
+            guide: Full-resolution RGB(A) image the mask belongs to
+            proxy_size: Maximum long side of the working resolution in pixels
+            remove_small_objects: Remove small isolated regions
+            min_object_size: Minimum object size to keep, in full-resolution pixels
+            smooth_edges: Apply morphological smoothing
+            kernel_size: Kernel size for smoothing, in full-resolution pixels
+            fill_holes: Fill small enclosed background regions
+            max_hole_size: Largest hole to fill, in full-resolution pixels
+        
+        Returns:
+            Refined mask at full resolution
+        """
+        height, width = mask.shape[:2]
+        factor = -(-max(height, width) // proxy_size)
+        
+        # Nothing to gain on images that are already small
+        if factor <= 1:
+            return ImageOperations.refine_mask_morphology(
+                mask,
+                remove_small_objects=remove_small_objects,
+                min_object_size=min_object_size,
+                smooth_edges=smooth_edges,
+                kernel_size=kernel_size,
+                fill_holes=fill_holes,
+                max_hole_size=max_hole_size
+            )
+        
+        refined = ImageOperations.refine_mask_morphology(
+            ImageOperations._downscale(mask, factor),
+            remove_small_objects=remove_small_objects,
+            min_object_size=min_object_size // (factor * factor),
+            smooth_edges=smooth_edges,
+            kernel_size=max(1, round(kernel_size / factor)),
+            fill_holes=fill_holes,
+            max_hole_size=max_hole_size // (factor * factor)
+        )
+        
+        return ImageOperations.guided_upsample(refined, guide)
+    
+    @staticmethod
+    def _downscale(image: np.ndarray, factor: int) -> np.ndarray:
+        """Area-downscale by an integer factor, dropping leftover rows/columns"""
+        height, width = image.shape[0] // factor, image.shape[1] // factor
+        # An exact integer ratio takes OpenCV's fast area-averaging path
+        return cv2.resize(
+            image[:height * factor, :width * factor],
+            (width, height),
+            interpolation=cv2.INTER_AREA
+        )
+    
+    @staticmethod
+    def _upscale(image: np.ndarray, factor: int) -> np.ndarray:
+        """Bilinear upscale by an integer factor"""
+        height, width = image.shape[:2]
+        return cv2.resize(image, (width * factor, height * factor), interpolation=cv2.INTER_LINEAR)
+    
+    @staticmethod
+    def _to_gray(image: np.ndarray) -> np.ndarray:
+        """Convert an RGB(A) or grayscale array to grayscale"""
+        if image.ndim == 2:
+            return image
+        if image.shape[2] == 4:
+            return cv2.cvtColor(image, cv2.COLOR_RGBA2GRAY)
+        return cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+    
+    @staticmethod
+    def auto_crop_transparent(image: Image.Image, margin: int = 0, threshold: int = 0) -> Image.Image:
         """
         Auto-crop image to content bounding box
         
         Args:
             image: Source image with alpha channel
             margin: Additional margin around content
+            threshold: Alpha at or below this counts as transparent
         
         Returns:
             Cropped image
@@ -224,25 +846,25 @@ class ImageOperations:
         if image.mode != "RGBA":
             return image
         
-        # Get alpha channel
-        alpha = image.split()[-1]
-        
-        # Get bounding box
-        bbox = alpha.getbbox()
-        
+        bbox = ImageOperations.content_bbox(np.asarray(image.getchannel("A")), threshold)
         if bbox is None:
             return image
         
-        # Apply margin
-        if margin > 0:
-            bbox = (
-                max(0, bbox[0] - margin),
-                max(0, bbox[1] - margin),
-                min(image.width, bbox[2] + margin),
-                min(image.height, bbox[3] + margin)
-            )
-        
-        return image.crop(bbox)
+        return image.crop(ImageOperations._widen_bbox(bbox, margin, image.size))
+    
+    @staticmethod
+    def _widen_bbox(
+        bbox: Tuple[int, int, int, int],
+        margin: int,
+        size: Tuple[int, int]
+    ) -> Tuple[int, int, int, int]:
+        """Grow a bounding box by a margin, within an image of the given size"""
+        return (
+            max(0, bbox[0] - margin),
+            max(0, bbox[1] - margin),
+            min(size[0], bbox[2] + margin),
+            min(size[1], bbox[3] + margin)
+        )
     
     @staticmethod
     def create_gradient_background(
@@ -263,24 +885,53 @@ class ImageOperations:
         Returns:
             Gradient image
         """
+        gradient = ImageOperations.gradient_array(size, color1, color2, direction)
+        return Image.fromarray(np.ascontiguousarray(gradient), mode="RGB")
+    
+    @staticmethod
+    def gradient_array(
+        size: Tuple[int, int],
+        color1: Tuple[int, int, int],
+        color2: Tuple[int, int, int],
+        direction: str = "vertical"
+    ) -> np.ndarray:
+        """
+        Linear gradient as a uint8 RGB array
+        
+        Vertical and horizontal gradients are a single row or column of
+        colors broadcast to the full size, so they cost no memory until
+        copied. Diagonal ones are computed a strip of rows at a time.
+        
+        Args:
+            size: (width, height)
+            color1: Start color (R, G, B)
+            color2: End color (R, G, B)
+            direction: "vertical", "horizontal", "diagonal"
+        
+        Returns:
+            (height, width, 3) uint8 array; read-only unless diagonal
+        """
         width, height = size
+        start = np.asarray(color1, dtype=np.float32)
+        delta = np.asarray(color2, dtype=np.float32) - start
+        
+        def colors(t: np.ndarray) -> np.ndarray:
+            return np.rint(start + delta * t[..., None]).astype(np.uint8)
         
         if direction == "vertical":
-            gradient = np.linspace(0, 1, height).reshape(-1, 1)
-            gradient = np.repeat(gradient, width, axis=1)
-        elif direction == "horizontal":
-            gradient = np.linspace(0, 1, width).reshape(1, -1)
-            gradient = np.repeat(gradient, height, axis=0)
-        else:  # diagonal
-            x = np.linspace(0, 1, width)
-            y = np.linspace(0, 1, height)
-            gradient = (x + y.reshape(-1, 1)) / 2
-        
-        # Create RGB image
-        r = (color1[0] * (1 - gradient) + color2[0] * gradient).astype(np.uint8)
-        g = (color1[1] * (1 - gradient) + color2[1] * gradient).astype(np.uint8)
-        b = (color1[2] * (1 - gradient) + color2[2] * gradient).astype(np.uint8)
-        
-        rgb = np.stack([r, g, b], axis=2)
-        
-        return Image.fromarray(rgb, mode="RGB")
+            column = colors(np.linspace(0, 1, height, dtype=np.float32))
+            return np.broadcast_to(column[:, None], (height, width, 3))
+        
+        if direction == "horizontal":
+            row = colors(np.linspace(0, 1, width, dtype=np.float32))
+            return np.broadcast_to(row[None], (height, width, 3))
+        
+        # Diagonal: (x + y) / 2, with x and y each running from 0 to 1
+        x = np.linspace(0, 0.5, width, dtype=np.float32)
+        y = np.linspace(0, 0.5, height, dtype=np.float32)
+        gradient = np.empty((height, width, 3), dtype=np.uint8)
+        for y0 in range(0, height, COMPOSITE_STRIP_ROWS):
+            y1 = min(y0 + COMPOSITE_STRIP_ROWS, height)
+            gradient[y0:y1] = colors(y[y0:y1, None] + x[None])
+        
+        return gradient
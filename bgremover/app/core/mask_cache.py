@@ -0,0 +1,220 @@
+"""Persistent content-addressed mask cache"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Optional
+import numpy as np
+import cv2
+from PIL import Image
+from loguru import logger
+
+from bgremover.app.core.settings import QualitySettings
+
+
+# Bump when the mask format or key derivation changes
+CACHE_VERSION = 1
+
+DEFAULT_CACHE_DIR = Path.home() / ".bgremover" / "cache"
+DEFAULT_MAX_SIZE_MB = 2048
+
+
+class MaskCache:
+    """
+    On-disk LRU cache of predicted (and refined) masks
+    
+    Several processes may share a cache directory. Each tracks the size
+    from its own scan and writes, and re-scans the directory before it
+    evicts, so the limit holds for the directory as a whole.
+    """
+    
+    def __init__(self, cache_dir: Optional[Path] = None, max_size_mb: int = DEFAULT_MAX_SIZE_MB):
+        """
+        Initialize mask cache
+        
+        Args:
+            cache_dir: Directory to store masks (default: ~/.bgremover/cache)
+            max_size_mb: Size limit; least recently used masks are evicted beyond it
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else DEFAULT_CACHE_DIR
+        self.masks_dir = self.cache_dir / "masks"
+        self.masks_dir.mkdir(parents=True, exist_ok=True)
+        
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        
+        self._lock = threading.Lock()
+        self._size_bytes = sum(entry.stat().st_size for entry in self._iter_entries())
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(image: Image.Image, model_name: str, **params) -> str:
+        """
+        Build the cache key of an image's raw mask
+        
+        Args:
+            image: Decoded input image
+            model_name: Model used for inference
+            **params: Any other inference parameters that change the mask
+        
+        Returns:
+            Hex digest identifying the mask
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        header = {
+            "version": CACHE_VERSION,
+            "model": model_name,
+            "mode": image.mode,
+            "size": image.size,
+            "params": params,
+        }
+        digest.update(json.dumps(header, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+    
+    @staticmethod
+    def refined_key(key: str, quality_settings: QualitySettings) -> str:
+        """
+        Build the cache key of a refined mask
+        
+        Args:
+            key: Raw mask key from make_key()
+            quality_settings: Refinement settings applied to the raw mask
+        
+        Returns:
+            Hex digest identifying the refined mask
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(key.encode("utf-8"))
+        digest.update(quality_settings.model_dump_json().encode("utf-8"))
+        return digest.hexdigest()
+    
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Look up a mask
+        
+        Args:
+            key: Key from make_key() or refined_key()
+        
+        Returns:
+            uint8 mask, or None if not cached
+        """
+        path = self._path_for(key)
+        
+        mask = cv2.imread(str(path), cv2.IMREAD_UNCHANGED) if path.exists() else None
+        if mask is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        # Mark as recently used
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        
+        with self._lock:
+            self.hits += 1
+        return mask
+    
+    def put(self, key: str, mask: np.ndarray) -> None:
+        """
+        Store a mask, evicting least recently used entries if over the limit
+        
+        Args:
+            key: Key from make_key() or refined_key()
+            mask: uint8 mask
+        """
+        path = self._path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        
+        # Write to a temporary file first so readers never see a partial mask;
+        # thread idents repeat across processes sharing the directory
+        tmp_path = path.with_name(f"{path.stem}.{os.getpid()}.{threading.get_ident()}.tmp.png")
+        try:
+            if not cv2.imwrite(str(tmp_path), mask, [cv2.IMWRITE_PNG_COMPRESSION, 1]):
+                raise OSError(f"Could not write {tmp_path}")
+            
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+            
+            with self._lock:
+                self._size_bytes += path.stat().st_size - old_size
+                if self._size_bytes > self.max_size_bytes:
+                    self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to cache mask {key}: {e}")
+            if tmp_path.exists():
+                tmp_path.unlink()
+    
+    def clear(self) -> None:
+        """Remove all cached masks"""
+        with self._lock:
+            for entry in self._iter_entries():
+                try:
+                    os.remove(entry.path)
+                except OSError:
+                    pass
+            self._size_bytes = 0
+        logger.info("Mask cache cleared")
+    
+    def get_size_mb(self) -> float:
+        """Get current cache size in MB"""
+        return self._size_bytes / (1024 * 1024)
+    
+    def _path_for(self, key: str) -> Path:
+        """Get the file path of a cache entry"""
+        return self.masks_dir / key[:2] / f"{key}.png"
+    
+    def _iter_entries(self):
+        """Iterate over all cached mask files"""
+        for shard in os.scandir(self.masks_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and entry.name.endswith(".png") and ".tmp." not in entry.name:
+                        yield entry
+    
+    def _evict(self) -> None:
+        """Delete least recently used entries until below 90% of the limit; call with the lock held"""
+        target = int(self.max_size_bytes * 0.9)
+        entries = []
+        for entry in self._iter_entries():
+            try:
+                stat = entry.stat()
+            except OSError:
+                # Evicted by another process meanwhile
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        
+        # Other processes sharing the directory add and evict masks too, so
+        # start from what is on disk now rather than this process's count
+        self._size_bytes = sum(size for _, size, _ in entries)
+        
+        evicted = 0
+        for _, size, path in entries:
+            if self._size_bytes <= target:
+                break
+            try:
+                os.remove(path)
+                self._size_bytes -= size
+                evicted += 1
+            except OSError:
+                pass
+        
+        logger.debug(f"Evicted {evicted} masks from cache ({self.get_size_mb():.1f} MB left)")
+
+
+# Singleton instance
+_mask_cache_instance: Optional[MaskCache] = None
+
+
+def get_mask_cache() -> MaskCache:
+    """Get singleton mask cache instance"""
+    global _mask_cache_instance
+    if _mask_cache_instance is None:
+        _mask_cache_instance = MaskCache()
+    return _mask_cache_instance
@@ -0,0 +1,351 @@
+"""Alpha matting restricted to the unknown band of the trimap"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Tuple
+import numpy as np
+import cv2
+from PIL import Image
+from loguru import logger
+
+from bgremover.app.core.image_ops import ImageOperations
+from bgremover.app.core.mask_cache import DEFAULT_CACHE_DIR
+
+
+# numba's TBB threading layer hangs the interpreter at exit when pymatting
+# is first imported from a worker thread, which is where both model loading
+# and matting happen. Prefer OpenMP; this must be set before numba loads.
+os.environ.setdefault("NUMBA_THREADING_LAYER_PRIORITY", "omp tbb workqueue")
+
+# pymatting compiles its numba kernels when it is imported; they are cached
+# here so later processes load them instead of compiling them again
+NUMBA_CACHE_DIR = DEFAULT_CACHE_DIR / "numba"
+
+
+# Tile side and known-pixel context around it, in pixels. The closed-form
+# Laplacian of a tile costs on the order of a kilobyte per unknown pixel, so
+# tiles are kept small enough that several can be solved at once.
+DEFAULT_TILE_SIZE = 256
+DEFAULT_TILE_MARGIN = 16
+
+# Guided filter window radius (full-resolution pixels) and regularization
+DEFAULT_GUIDED_RADIUS = 16
+DEFAULT_GUIDED_EPS = 1e-4
+
+
+def configure_numba_cache(cache_dir: Optional[Path] = None) -> Optional[Path]:
+    """
+    Keep numba's compiled kernels in a persistent directory
+    
+    numba caches next to the compiled sources by default, which fails for
+    read-only installs and frozen builds, so every process pays the full
+    compilation when pymatting is imported. Call before pymatting (rembg
+    imports it) is first imported; a NUMBA_CACHE_DIR already set in the
+    environment is kept.
+    
+    Args:
+        cache_dir: Cache directory (default: NUMBA_CACHE_DIR)
+    
+    Returns:
+        The cache directory in use, or None if it cannot be created
+    """
+    configured = os.environ.get("NUMBA_CACHE_DIR")
+    path = Path(configured) if configured else Path(cache_dir or NUMBA_CACHE_DIR)
+    
+    try:
+        path.mkdir(parents=True, exist_ok=True)
+    except OSError as e:
+        logger.warning(f"Numba cache disabled, cannot create {path}: {e}")
+        return None
+    
+    os.environ["NUMBA_CACHE_DIR"] = str(path)
+    if "numba" in sys.modules:
+        # numba reads the environment once, when it is imported
+        sys.modules["numba"].config.CACHE_DIR = str(path)
+    
+    return path
+
+
+def build_trimap(
+    mask: np.ndarray,
+    foreground_threshold: int,
+    background_threshold: int,
+    erode_size: int = 10
+) -> np.ndarray:
+    """
+    Build a trimap from a predicted mask, as rembg's alpha matting does
+    
+    Args:
+        mask: uint8 mask (0-255)
+        foreground_threshold: Mask values above this are definite foreground
+        background_threshold: Mask values below this are definite background
+        erode_size: Erosion applied to both definite regions
+    
+    Returns:
+        uint8 trimap: 255 foreground, 0 background, 128 unknown
+    """
+    is_foreground = (mask > foreground_threshold).astype(np.uint8)
+    is_background = (mask < background_threshold).astype(np.uint8)
+    
+    if erode_size > 0:
+        kernel = np.ones((erode_size, erode_size), np.uint8)
+        # Outside the image counts as background, so foreground erodes from the border
+        is_foreground = cv2.erode(is_foreground, kernel, borderType=cv2.BORDER_CONSTANT, borderValue=0)
+        is_background = cv2.erode(is_background, kernel, borderType=cv2.BORDER_CONSTANT, borderValue=1)
+    
+    trimap = np.full(mask.shape, 128, dtype=np.uint8)
+    trimap[is_foreground > 0] = 255
+    trimap[is_background > 0] = 0
+    
+    return trimap
+
+
+def band_tiles(
+    trimap: np.ndarray,
+    tile_size: int = DEFAULT_TILE_SIZE
+) -> Tuple[np.ndarray, List[Tuple[int, Tuple[int, int, int, int]]]]:
+    """
+    Split the unknown band into tiles
+    
+    Every connected unknown region is cropped to its bounding box; regions
+    larger than tile_size (such as the band around a whole object) are cut
+    into an even grid, keeping only the cells the region passes through.
+    
+    Args:
+        trimap: Trimap from build_trimap()
+        tile_size: Maximum tile side in pixels
+    
+    Returns:
+        Region labels of the unknown pixels, and (label, (y0, y1, x0, x1))
+        for every tile
+    """
+    unknown = (trimap == 128).astype(np.uint8)
+    count, labels, stats, _ = cv2.connectedComponentsWithStats(unknown, connectivity=8)
+    
+    tiles = []
+    for label in range(1, count):
+        x, y, width, height = (int(v) for v in stats[label, :4])
+        
+        # Equal cells, so no sliver at the far edge lacks known context
+        rows = np.linspace(y, y + height, -(-height // tile_size) + 1).astype(int)
+        cols = np.linspace(x, x + width, -(-width // tile_size) + 1).astype(int)
+        
+        for y0, y1 in zip(rows[:-1], rows[1:]):
+            for x0, x1 in zip(cols[:-1], cols[1:]):
+                if (labels[y0:y1, x0:x1] == label).any():
+                    tiles.append((label, (int(y0), int(y1), int(x0), int(x1))))
+    
+    return labels, tiles
+
+
+def _solve_tile(
+    image: np.ndarray,
+    trimap: np.ndarray,
+    core: Tuple[int, int, int, int],
+    margin: int
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """Solve alpha and foreground for one tile plus its known context"""
+    # Imported here so that only matting users load pymatting (and numba)
+    from pymatting import estimate_alpha_cf, estimate_foreground_ml
+    
+    y0, y1, x0, x1 = core
+    height, width = trimap.shape
+    py0, px0 = max(0, y0 - margin), max(0, x0 - margin)
+    py1, px1 = min(height, y1 + margin), min(width, x1 + margin)
+    
+    tile_trimap = trimap[py0:py1, px0:px1] / 255.0
+    if not ((tile_trimap == 0.0).any() and (tile_trimap == 1.0).any()):
+        # Closed-form matting needs both foreground and background samples
+        return None
+    
+    tile_image = image[py0:py1, px0:px1] / 255.0
+    alpha = estimate_alpha_cf(tile_image, tile_trimap)
+    foreground = estimate_foreground_ml(tile_image, alpha)
+    
+    crop = (slice(y0 - py0, y1 - py0), slice(x0 - px0, x1 - px0))
+    return alpha[crop], foreground[crop]
+
+
+def alpha_matting_cutout_tiled(
+    image: Image.Image,
+    mask: np.ndarray,
+    foreground_threshold: int,
+    background_threshold: int,
+    erode_size: int = 10,
+    tile_size: int = DEFAULT_TILE_SIZE,
+    margin: int = DEFAULT_TILE_MARGIN,
+    max_workers: Optional[int] = None
+) -> Image.Image:
+    """
+    Cut out the foreground with alpha matting solved only in the unknown band
+    
+    Same trimap as rembg's alpha_matting_cutout(), but instead of one solve
+    over the whole image, each tile of the unknown band is solved on its own
+    (in parallel) and written back; definite foreground and background keep
+    the trimap's alpha and the original colors. Work and memory follow the
+    length of the object boundary instead of the image size.
+    
+    Args:
+        image: Input image
+        mask: uint8 mask (0-255) at the image's size
+        foreground_threshold: Mask values above this are definite foreground
+        background_threshold: Mask values below this are definite background
+        erode_size: Erosion applied to both definite regions
+        tile_size: Maximum tile side in pixels
+        margin: Known context added around every tile, in pixels
+        max_workers: Tiles solved at once (default: number of CPUs, at most 4)
+    
+    Returns:
+        RGBA cutout
+    """
+    rgb = np.asarray(image.convert("RGB") if image.mode != "RGB" else image)
+    trimap = build_trimap(mask, foreground_threshold, background_threshold, erode_size)
+    labels, tiles = band_tiles(trimap, tile_size)
+    
+    cutout = np.empty(rgb.shape[:2] + (4,), dtype=np.uint8)
+    cutout[:, :, :3] = rgb
+    
+    # Known pixels take the trimap's alpha; unknown ones start from the
+    # coarse mask so a tile that cannot be solved degrades gracefully
+    alpha = trimap.copy()
+    unknown = trimap == 128
+    alpha[unknown] = mask[unknown]
+    
+    if tiles:
+        workers = max_workers or min(4, os.cpu_count() or 1)
+        
+        def solve(tile):
+            label, core = tile
+            try:
+                return _solve_tile(rgb, trimap, core, margin)
+            except Exception as e:
+                logger.warning(f"Alpha matting failed for tile {core}: {e}")
+                return None
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (label, (y0, y1, x0, x1)), solved in zip(tiles, executor.map(solve, tiles)):
+                if solved is None:
+                    continue
+                
+                tile_alpha, tile_foreground = solved
+                # Only this region's pixels: bounding boxes of regions may overlap
+                region = labels[y0:y1, x0:x1] == label
+                alpha[y0:y1, x0:x1][region] = np.clip(tile_alpha[region] * 255.0 + 0.5, 0, 255)
+                cutout[y0:y1, x0:x1, :3][region] = np.clip(tile_foreground[region] * 255.0 + 0.5, 0, 255)
+        
+        logger.debug(f"Alpha matting: {len(tiles)} tile(s), {int(unknown.sum())} unknown pixels")
+    
+    cutout[:, :, 3] = alpha
+    
+    return Image.fromarray(cutout)
+
+
+def guided_alpha_matte(
+    image: np.ndarray,
+    mask: np.ndarray,
+    foreground_threshold: int,
+    background_threshold: int,
+    erode_size: int = 10,
+    radius: int = DEFAULT_GUIDED_RADIUS,
+    eps: float = DEFAULT_GUIDED_EPS
+) -> np.ndarray:
+    """
+    Estimate alpha with a color guided filter instead of closed-form matting
+    
+    Same trimap as alpha_matting_cutout_tiled(): definite foreground and
+    background keep the trimap's alpha, and the unknown band takes the
+    mask, thresholded at half, filtered with the image as guide (see
+    ImageOperations.refine_mask_guided()). Filtering the hard mask rather
+    than the soft prediction lets the image alone decide how the edge
+    fades. Runs in linear time without pymatting; foreground colors are
+    not re-estimated.
+    
+    Args:
+        image: RGB(A) image (H, W, 3|4), uint8
+        mask: uint8 mask (0-255) at the image's size
+        foreground_threshold: Mask values above this are definite foreground
+        background_threshold: Mask values below this are definite background
+        erode_size: Erosion applied to both definite regions
+        radius: Guided filter window radius in pixels
+        eps: Guided filter regularization
+    
+    Returns:
+        uint8 alpha (0-255)
+    """
+    trimap = build_trimap(mask, foreground_threshold, background_threshold, erode_size)
+    _, hard = cv2.threshold(mask, 127, 255, cv2.THRESH_BINARY)
+    alpha = ImageOperations.refine_mask_guided(hard, image, radius=radius, eps=eps)
+    
+    known = trimap != 128
+    alpha[known] = trimap[known]
+    
+    return alpha
+
+
+# Background pre-warm of closed-form matting, started at most once per process
+_prewarm_thread: Optional[threading.Thread] = None
+_prewarm_lock = threading.Lock()
+
+
+def prewarm_matting() -> Optional[float]:
+    """
+    Run closed-form matting once on a tiny synthetic image
+    
+    Loads pymatting's kernels (compiling them if the numba cache is empty)
+    and starts numba's thread pool, so the first real image does not wait
+    for either.
+    
+    Returns:
+        Seconds taken, or None if pymatting is unavailable
+    """
+    configure_numba_cache()
+    start = time.perf_counter()
+    
+    try:
+        # Importing pymatting is what loads or compiles its kernels
+        import pymatting
+        
+        size = 64
+        gradient = np.linspace(0, 255, size, dtype=np.uint8)
+        image = Image.fromarray(np.dstack([np.tile(gradient, (size, 1))] * 3))
+        mask = np.zeros((size, size), dtype=np.uint8)
+        mask[16:48, 16:48] = 255
+        alpha_matting_cutout_tiled(image, mask, 240, 10, erode_size=6, max_workers=1)
+    except Exception as e:
+        logger.warning(f"Alpha matting pre-warm failed: {e}")
+        return None
+    
+    seconds = time.perf_counter() - start
+    logger.debug(f"Alpha matting pre-warmed in {seconds:.2f}s")
+    return seconds
+
+
+def start_matting_prewarm(matting_mode: str = "closed_form") -> Optional[threading.Thread]:
+    """
+    Pre-warm alpha matting in a background thread, once per process
+    
+    Guided matting is plain OpenCV and needs no warm-up.
+    
+    Args:
+        matting_mode: Matting mode about to be used
+    
+    Returns:
+        The pre-warm thread, or None if the mode needs no warm-up
+    """
+    global _prewarm_thread
+    if matting_mode != "closed_form":
+        return None
+    
+    with _prewarm_lock:
+        if _prewarm_thread is None:
+            _prewarm_thread = threading.Thread(
+                target=prewarm_matting,
+                name="bgremover-matting-prewarm",
+                daemon=True
+            )
+            _prewarm_thread.start()
+        return _prewarm_thread
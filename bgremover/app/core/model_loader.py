@@ -0,0 +1,89 @@
+"""Background loading of the inference stack"""
+
+import threading
+import time
+from typing import Optional
+from PySide6.QtCore import QObject, Signal
+from loguru import logger
+
+
+class ModelLoader(QObject):
+    """Imports rembg/onnxruntime and builds the pipeline off the UI thread"""
+    
+    ready = Signal(float)  # warm-up inference seconds (0 if not warmed here)
+    failed = Signal(str)  # error
+    
+    def __init__(self, warm_pipeline: bool = True):
+        """
+        Initialize model loader
+        
+        Args:
+            warm_pipeline: Build and warm up the in-process pipeline. Turn off
+                for the process backend, whose workers each load their own
+                session; only the imports are done then.
+        """
+        super().__init__()
+        self.warm_pipeline = warm_pipeline
+        self._thread: Optional[threading.Thread] = None
+        self._done = threading.Event()
+        self.error: Optional[str] = None
+    
+    def start(self) -> None:
+        """Start loading in a background thread (no-op if already started)"""
+        if self._thread is not None:
+            return
+        
+        self._thread = threading.Thread(target=self._load, name="bgremover-model-loader", daemon=True)
+        self._thread.start()
+    
+    def is_ready(self) -> bool:
+        """Check if the pipeline finished loading and warming up successfully"""
+        return self._done.is_set() and self.error is None
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until loading has finished
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+        
+        Returns:
+            True if the pipeline is ready
+        """
+        self._done.wait(timeout)
+        return self.is_ready()
+    
+    def _load(self) -> None:
+        """Import the pipeline module and build the shared pipeline"""
+        start = time.perf_counter()
+        
+        try:
+            # get_pipeline() holds a lock while building, so any worker that
+            # asks for the pipeline meanwhile simply waits for this to finish
+            from bgremover.app.core.pipeline import get_pipeline
+            
+            if not self.warm_pipeline:
+                # A session here would never be used and only hold memory
+                logger.success(f"Inference stack imported in background in {time.perf_counter() - start:.2f}s")
+                self._done.set()
+                self.ready.emit(0.0)
+                return
+            
+            pipeline = get_pipeline()
+            if not pipeline.wait_ready():
+                raise RuntimeError(f"Model {pipeline.model_name} could not be initialized")
+        
+        except Exception as e:
+            self.error = str(e)
+            logger.error(f"Background model loading failed: {e}")
+            self._done.set()
+            self.failed.emit(self.error)
+            return
+        
+        cold_start = pipeline.cold_start_seconds or 0.0
+        logger.success(
+            f"Model loaded in background in {time.perf_counter() - start:.2f}s "
+            f"(warm-up inference {cold_start:.2f}s)"
+        )
+        self._done.set()
+        self.ready.emit(cold_start)
@@ -0,0 +1,201 @@
+"""Model cost metadata and budget-based model selection"""
+
+import json
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+from loguru import logger
+
+from bgremover.app.core.model_store import ModelStore, get_model_store
+
+
+@dataclass
+class ModelProfile:
+    """What a model costs to run and how good its masks are"""
+    name: str
+    family: str
+    input_size: int
+    size_mb: float
+    quality: int
+    ms_per_image: float
+    ms_per_megapixel: float
+    peak_rss_mb: float
+    measured: bool = False
+    
+    def estimate_ms(self, megapixels: float) -> float:
+        """Estimated single-thread latency for one image of this many megapixels"""
+        return self.ms_per_image + self.ms_per_megapixel * megapixels
+    
+    def estimate_batch_ms(self, megapixels: List[float]) -> float:
+        """Estimated single-thread latency for a batch of images"""
+        return sum(self.estimate_ms(mp) for mp in megapixels)
+
+
+class ModelRegistry:
+    """
+    Describes every model the store knows, with measured costs if any
+    
+    Cost figures come from the store's model table and are replaced by the
+    ones benchmark_models.py records in profiles.json.
+    """
+    
+    def __init__(self, model_store: Optional[ModelStore] = None):
+        """
+        Initialize registry
+        
+        Args:
+            model_store: Store the models come from (default: shared store)
+        """
+        self.model_store = model_store or get_model_store()
+        self.profiles_file = self.model_store.models_dir / "profiles.json"
+        self._load_measurements()
+    
+    def _load_measurements(self) -> None:
+        """Load measured costs from file"""
+        self.measurements: Dict[str, Dict[str, float]] = {}
+        if self.profiles_file.exists():
+            try:
+                with open(self.profiles_file, "r") as f:
+                    self.measurements = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load model profiles: {e}")
+    
+    def _save_measurements(self) -> None:
+        """Save measured costs to file"""
+        try:
+            with open(self.profiles_file, "w") as f:
+                json.dump(self.measurements, f, indent=2)
+        except Exception as e:
+            logger.error(f"Failed to save model profiles: {e}")
+    
+    def get(self, model_name: str) -> Optional[ModelProfile]:
+        """
+        Get a model's profile
+        
+        Args:
+            model_name: Name of the model
+        
+        Returns:
+            Profile, or None for unknown models
+        """
+        info = self.model_store.MODELS.get(model_name)
+        if info is None:
+            return None
+        
+        profile = ModelProfile(
+            name=model_name,
+            family=info.get("family", "u2net"),
+            input_size=info.get("input_size", 320),
+            size_mb=info["size_mb"],
+            quality=info.get("quality", 1),
+            ms_per_image=info.get("ms_per_image", 0),
+            ms_per_megapixel=info.get("ms_per_megapixel", 0),
+            peak_rss_mb=info.get("peak_rss_mb", 0)
+        )
+        
+        measured = self.measurements.get(model_name)
+        if measured:
+            profile.ms_per_image = measured["ms_per_image"]
+            profile.ms_per_megapixel = measured["ms_per_megapixel"]
+            profile.peak_rss_mb = measured["peak_rss_mb"]
+            profile.measured = True
+        
+        return profile
+    
+    def profiles(self) -> List[ModelProfile]:
+        """Profiles of all known models"""
+        return [self.get(name) for name in self.model_store.MODELS]
+    
+    def record_measurement(
+        self,
+        model_name: str,
+        ms_per_image: float,
+        ms_per_megapixel: float,
+        peak_rss_mb: float
+    ) -> None:
+        """
+        Store measured costs, replacing the estimates
+        
+        Args:
+            model_name: Name of the model
+            ms_per_image: Fixed latency per image (ms, single thread)
+            ms_per_megapixel: Latency added per input megapixel (ms, single thread)
+            peak_rss_mb: Peak resident memory of a process running the model
+        """
+        if model_name not in self.model_store.MODELS:
+            raise ValueError(f"Unknown model: {model_name}")
+        
+        self.measurements[model_name] = {
+            "ms_per_image": round(ms_per_image, 1),
+            "ms_per_megapixel": round(ms_per_megapixel, 1),
+            "peak_rss_mb": round(peak_rss_mb)
+        }
+        self._save_measurements()
+    
+    def select(
+        self,
+        megapixels: List[float],
+        latency_budget_ms: Optional[float] = None,
+        memory_budget_mb: Optional[float] = None,
+        threads: int = 1,
+        candidates: Optional[List[str]] = None
+    ) -> str:
+        """
+        Pick the best model whose estimated cost fits the budgets
+        
+        Among the models that fit, the one with the highest quality wins,
+        then the fastest. If none fits, the cheapest model is used.
+        
+        Args:
+            megapixels: Size of every image in the batch, in megapixels
+            latency_budget_ms: Maximum estimated milliseconds for the batch
+            memory_budget_mb: Maximum peak resident memory
+            threads: Inference threads; latency estimates are divided by it
+            candidates: Models to choose from (default: all known models)
+        
+        Returns:
+            Name of the selected model
+        """
+        profiles = [
+            self.get(name) for name in (candidates or list(self.model_store.MODELS))
+        ]
+        profiles = [profile for profile in profiles if profile is not None]
+        if not profiles:
+            raise ValueError("No models to choose from")
+        
+        threads = max(1, threads)
+        
+        def batch_ms(profile: ModelProfile) -> float:
+            return profile.estimate_batch_ms(megapixels) / threads
+        
+        fitting = [
+            profile for profile in profiles
+            if (latency_budget_ms is None or batch_ms(profile) <= latency_budget_ms)
+            and (memory_budget_mb is None or profile.peak_rss_mb <= memory_budget_mb)
+        ]
+        
+        if fitting:
+            selected = max(fitting, key=lambda profile: (profile.quality, -batch_ms(profile)))
+        else:
+            selected = min(profiles, key=lambda profile: (batch_ms(profile), profile.peak_rss_mb))
+            logger.warning(
+                f"No model fits the budget, using the cheapest one ({selected.name})"
+            )
+        
+        logger.info(
+            f"Selected model {selected.name}: ~{batch_ms(selected):.0f} ms for "
+            f"{len(megapixels)} image(s), ~{selected.peak_rss_mb:.0f} MB peak"
+            f"{'' if selected.measured else ' (estimated)'}"
+        )
+        return selected.name
+
+
+# Singleton instance
+_model_registry_instance: Optional[ModelRegistry] = None
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get singleton model registry instance"""
+    global _model_registry_instance
+    if _model_registry_instance is None:
+        _model_registry_instance = ModelRegistry()
+    return _model_registry_instance
@@ -2,6 +2,8 @@
 
 import hashlib
 import json
+import os
+import platform
 from pathlib import Path
 from typing import Dict, Optional
 import requests
@@ -11,13 +13,74 @@ from loguru import logger
 class ModelStore:
     """Manages ML model download, verification, and storage"""
     
-    # Model URLs and checksums
+    # Model URLs and checksums. Entries with a "source" are not downloaded:
+    # they are built locally from the verified source model, and their
+    # checksum is recorded in checksums.json when they are built.
+    #
+    # family selects the pre/post-processing ("u2net" or "isnet"); the cost
+    # figures are single-thread CPU estimates that benchmark_models.py
+    # replaces with measured ones (see model_registry). Models registered
+    # from local files are kept in local_models.json and carry a "path".
     MODELS = {
         "u2net": {
             "url": "https://github.com/danielgatis/rembg/releases/download/v0.0.0/u2net.onnx",
             "sha256": "60024c5c889badc19c04ad937298a77da6dc8df30476a58540a7e99dff9b74dc",
             "filename": "u2net.onnx",
-            "size_mb": 176
+            "size_mb": 176,
+            "family": "u2net",
+            "input_size": 320,
+            "quality": 3,
+            "ms_per_image": 900,
+            "ms_per_megapixel": 20,
+            "peak_rss_mb": 700
+        },
+        "u2net_int8": {
+            "source": "u2net",
+            "quantization": "dynamic_int8",
+            "filename": "u2net_int8.onnx",
+            "size_mb": 44,
+            "family": "u2net",
+            "input_size": 320,
+            "quality": 2,
+            "ms_per_image": 500,
+            "ms_per_megapixel": 20,
+            "peak_rss_mb": 350
+        },
+        "u2netp": {
+            "url": "https://github.com/danielgatis/rembg/releases/download/v0.0.0/u2netp.onnx",
+            "md5": "8e83ca70e441ab06c318d82300c84806",
+            "filename": "u2netp.onnx",
+            "size_mb": 5,
+            "family": "u2net",
+            "input_size": 320,
+            "quality": 1,
+            "ms_per_image": 250,
+            "ms_per_megapixel": 20,
+            "peak_rss_mb": 200
+        },
+        "silueta": {
+            "url": "https://github.com/danielgatis/rembg/releases/download/v0.0.0/silueta.onnx",
+            "md5": "55e59e0d8062d2f5d013f4725ee84782",
+            "filename": "silueta.onnx",
+            "size_mb": 43,
+            "family": "u2net",
+            "input_size": 320,
+            "quality": 2,
+            "ms_per_image": 800,
+            "ms_per_megapixel": 20,
+            "peak_rss_mb": 400
+        },
+        "isnet-general-use": {
+            "url": "https://github.com/danielgatis/rembg/releases/download/v0.0.0/isnet-general-use.onnx",
+            "md5": "fc16ebd8b0c10d971d3513d564d01e29",
+            "filename": "isnet-general-use.onnx",
+            "size_mb": 171,
+            "family": "isnet",
+            "input_size": 1024,
+            "quality": 4,
+            "ms_per_image": 4000,
+            "ms_per_megapixel": 20,
+            "peak_rss_mb": 1500
         }
     }
     
@@ -37,6 +100,16 @@ class ModelStore:
         
         self.checksums_file = self.models_dir / "checksums.json"
         self._load_checksums()
+        
+        # Size and modification time of each file when it was last hashed,
+        # so an unchanged file is not read again just to verify it
+        self.file_stats_file = self.models_dir / "file_stats.json"
+        self._load_file_stats()
+        
+        # Built-in models plus the ones registered from local files
+        self.MODELS = dict(self.MODELS)
+        self.local_models_file = self.models_dir / "local_models.json"
+        self._load_local_models()
     
     def _load_checksums(self) -> None:
         """Load verified checksums from file"""
@@ -58,15 +131,139 @@ class ModelStore:
         except Exception as e:
             logger.error(f"Failed to save checksums: {e}")
     
+    def _load_file_stats(self) -> None:
+        """Load the stats of verified files"""
+        self.file_stats: Dict[str, list] = {}
+        if self.file_stats_file.exists():
+            try:
+                with open(self.file_stats_file, "r") as f:
+                    self.file_stats = json.load(f)
+            except Exception as e:
+                logger.warning(f"Failed to load file stats: {e}")
+    
+    def _record_checksum(self, model_name: str, model_path: Path, checksum: str) -> None:
+        """Remember a file's checksum and the stats of the file it was computed from"""
+        stat = model_path.stat()
+        self.verified_checksums[model_name] = checksum
+        self.file_stats[model_name] = [checksum, stat.st_size, stat.st_mtime_ns]
+        self._save_checksums()
+        
+        try:
+            with open(self.file_stats_file, "w") as f:
+                json.dump(self.file_stats, f, indent=2)
+        except Exception as e:
+            logger.error(f"Failed to save file stats: {e}")
+    
+    def _is_unchanged(self, model_name: str, model_path: Path, checksum: str) -> bool:
+        """Check if a file is the one last hashed to checksum"""
+        stat = model_path.stat()
+        return self.file_stats.get(model_name) == [checksum, stat.st_size, stat.st_mtime_ns]
+    
+    def _load_local_models(self) -> None:
+        """Load models registered from local files"""
+        if not self.local_models_file.exists():
+            return
+        
+        try:
+            with open(self.local_models_file, "r") as f:
+                local_models = json.load(f)
+        except Exception as e:
+            logger.warning(f"Failed to load local models: {e}")
+            return
+        
+        for name, info in local_models.items():
+            if name in ModelStore.MODELS:
+                logger.warning(f"Local model {name} shadows a built-in model, ignored")
+                continue
+            self.MODELS[name] = info
+    
+    def _save_local_models(self) -> None:
+        """Save models registered from local files"""
+        local_models = {
+            name: info for name, info in self.MODELS.items() if "path" in info
+        }
+        try:
+            with open(self.local_models_file, "w") as f:
+                json.dump(local_models, f, indent=2)
+        except Exception as e:
+            logger.error(f"Failed to save local models: {e}")
+    
+    def register_local(
+        self,
+        model_name: str,
+        path: Path,
+        family: str = "u2net",
+        input_size: Optional[int] = None,
+        quality: int = 2
+    ) -> bool:
+        """
+        Register an ONNX model from a local file
+        
+        The file is not copied; its checksum is recorded now, and the model
+        is only used while the file still matches it.
+        
+        Args:
+            model_name: Name to register the model under
+            path: Path to the ONNX file
+            family: Pre/post-processing family ("u2net" or "isnet")
+            input_size: Model input resolution (default: the family's)
+            quality: Relative mask quality, used when selecting by budget
+        
+        Returns:
+            True if the model was registered
+        """
+        path = Path(path).resolve()
+        
+        if model_name in ModelStore.MODELS:
+            logger.error(f"Cannot replace built-in model {model_name}")
+            return False
+        if family not in ("u2net", "isnet"):
+            logger.error(f"Unknown model family: {family}")
+            return False
+        if not path.is_file():
+            logger.error(f"Model file not found: {path}")
+            return False
+        
+        # Cost figures stay estimates until benchmark_models.py measures them
+        reference = ModelStore.MODELS["u2net" if family == "u2net" else "isnet-general-use"]
+        self.MODELS[model_name] = {
+            "path": str(path),
+            "filename": path.name,
+            "size_mb": round(path.stat().st_size / (1024 * 1024)),
+            "family": family,
+            "input_size": input_size or reference["input_size"],
+            "quality": quality,
+            "ms_per_image": reference["ms_per_image"],
+            "ms_per_megapixel": reference["ms_per_megapixel"],
+            "peak_rss_mb": reference["peak_rss_mb"]
+        }
+        self._save_local_models()
+        
+        self._record_checksum(model_name, path, self._calculate_sha256(path))
+        
+        logger.success(f"Registered local model {model_name} from {path}")
+        return True
+    
+    def _model_path(self, model_name: str) -> Path:
+        """Where a model's file lives (local models stay where they were registered)"""
+        model_info = self.MODELS[model_name]
+        if "path" in model_info:
+            return Path(model_info["path"])
+        return self.models_dir / model_info["filename"]
+    
     def _calculate_sha256(self, file_path: Path) -> str:
         """Calculate SHA256 hash of file"""
-        sha256_hash = hashlib.sha256()
+        return self._calculate_hash(file_path, "sha256")
+    
+    def _calculate_hash(self, file_path: Path, algorithm: str) -> str:
+        """Calculate a hash of file (sha256 or md5)"""
+        file_hash = hashlib.new(algorithm)
         
         with open(file_path, "rb") as f:
             for chunk in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(chunk)
+                file_hash.update(chunk)
         
-        return sha256_hash.hexdigest()
+        return file_hash.hexdigest()
     
     def verify_model(self, model_name: str) -> bool:
         """
@@ -83,28 +280,38 @@ class ModelStore:
             return False
         
         model_info = self.MODELS[model_name]
-        model_path = self.models_dir / model_info["filename"]
+        model_path = self._model_path(model_name)
         
         if not model_path.exists():
             logger.info(f"Model {model_name} not found at {model_path}")
             return False
         
+        # Locally built and registered models are checked against the
+        # checksum recorded when they were built or registered
+        algorithm = "sha256"
+        if "source" in model_info or "path" in model_info:
+            expected_checksum = self.verified_checksums.get(model_name)
+            if expected_checksum is None:
+                logger.info(f"Model {model_name} has no recorded checksum")
+                return False
+        else:
+            # rembg publishes md5 checksums for its models
+            if "sha256" not in model_info:
+                algorithm = "md5"
+            expected_checksum = model_info[algorithm]
+        
         # Check if already verified
-        if model_name in self.verified_checksums:
-            stored_checksum = self.verified_checksums[model_name]
-            if stored_checksum == model_info["sha256"]:
-                logger.info(f"Model {model_name} already verified")
-                return True
+        if self._is_unchanged(model_name, model_path, expected_checksum):
+            logger.info(f"Model {model_name} already verified")
+            return True
         
         # Verify checksum
         logger.info(f"Verifying {model_name} checksum...")
-        actual_checksum = self._calculate_sha256(model_path)
-        expected_checksum = model_info["sha256"]
+        actual_checksum = self._calculate_hash(model_path, algorithm)
         
         if actual_checksum == expected_checksum:
             logger.success(f"Model {model_name} verified successfully")
-            self.verified_checksums[model_name] = actual_checksum
-            self._save_checksums()
+            self._record_checksum(model_name, model_path, actual_checksum)
             return True
         else:
             logger.error(f"Checksum mismatch for {model_name}")
@@ -130,6 +337,10 @@ class ModelStore:
         model_info = self.MODELS[model_name]
         model_path = self.models_dir / model_info["filename"]
         
+        if "url" not in model_info:
+            logger.error(f"Model {model_name} is built or registered locally, not downloaded")
+            return False
+        
         # Check if already exists and valid
         if self.verify_model(model_name):
             logger.info(f"Model {model_name} already exists and is valid")
@@ -164,7 +375,7 @@ class ModelStore:
                 logger.error("Downloaded file failed verification")
                 model_path.unlink()
                 return False
-                
+        
         except Exception as e:
             logger.error(f"Failed to download {model_name}: {e}")
             if model_path.exists():
@@ -186,15 +397,180 @@ class ModelStore:
             return None
         
         model_info = self.MODELS[model_name]
-        model_path = self.models_dir / model_info["filename"]
+        model_path = self._model_path(model_name)
         
-        # Verify or download
+        # Verify, or build / download
         if not self.verify_model(model_name):
+            if "path" in model_info:
+                logger.error(f"Local model {model_name} is missing or has changed")
+                return None
+            
+            if model_info.get("quantization"):
+                logger.info(f"Model {model_name} needs to be built")
+                return self.quantize(model_info["source"])
+            
             logger.info(f"Model {model_name} needs to be downloaded")
             if not self.download_model(model_name):
                 return None
         
         return model_path
+    
+    def quantize(self, model_name: str) -> Optional[Path]:
+        """
+        Build the INT8 variant of a model from its verified fp32 file
+        
+        Uses ONNX Runtime's dynamic quantization: weights are stored as
+        uint8 and activations are quantized on the fly, so no calibration
+        set is needed. Requires the onnx package.
+        
+        Args:
+            model_name: Name of the fp32 source model
+        
+        Returns:
+            Path to the quantized model, or None if it could not be built
+        """
+        variant = f"{model_name}_int8"
+        variant_info = self.MODELS.get(variant)
+        if variant_info is None or variant_info.get("source") != model_name:
+            logger.error(f"No INT8 variant registered for {model_name}")
+            return None
+        
+        source_path = self.get_model_path(model_name)
+        if source_path is None:
+            return None
+        
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError as e:
+            logger.error(f"Quantization requires the onnx package: {e}")
+            return None
+        
+        model_path = self.models_dir / variant_info["filename"]
+        temp_path = model_path.with_name(model_path.name + ".tmp")
+        
+        logger.info(f"Quantizing {model_name} to INT8...")
+        
+        try:
+            # ONNX Runtime's CPU ConvInteger kernel only takes uint8 weights
+            quantize_dynamic(str(source_path), str(temp_path), weight_type=QuantType.QUInt8)
+            temp_path.replace(model_path)
+        except Exception as e:
+            logger.error(f"Failed to quantize {model_name}: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+            return None
+        
+        self._record_checksum(variant, model_path, self._calculate_sha256(model_path))
+        
+        size_mb = model_path.stat().st_size / (1024 * 1024)
+        logger.success(f"Built {variant} ({size_mb:.0f} MB)")
+        
+        return model_path
+
+    
+    def optimized_artifact_key(self, model_name: str, providers: Optional[list] = None) -> Optional[str]:
+        """
+        Key of a model's optimized artifact
+        
+        An artifact is only valid for the model file it was built from and
+        for the ONNX Runtime version, optimization level, execution
+        providers and CPU it was built with; any change gives a new key.
+        
+        Args:
+            model_name: Name of the model
+            providers: Execution providers (default: CPU only)
+        
+        Returns:
+            Key, or None if the model has not been verified
+        """
+        import onnxruntime as ort
+        
+        checksum = self.verified_checksums.get(model_name)
+        if checksum is None:
+            return None
+        
+        parts = [
+            checksum,
+            ort.__version__,
+            "ORT_ENABLE_ALL",
+            ",".join(providers or ["CPUExecutionProvider"]),
+            platform.machine(),
+            platform.processor()
+        ]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:16]
+    
+    def get_optimized_model_path(self, model_name: str, providers: Optional[list] = None) -> Optional[Path]:
+        """
+        Get the graph-optimized artifact of a model, building it if necessary
+        
+        ONNX Runtime's graph optimizations are run once and the result is
+        saved next to the model, so later sessions can load it with
+        optimizations disabled instead of re-running them. Artifacts built
+        for another model file, runtime version or machine are replaced.
+        
+        Args:
+            model_name: Name of the model
+            providers: Execution providers (default: CPU only)
+        
+        Returns:
+            Path to the optimized model, or None if it could not be built
+        """
+        model_path = self.get_model_path(model_name)
+        if model_path is None:
+            return None
+        
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            logger.error(f"Optimizing models requires onnxruntime: {e}")
+            return None
+        
+        key = self.optimized_artifact_key(model_name, providers)
+        if key is None:
+            return None
+        
+        optimized_dir = self.models_dir / "optimized"
+        optimized_dir.mkdir(parents=True, exist_ok=True)
+        stem = Path(self.MODELS[model_name]["filename"]).stem
+        artifact_path = optimized_dir / f"{stem}.{key}.onnx"
+        
+        if artifact_path.exists():
+            return artifact_path
+        
+        # Artifacts of older model files, runtimes or machines are stale now
+        for stale in optimized_dir.glob(f"{stem}.*.onnx"):
+            if len(stale.suffixes) == 2 and stale != artifact_path:
+                logger.info(f"Removing stale optimized model {stale.name}")
+                stale.unlink(missing_ok=True)
+        
+        # Unique per process: workers may build the same artifact at once
+        temp_path = artifact_path.with_name(f"{artifact_path.name}.{os.getpid()}.tmp")
+        
+        logger.info(f"Optimizing {model_name} for this machine...")
+        
+        try:
+            sess_opts = ort.SessionOptions()
+            sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            sess_opts.optimized_model_filepath = str(temp_path)
+            ort.InferenceSession(
+                str(model_path),
+                sess_options=sess_opts,
+                providers=providers or ["CPUExecutionProvider"]
+            )
+            temp_path.replace(artifact_path)
+        except Exception as e:
+            logger.error(f"Failed to optimize {model_name}: {e}")
+            if temp_path.exists():
+                temp_path.unlink()
+            return None
+        
+        logger.success(f"Saved optimized {model_name} as {artifact_path.name}")
+        return artifact_path
+    
+    def discard_optimized_model(self, artifact_path: Path) -> None:
+        """Delete an optimized artifact that failed to load, so it is rebuilt"""
+        logger.warning(f"Discarding optimized model {artifact_path.name}")
+        artifact_path.unlink(missing_ok=True)
 
 
 # Singleton instance
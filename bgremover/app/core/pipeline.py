@@ -1,9 +1,11 @@
 """Background removal pipeline"""
 
 from pathlib import Path
-from typing import Optional, Tuple
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
 import numpy as np
-from PIL import Image
+from PIL import Image, ImageOps
 import os
 import sys
 from loguru import logger
@@ -12,7 +14,12 @@ from loguru import logger
 # Disable alpha matting features if they fail to load
 ALPHA_MATTING_AVAILABLE = False
 try:
-    from rembg import remove, new_session
+    # Imported first: it prepares numba for use from worker threads
+    from bgremover.app.core.matting import alpha_matting_cutout_tiled, guided_alpha_matte, configure_numba_cache
+    # rembg imports pymatting, which compiles its kernels unless numba finds
+    # them in its cache; keep that cache where every process can reuse it
+    configure_numba_cache()
+    import rembg
     # Test if alpha matting is actually available by checking for pymatting
     try:
         import pymatting
@@ -25,24 +32,86 @@ except Exception as e:
     raise
 
 from bgremover.app.core.model_store import get_model_store
-from bgremover.app.core.settings import OutputSettings, QualitySettings
+from bgremover.app.core.model_registry import get_model_registry
+from bgremover.app.core.settings import OutputSettings, QualitySettings, DEFAULT_BATCH_SIZE, get_settings
 from bgremover.app.core.image_ops import ImageOperations
+from bgremover.app.core.postprocess import PostProcessor
+from bgremover.app.core.render_plan import RenderPlan
+from bgremover.app.core.buffer_pool import BufferLease, BufferPool, get_buffer_pool
+from bgremover.app.core.mask_cache import MaskCache, get_mask_cache, DEFAULT_CACHE_DIR
+from bgremover.app.core.session_manager import get_session_manager
+
+
+# Input normalization (mean, std, size) of the rembg sessions whose ONNX
+# graph has a dynamic batch axis. Models listed here can be run on a stack
+# of images in a single session call; any other model is run one image at
+# a time through the session's own predict().
+BATCH_NORMALIZATION = {
+    "u2net": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2net_int8": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2netp": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "u2net_human_seg": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+    "silueta": ((0.485, 0.456, 0.406), (0.229, 0.224, 0.225), (320, 320)),
+}
+
+
+def batch_normalization(model_name: str) -> Optional[tuple]:
+    """Input normalization for batched runs of a model, or None if it has none"""
+    normalization = BATCH_NORMALIZATION.get(model_name)
+    if normalization is None:
+        # Registered local files run through rembg's custom u2net session
+        info = get_model_store().MODELS.get(model_name, {})
+        if "path" in info and info.get("family") == "u2net":
+            normalization = BATCH_NORMALIZATION["u2net"]
+    return normalization
 
 
 class BackgroundRemovalPipeline:
     """Main pipeline for background removal"""
     
-    def __init__(self, model_name: str = "u2net"):
+    def __init__(
+        self,
+        model_name: str = "u2net",
+        mask_cache: Optional[MaskCache] = None,
+        warmup: bool = False,
+        buffer_pool: Optional[BufferPool] = None
+    ):
         """
         Initialize pipeline
         
         Args:
             model_name: Name of the model to use
+            mask_cache: Optional on-disk cache of predicted and refined masks
+            warmup: Run a synthetic inference now so the first real image
+                does not pay for graph optimization and allocator growth
+            buffer_pool: Pool the post-processing buffers are borrowed from
+                (default: shared pool)
         """
         self.model_name = model_name
         self.session = None
         self.image_ops = ImageOperations()
-        self._initialize_model()
+        self.postprocessor = PostProcessor(self.image_ops)
+        self.mask_cache = mask_cache
+        self.buffer_pool = buffer_pool or get_buffer_pool()
+        self.normalization = batch_normalization(model_name)
+        self._batch_supported = self.normalization is not None
+        
+        # Readiness and latency statistics
+        self._ready = threading.Event()
+        self._stats_lock = threading.Lock()
+        self.cold_start_seconds: Optional[float] = None
+        self._steady_seconds = 0.0
+        self._steady_images = 0
+        
+        # Matting latency per method ("alpha matting" or "guided matting");
+        # the first alpha-matted image also pays for loading the kernels
+        self.matting_first_seconds: Dict[str, float] = {}
+        self._matting_seconds: Dict[str, float] = {}
+        self._matting_images: Dict[str, int] = {}
+        
+        if self._initialize_model() and warmup:
+            self.warmup()
+        self._ready.set()
     
     def _initialize_model(self) -> bool:
         """Initialize the ML model"""
@@ -57,22 +126,104 @@ class BackgroundRemovalPipeline:
                 logger.error("Failed to get model path")
                 return False
             
-            # Create rembg session
-            self.session = new_session(self.model_name)
+            # Get rembg session (shared per model, sized to the thread budget),
+            # loaded from the model store's verified file rather than rembg's
+            # own copy under U2NET_HOME
+            self.session = get_session_manager().get_session(
+                self.model_name,
+                model_path,
+                family=model_store.MODELS[self.model_name].get("family", "u2net")
+            )
             logger.success(f"Model {self.model_name} initialized successfully")
             
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to initialize model: {e}")
             return False
     
+    def warmup(self) -> Optional[float]:
+        """
+        Run one inference on a synthetic image
+        
+        The first session run pays for ONNX Runtime's graph optimization and
+        memory arena growth; doing it here keeps that cost out of the first
+        real image. The run is recorded as the cold-start latency.
+        
+        Returns:
+            Warm-up time in seconds, or None if the model is not initialized
+        """
+        if self.session is None:
+            return None
+        
+        _, _, size = self.normalization or (None, None, (320, 320))
+        gradient = np.linspace(0, 255, size[0], dtype=np.uint8)
+        image = Image.fromarray(np.dstack([np.tile(gradient, (size[1], 1))] * 3))
+        
+        try:
+            # The first run grows ONNX Runtime's memory arena; count it
+            # towards the session's size in the session cache
+            with get_session_manager().track_memory(self.model_name):
+                self._infer([image])
+        except Exception as e:
+            logger.warning(f"Model warm-up failed: {e}")
+            return None
+        
+        return self.cold_start_seconds
+    
+    def is_ready(self) -> bool:
+        """Check if the model is initialized and warmed up"""
+        return self._ready.is_set() and self.session is not None
+    
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until initialization and warm-up have finished
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+        
+        Returns:
+            True if the model is ready
+        """
+        self._ready.wait(timeout)
+        return self.is_ready()
+    
+    def steady_state_latency(self) -> Optional[float]:
+        """Average inference seconds per image after the cold start, if any ran"""
+        with self._stats_lock:
+            if self._steady_images == 0:
+                return None
+            return self._steady_seconds / self._steady_images
+    
+    def log_latency_summary(self) -> None:
+        """Log cold-start and steady-state inference latency, and matting latency if any ran"""
+        steady = self.steady_state_latency()
+        
+        if self.cold_start_seconds is not None:
+            summary = f"Inference latency: cold start {self.cold_start_seconds:.3f}s"
+            if steady is not None:
+                summary += f", steady state {steady:.3f}s/image over {self._steady_images} image(s)"
+            logger.info(summary)
+        
+        with self._stats_lock:
+            matting = [
+                (method, first, self._matting_seconds.get(method, 0.0), self._matting_images.get(method, 0))
+                for method, first in self.matting_first_seconds.items()
+            ]
+        
+        for method, first, seconds, images in matting:
+            summary = f"{method.capitalize()} latency: first image {first:.3f}s"
+            if images:
+                summary += f", steady state {seconds / images:.3f}s/image over {images} image(s)"
+            logger.info(summary)
+    
     def process_image(
         self,
         input_path: Path,
         output_path: Path,
         output_settings: OutputSettings,
-        quality_settings: QualitySettings
+        quality_settings: QualitySettings,
+        plan: Optional[RenderPlan] = None
     ) -> bool:
         """
         Process a single image
@@ -82,153 +233,419 @@ class BackgroundRemovalPipeline:
             output_path: Path to save output
             output_settings: Output configuration
             quality_settings: Quality configuration
+            plan: Settings already compiled with RenderPlan.compile()
         
         Returns:
             True if successful, False otherwise
         """
         try:
+            if plan is None:
+                plan = RenderPlan.compile(output_settings, quality_settings)
+            
             logger.info(f"Processing: {input_path.name}")
             
             # Load image
-            input_image = Image.open(input_path)
-            
-            # Convert to RGB if needed
-            if input_image.mode not in ("RGB", "RGBA"):
-                input_image = input_image.convert("RGB")
-            
-            # Remove background
-            # Only use alpha matting if available and enabled
-            use_alpha_matting = ALPHA_MATTING_AVAILABLE and quality_settings.alpha_matting
-            
-            try:
-                if use_alpha_matting:
-                    output_image = remove(
-                        input_image,
-                        session=self.session,
-                        alpha_matting=True,
-                        alpha_matting_foreground_threshold=quality_settings.alpha_matting_foreground_threshold,
-                        alpha_matting_background_threshold=quality_settings.alpha_matting_background_threshold,
-                    )
-                else:
-                    output_image = remove(
-                        input_image,
-                        session=self.session,
-                    )
-            except Exception as e:
-                # Fallback: if alpha matting fails, try without it
-                if "alpha matting" in str(e).lower() or "pymatting" in str(e).lower():
-                    logger.warning(f"Alpha matting not available, using basic removal: {e}")
-                    output_image = remove(
-                        input_image,
-                        session=self.session,
-                    )
-                else:
-                    raise
-            
-            # Ensure RGBA
-            if output_image.mode != "RGBA":
-                output_image = output_image.convert("RGBA")
-            
-            # Apply mask refinement
-            if quality_settings.remove_small_objects or quality_settings.smooth_edges:
-                output_image = self._refine_mask(output_image, quality_settings)
+            input_image = self.load_image(input_path)
             
-            # Apply feathering
-            if output_settings.feather_edges > 0:
-                alpha = output_image.split()[-1]
-                output_image = self.image_ops.apply_feather(
-                    output_image,
-                    alpha,
-                    output_settings.feather_edges
+            # Predict mask and composite the output
+            cache_keys = self.cache_keys_for([input_image])
+            mask = self.predict_masks([input_image], cache_keys)[0]
+            with self.buffer_pool.lease() as lease:
+                output_image = self.render(
+                    input_image,
+                    mask,
+                    output_settings,
+                    quality_settings,
+                    cache_key=cache_keys[0],
+                    plan=plan,
+                    lease=lease
                 )
-            
-            # Apply background
-            output_image = self._apply_background(output_image, output_settings)
-            
-            # Resize and position if needed
-            if output_settings.canvas_width and output_settings.canvas_height:
-                target_size = (output_settings.canvas_width, output_settings.canvas_height)
-                
-                # Get background color for padding
-                if output_settings.background_type == "transparent":
-                    bg_color = (255, 255, 255, 0)
-                elif output_settings.background_type == "color":
-                    hex_color = output_settings.background_color.lstrip("#")
-                    r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-                    bg_color = (r, g, b, 255)
-                else:
-                    bg_color = (255, 255, 255, 255)
                 
-                output_image = self.image_ops.resize_with_padding(
-                    output_image,
-                    target_size,
-                    center=output_settings.center_object,
-                    margin=output_settings.margin,
-                    bg_color=bg_color
-                )
-            
-            # Save output
-            self._save_image(output_image, output_path, output_settings)
+                # Save output; the image may share the leased buffers
+                self.save_image(output_image, output_path, plan.output_settings)
             
             logger.success(f"Saved: {output_path.name}")
             return True
-            
+        
         except Exception as e:
             logger.error(f"Failed to process {input_path.name}: {e}")
             return False
     
-    def _refine_mask(
+    def process_batch(
         self,
-        image: Image.Image,
-        quality_settings: QualitySettings
-    ) -> Image.Image:
-        """Refine the alpha mask"""
-        # Extract alpha channel
-        alpha = np.array(image.split()[-1])
+        input_paths: List[Path],
+        output_paths: List[Path],
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        plan: Optional[RenderPlan] = None
+    ) -> List[bool]:
+        """
+        Process several images, running inference on stacked batches
         
-        # Apply morphological refinement
-        alpha_refined = self.image_ops.refine_mask_morphology(
-            alpha,
-            remove_small_objects=quality_settings.remove_small_objects,
-            min_object_size=quality_settings.min_object_size,
-            smooth_edges=quality_settings.smooth_edges,
-            kernel_size=quality_settings.edge_smooth_kernel
+        Args:
+            input_paths: Paths to input images
+            output_paths: Paths to save outputs (same order as input_paths)
+            output_settings: Output configuration
+            quality_settings: Quality configuration
+            batch_size: Number of images per session run
+            plan: Settings already compiled with RenderPlan.compile()
+        
+        Returns:
+            Success flag for every input, in input order
+        """
+        if len(input_paths) != len(output_paths):
+            raise ValueError("input_paths and output_paths must have the same length")
+        
+        if plan is None:
+            plan = RenderPlan.compile(output_settings, quality_settings)
+        
+        results = [False] * len(input_paths)
+        batch_size = max(1, batch_size)
+        
+        for start in range(0, len(input_paths), batch_size):
+            indices = list(range(start, min(start + batch_size, len(input_paths))))
+            
+            # Decode
+            images = {}
+            for index in indices:
+                try:
+                    images[index] = self.load_image(input_paths[index])
+                except Exception as e:
+                    logger.error(f"Failed to load {input_paths[index].name}: {e}")
+            
+            if not images:
+                continue
+            
+            # Inference
+            try:
+                cache_keys = self.cache_keys_for(list(images.values()))
+                masks = self.predict_masks(list(images.values()), cache_keys)
+            except Exception as e:
+                logger.error(f"Batch inference failed: {e}")
+                continue
+            
+            # Cutout, post-process and save
+            for index, mask, cache_key in zip(images.keys(), masks, cache_keys):
+                input_path = input_paths[index]
+                output_path = output_paths[index]
+                try:
+                    with self.buffer_pool.lease() as lease:
+                        output_image = self.render(
+                            images[index],
+                            mask,
+                            output_settings,
+                            quality_settings,
+                            cache_key=cache_key,
+                            plan=plan,
+                            lease=lease
+                        )
+                        self.save_image(output_image, output_path, plan.output_settings)
+                    logger.success(f"Saved: {output_path.name}")
+                    results[index] = True
+                except Exception as e:
+                    logger.error(f"Failed to process {input_path.name}: {e}")
+        
+        return results
+    
+    def predict_mask(self, image: Image.Image) -> np.ndarray:
+        """
+        Predict the foreground mask of a single image
+        
+        Args:
+            image: RGB input image
+        
+        Returns:
+            uint8 mask (0-255) at the image's size
+        """
+        return self.predict_masks([image])[0]
+    
+    def predict_masks(
+        self,
+        images: List[Image.Image],
+        cache_keys: Optional[List[Optional[str]]] = None
+    ) -> List[np.ndarray]:
+        """
+        Predict foreground masks for several images with one session run
+        
+        Falls back to per-image prediction for models without a batch axis.
+        Masks found in the mask cache are not predicted again.
+        
+        Args:
+            images: RGB input images
+            cache_keys: Mask cache keys of the images (computed if omitted)
+        
+        Returns:
+            uint8 masks (0-255), one per image, at each image's size
+        """
+        if cache_keys is None:
+            cache_keys = self.cache_keys_for(images)
+        
+        masks: List[Optional[np.ndarray]] = [
+            self.mask_cache.get(key) if self.mask_cache is not None and key else None
+            for key in cache_keys
+        ]
+        
+        missing = [i for i, mask in enumerate(masks) if mask is None]
+        if not missing:
+            return masks
+        
+        if self.session is None:
+            raise RuntimeError(f"Model {self.model_name} is not initialized")
+        
+        predicted = self._infer([images[i] for i in missing])
+        
+        for i, mask in zip(missing, predicted):
+            masks[i] = mask
+            if self.mask_cache is not None and cache_keys[i]:
+                self.mask_cache.put(cache_keys[i], mask)
+        
+        return masks
+    
+    def _infer(self, images: List[Image.Image]) -> List[np.ndarray]:
+        """Run the model on images and record the latency"""
+        start = time.perf_counter()
+        
+        predicted = None
+        if self._batch_supported and len(images) > 1:
+            try:
+                predicted = self._predict_masks_batched(images)
+            except Exception as e:
+                logger.warning(
+                    f"Batched inference not supported by {self.model_name}, "
+                    f"falling back to single images: {e}"
+                )
+                self._batch_supported = False
+        
+        if predicted is None:
+            predicted = [np.array(self.session.predict(image)[0]) for image in images]
+        
+        self._record_latency(time.perf_counter() - start, len(images))
+        return predicted
+    
+    def _record_latency(self, seconds: float, count: int) -> None:
+        """Count the first run as the cold start and the rest as steady state"""
+        with self._stats_lock:
+            if self.cold_start_seconds is None:
+                self.cold_start_seconds = seconds
+                cold = True
+            else:
+                self._steady_seconds += seconds
+                self._steady_images += count
+                average = self._steady_seconds / self._steady_images
+                cold = False
+        
+        if cold:
+            logger.info(f"Cold-start inference ({self.model_name}): {seconds:.3f}s for {count} image(s)")
+        else:
+            logger.debug(
+                f"Inference: {seconds / count:.3f}s/image "
+                f"(steady-state average {average:.3f}s/image)"
+            )
+    
+    def _record_matting_latency(self, method: str, seconds: float) -> None:
+        """Count the first image of a matting method apart from the rest"""
+        with self._stats_lock:
+            first = method not in self.matting_first_seconds
+            if first:
+                self.matting_first_seconds[method] = seconds
+            else:
+                self._matting_seconds[method] = self._matting_seconds.get(method, 0.0) + seconds
+                self._matting_images[method] = self._matting_images.get(method, 0) + 1
+        
+        if first:
+            logger.info(f"First image through {method}: {seconds:.3f}s")
+    
+    def cache_keys_for(self, images: List[Image.Image]) -> List[Optional[str]]:
+        """Compute mask cache keys, or None for each image if caching is off"""
+        if self.mask_cache is None:
+            return [None] * len(images)
+        
+        return [
+            MaskCache.make_key(image, self.model_name, normalization=self.normalization)
+            for image in images
+        ]
+    
+    def _predict_masks_batched(self, images: List[Image.Image]) -> List[np.ndarray]:
+        """Run the session once on a stacked tensor of all images"""
+        mean, std, size = self.normalization
+        input_name = self.session.inner_session.get_inputs()[0].name
+        
+        batch = np.concatenate(
+            [self.session.normalize(image, mean, std, size)[input_name] for image in images],
+            axis=0
         )
         
-        # Replace alpha channel
-        result = image.copy()
-        result.putalpha(Image.fromarray(alpha_refined))
+        ort_outs = self.session.inner_session.run(None, {input_name: batch})
+        preds = ort_outs[0][:, 0, :, :]
+        
+        masks = []
+        for pred, image in zip(preds, images):
+            # Normalize each prediction on its own, as a batch-of-one run would
+            ma = np.max(pred)
+            mi = np.min(pred)
+            pred = (pred - mi) / max(ma - mi, 1e-6)
+            
+            mask = Image.fromarray((pred.clip(0, 1) * 255).astype(np.uint8))
+            masks.append(np.array(mask.resize(image.size, Image.Resampling.LANCZOS)))
         
-        return result
+        return masks
     
-    def _apply_background(
+    def load_image(self, input_path: Path) -> Image.Image:
+        """Load an image, apply EXIF orientation and convert to RGB(A)"""
+        image = Image.open(input_path)
+        image = ImageOps.exif_transpose(image)
+        
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        
+        return image
+    
+    def _cutout(
         self,
         image: Image.Image,
-        output_settings: OutputSettings
-    ) -> Image.Image:
-        """Apply background based on settings"""
-        if output_settings.background_type == "transparent":
-            # Keep transparent
-            return image
-        
-        elif output_settings.background_type == "color":
-            # Solid color background
-            hex_color = output_settings.background_color.lstrip("#")
-            r, g, b = tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-            return self.image_ops.apply_solid_background(image, (r, g, b))
-        
-        elif output_settings.background_type == "image" and output_settings.background_image:
-            # Image background
+        mask: np.ndarray,
+        plan: RenderPlan,
+        lease: Optional[BufferLease] = None
+    ) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        """
+        Bring an image into an RGBA buffer for post-processing
+        
+        Returns:
+            The buffer, and the mask to cut it out with (None if alpha
+            matting already did)
+        """
+        quality_settings = plan.quality_settings
+        start = time.perf_counter()
+        
+        if plan.matting == "guided":
+            buffer = self.postprocessor.to_buffer(image, lease)
+            buffer[:, :, 3] = guided_alpha_matte(
+                buffer,
+                mask,
+                quality_settings.alpha_matting_foreground_threshold,
+                quality_settings.alpha_matting_background_threshold,
+                10,
+                radius=quality_settings.guided_radius,
+                eps=quality_settings.guided_eps
+            )
+            self._record_matting_latency("guided matting", time.perf_counter() - start)
+            return buffer, None
+        
+        if ALPHA_MATTING_AVAILABLE and plan.matting == "closed_form":
             try:
-                bg_image = Image.open(output_settings.background_image)
-                return self.image_ops.apply_image_background(image, bg_image, resize_bg=True)
+                # Solved only along the object boundary, tile by tile, within
+                # this worker's share of the thread budget
+                matted = alpha_matting_cutout_tiled(
+                    image,
+                    mask,
+                    quality_settings.alpha_matting_foreground_threshold,
+                    quality_settings.alpha_matting_background_threshold,
+                    10,
+                    max_workers=get_session_manager().layout.opencv_threads
+                )
+                self._record_matting_latency("alpha matting", time.perf_counter() - start)
+                return self.postprocessor.to_buffer(matted, lease), None
             except Exception as e:
-                logger.error(f"Failed to load background image: {e}")
-                return image
+                logger.warning(f"Alpha matting failed, using basic removal: {e}")
         
-        return image
+        return self.postprocessor.to_buffer(image, lease), mask
     
-    def _save_image(
+    def render(
+        self,
+        image: Image.Image,
+        mask: np.ndarray,
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        cache_key: Optional[str] = None,
+        plan: Optional[RenderPlan] = None,
+        lease: Optional[BufferLease] = None
+    ) -> Image.Image:
+        """
+        Composite an output image from an input image and its predicted mask
+        
+        Rendering does not touch the model, so one mask can be rendered with
+        any number of output/quality settings. All stages run in place on one
+        RGBA buffer (see PostProcessor).
+        
+        Args:
+            image: Input image the mask was predicted for
+            mask: uint8 mask (0-255) from predict_mask()
+            output_settings: Output configuration
+            quality_settings: Quality configuration
+            cache_key: Mask cache key of the image, to reuse the refined mask
+            plan: Settings already compiled with RenderPlan.compile(); batches
+                compile once instead of once per image
+            lease: Borrow the full-size buffers from the buffer pool through
+                this lease; the returned image may share them, so release it
+                only after saving (None = allocate them)
+        
+        Returns:
+            Rendered image, ready to save
+        """
+        if mask.shape[:2] != (image.height, image.width):
+            raise ValueError(
+                f"Mask shape {mask.shape[:2]} does not match image size {image.size}"
+            )
+        
+        if plan is None:
+            plan = RenderPlan.compile(output_settings, quality_settings)
+        quality_settings = plan.quality_settings
+        
+        def refine(alpha: np.ndarray) -> np.ndarray:
+            refined_key = None
+            if self.mask_cache is not None and cache_key:
+                refined_key = MaskCache.refined_key(cache_key, quality_settings)
+                refined = self.mask_cache.get(refined_key)
+                if refined is not None:
+                    return refined
+            
+            # The alpha is a scratch copy, so it can be refined in place
+            refined = self._refine_mask(alpha, quality_settings, guide=image, kernel=plan.smooth_kernel, out=alpha)
+            if refined_key:
+                self.mask_cache.put(refined_key, refined)
+            return refined
+        
+        buffer, cutout_mask = self._cutout(image, mask, plan, lease)
+        
+        return self.postprocessor.execute(buffer, plan, mask=cutout_mask, refine=refine, lease=lease)
+    
+    def _refine_mask(
+        self,
+        mask: np.ndarray,
+        quality_settings: QualitySettings,
+        guide: Optional[Image.Image] = None,
+        kernel: Optional[np.ndarray] = None,
+        out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Refine the alpha mask, at full or proxy resolution (out only applies to full resolution)"""
+        if quality_settings.refine_mode == "proxy" and guide is not None:
+            # Only the guide's luminance is used; converting is cheaper than a full copy
+            return self.image_ops.refine_mask_proxy(
+                mask,
+                np.asarray(guide.convert("L")),
+                proxy_size=quality_settings.refine_proxy_size,
+                remove_small_objects=quality_settings.remove_small_objects,
+                min_object_size=quality_settings.min_object_size,
+                smooth_edges=quality_settings.smooth_edges,
+                kernel_size=quality_settings.edge_smooth_kernel,
+                fill_holes=quality_settings.fill_holes,
+                max_hole_size=quality_settings.max_hole_size
+            )
+        
+        return self.image_ops.refine_mask_morphology(
+            mask,
+            remove_small_objects=quality_settings.remove_small_objects,
+            min_object_size=quality_settings.min_object_size,
+            smooth_edges=quality_settings.smooth_edges,
+            kernel_size=quality_settings.edge_smooth_kernel,
+            fill_holes=quality_settings.fill_holes,
+            max_hole_size=quality_settings.max_hole_size,
+            kernel=kernel,
+            out=out
+        )
+    
+    def save_image(
         self,
         image: Image.Image,
         output_path: Path,
@@ -249,12 +666,9 @@ class BackgroundRemovalPipeline:
             )
         
         elif output_settings.format == "jpg":
-            # Convert to RGB for JPEG
+            # render() already composites JPEG output; this covers images from elsewhere
             if image.mode == "RGBA":
-                # Apply white background for JPEG
-                bg = Image.new("RGB", image.size, (255, 255, 255))
-                bg.paste(image, (0, 0), image)
-                image = bg
+                image = self.image_ops.apply_solid_background(image, (255, 255, 255))
             
             image.save(
                 output_path,
@@ -266,11 +680,82 @@ class BackgroundRemovalPipeline:
 
 # Singleton instance
 _pipeline_instance: Optional[BackgroundRemovalPipeline] = None
+_pipeline_lock = threading.Lock()
+
+
+def _cache_dir_of(pipeline: BackgroundRemovalPipeline) -> Optional[Path]:
+    """Get the directory of a pipeline's mask cache (None if it has none)"""
+    return pipeline.mask_cache.cache_dir if pipeline.mask_cache is not None else None
+
 
+def _open_mask_cache(cache_dir: Optional[Path]) -> Optional[MaskCache]:
+    """Open the mask cache in a directory, sharing the default one (None = no cache)"""
+    if cache_dir is None:
+        return None
+    if cache_dir == DEFAULT_CACHE_DIR:
+        return get_mask_cache()
+    return MaskCache(cache_dir)
 
-def get_pipeline() -> BackgroundRemovalPipeline:
-    """Get singleton pipeline instance"""
+
+def get_pipeline(
+    model_name: Optional[str] = None,
+    cache_dir: Optional[Path] = DEFAULT_CACHE_DIR
+) -> BackgroundRemovalPipeline:
+    """
+    Get singleton pipeline instance
+    
+    Args:
+        model_name: Model to use (default: the model selected in settings).
+            Asking for a different model replaces the instance.
+        cache_dir: Mask cache directory (None disables the cache). The
+            cache is only opened, and its directory scanned, when enabled;
+            asking for a different one replaces the instance's cache.
+    
+    Returns:
+        Shared pipeline
+    """
     global _pipeline_instance
-    if _pipeline_instance is None:
-        _pipeline_instance = BackgroundRemovalPipeline()
-    return _pipeline_instance
+    if model_name is None:
+        model_name = get_settings().model_name
+    cache_dir = Path(cache_dir) if cache_dir is not None else None
+    
+    pipeline = _pipeline_instance
+    if pipeline is None or pipeline.model_name != model_name or _cache_dir_of(pipeline) != cache_dir:
+        with _pipeline_lock:
+            # Workers may race here; only the first one builds the pipeline
+            if _pipeline_instance is None or _pipeline_instance.model_name != model_name:
+                _pipeline_instance = BackgroundRemovalPipeline(
+                    model_name,
+                    mask_cache=_open_mask_cache(cache_dir),
+                    warmup=True
+                )
+            elif _cache_dir_of(_pipeline_instance) != cache_dir:
+                _pipeline_instance.mask_cache = _open_mask_cache(cache_dir)
+            pipeline = _pipeline_instance
+    return pipeline
+
+
+def select_model_for_budget(
+    megapixels: List[float],
+    latency_budget_ms: Optional[float] = None,
+    memory_budget_mb: Optional[float] = None
+) -> str:
+    """
+    Pick the best model that fits a per-batch budget
+    
+    Latency is estimated for one worker's share of the thread budget.
+    
+    Args:
+        megapixels: Size of every image in a typical batch, in megapixels
+        latency_budget_ms: Maximum estimated inference time for the batch
+        memory_budget_mb: Maximum peak resident memory of the model
+    
+    Returns:
+        Name of the model to pass to get_pipeline()
+    """
+    return get_model_registry().select(
+        megapixels,
+        latency_budget_ms=latency_budget_ms,
+        memory_budget_mb=memory_budget_mb,
+        threads=get_session_manager().layout.intra_op_threads
+    )
@@ -0,0 +1,268 @@
+"""Fused post-processing on a single RGBA buffer"""
+
+from typing import Callable, Optional, Tuple, Union
+import cv2
+import numpy as np
+from PIL import Image
+from loguru import logger
+
+from bgremover.app.core.settings import OutputSettings, QualitySettings
+from bgremover.app.core.image_ops import ImageOperations
+from bgremover.app.core.backgrounds import BackgroundCache, get_background_cache
+from bgremover.app.core.render_plan import RenderPlan, needs_refinement, parse_hex_color
+from bgremover.app.core.buffer_pool import BufferLease, borrow
+
+
+# Rows per strip for stages that need temporaries; keeps them small
+STRIP_ROWS = 256
+
+
+class PostProcessor:
+    """
+    Runs cutout, refinement, feathering and background compositing in place
+    
+    The image enters as one RGBA NumPy buffer and leaves as one PIL image.
+    Every stage in between writes into that buffer, strip by strip where it
+    needs temporaries, instead of building its own full-size copy, and
+    stages the settings make no-ops are skipped. Given a lease, the buffer
+    and the stages' full-size scratch arrays are borrowed from a buffer
+    pool, so same-sized images reuse the same memory.
+    """
+    
+    def __init__(
+        self,
+        image_ops: Optional[ImageOperations] = None,
+        backgrounds: Optional[BackgroundCache] = None
+    ):
+        """
+        Initialize post-processor
+        
+        Args:
+            image_ops: Image operations used for canvas resizing
+            backgrounds: Cache of background images and gradients (default: shared cache)
+        """
+        self.image_ops = image_ops or ImageOperations()
+        self.backgrounds = backgrounds or get_background_cache()
+    
+    @staticmethod
+    def to_buffer(image: Image.Image, lease: Optional[BufferLease] = None) -> np.ndarray:
+        """
+        Copy an image into a new RGBA buffer, strip by strip
+        
+        Args:
+            image: RGB or RGBA image
+            lease: Borrow the buffer through this lease (None = allocate)
+        
+        Returns:
+            Writable (H, W, 4) uint8 array
+        """
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGB")
+        
+        buffer = borrow((image.height, image.width, 4), lease=lease)
+        for y0 in range(0, image.height, STRIP_ROWS):
+            y1 = min(y0 + STRIP_ROWS, image.height)
+            strip = np.asarray(image.crop((0, y0, image.width, y1)))
+            if image.mode == "RGBA":
+                buffer[y0:y1] = strip
+            else:
+                cv2.cvtColor(strip, cv2.COLOR_RGB2RGBA, dst=buffer[y0:y1])
+        
+        return buffer
+    
+    @staticmethod
+    def needs_refinement(quality_settings: QualitySettings) -> bool:
+        """Check if the refinement settings change the mask at all"""
+        return needs_refinement(quality_settings)
+    
+    def run(
+        self,
+        buffer: np.ndarray,
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        mask: Optional[np.ndarray] = None,
+        refine: Optional[Callable[[np.ndarray], np.ndarray]] = None
+    ) -> Image.Image:
+        """
+        Post-process an RGBA buffer into the output image
+        
+        The buffer is modified and may be shared with the returned image.
+        
+        Args:
+            buffer: (H, W, 4) uint8 image, e.g. from to_buffer()
+            output_settings: Output configuration
+            quality_settings: Quality configuration
+            mask: Cut the buffer out with this uint8 mask (None = already cut out)
+            refine: Maps the alpha channel to the refined alpha channel
+        
+        Returns:
+            Output image, ready to save
+        """
+        return self.execute(buffer, RenderPlan.compile(output_settings, quality_settings), mask, refine)
+    
+    def execute(
+        self,
+        buffer: np.ndarray,
+        plan: RenderPlan,
+        mask: Optional[np.ndarray] = None,
+        refine: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        lease: Optional[BufferLease] = None
+    ) -> Image.Image:
+        """
+        Post-process an RGBA buffer following a compiled plan
+        
+        The buffer is modified and may be shared with the returned image.
+        
+        Args:
+            buffer: (H, W, 4) uint8 image, e.g. from to_buffer()
+            plan: Render plan from RenderPlan.compile()
+            mask: Cut the buffer out with this uint8 mask (None = already cut out)
+            refine: Maps the alpha channel to the refined alpha channel; it
+                may refine the array it is given in place
+            lease: Borrow scratch arrays through this lease; the returned
+                image may share them, so release it only after saving
+        
+        Returns:
+            Output image, ready to save
+        """
+        if mask is not None:
+            self.cutout(buffer, mask)
+        
+        if refine is not None and plan.refine:
+            alpha = borrow(buffer.shape[:2], lease=lease)
+            np.copyto(alpha, buffer[:, :, 3])
+            buffer[:, :, 3] = refine(alpha)
+        
+        if plan.feather_radius > 0:
+            self.feather(buffer, plan.feather_radius)
+        
+        if plan.output_settings.auto_crop:
+            buffer = self.crop_to_content(buffer, plan.output_settings.auto_crop_threshold, lease)
+        
+        if plan.canvas_size is None:
+            return self._apply_background(buffer, plan)
+        
+        if plan.background == "color":
+            # The canvas composites what it resamples onto the color, so
+            # only the object's region is blended, at the output size
+            output_image = Image.fromarray(buffer)
+        else:
+            output_image = self._apply_background(buffer, plan)
+        
+        return self.image_ops.resize_with_padding(
+            output_image,
+            plan.canvas_size,
+            center=plan.output_settings.center_object,
+            margin=plan.output_settings.margin,
+            bg_color=plan.canvas_color,
+            canvas_template=plan.canvas_template
+        )
+    
+    @staticmethod
+    def crop_to_content(
+        buffer: np.ndarray,
+        threshold: int = 0,
+        lease: Optional[BufferLease] = None
+    ) -> np.ndarray:
+        """
+        Crop the buffer to the pixels whose alpha is above a threshold
+        
+        Args:
+            buffer: (H, W, 4) uint8 image
+            threshold: Alpha at or below this counts as transparent
+            lease: Borrow the cropped buffer through this lease (None = allocate)
+        
+        Returns:
+            Contiguous cropped buffer, or the buffer itself if nothing is cropped
+        """
+        bbox = ImageOperations.content_bbox(buffer[:, :, 3], threshold)
+        if bbox is None:
+            # Nothing visible: keep the frame rather than return an empty image
+            return buffer
+        
+        left, top, right, bottom = bbox
+        if left == 0 and right == buffer.shape[1]:
+            # Whole rows are still contiguous
+            return buffer[top:bottom]
+        
+        # OpenCV writes into whole rows, which a column crop is not
+        cropped = borrow((bottom - top, right - left, 4), lease=lease)
+        np.copyto(cropped, buffer[top:bottom, left:right])
+        return cropped
+    
+    @staticmethod
+    def cutout(buffer: np.ndarray, mask: np.ndarray) -> None:
+        """Multiply all four channels by the mask, as rembg's naive cutout does"""
+        # Whole rows of a contiguous buffer are contiguous, so OpenCV can
+        # write into them
+        for y0 in range(0, buffer.shape[0], STRIP_ROWS):
+            strip = buffer[y0:y0 + STRIP_ROWS]
+            factor = cv2.merge([mask[y0:y0 + STRIP_ROWS]] * 4)
+            cv2.multiply(strip, factor, dst=strip, scale=1 / 255)
+    
+    @staticmethod
+    def feather(buffer: np.ndarray, feather_amount: int) -> None:
+        """Blur the alpha channel in place, around its edges only"""
+        ImageOperations.feather_alpha(buffer[:, :, 3], feather_amount)
+    
+    @staticmethod
+    def blend_color(buffer: np.ndarray, color: Tuple[int, int, int]) -> None:
+        """Composite the buffer over an opaque color, in place (alpha becomes 255)"""
+        ImageOperations.composite_over(buffer, color)
+    
+    @staticmethod
+    def blend_image(buffer: np.ndarray, background: Union[Image.Image, np.ndarray]) -> None:
+        """
+        Composite the buffer over a background image, in place
+        
+        An array must already have the buffer's size. An image is stretched
+        to it one strip at a time, so no full-size copy of it is made.
+        """
+        if isinstance(background, np.ndarray):
+            ImageOperations.composite_over(buffer, background)
+            return
+        
+        height, width = buffer.shape[:2]
+        if background.mode not in ("RGB", "RGBA"):
+            background = background.convert("RGBA")
+        scale_y = background.height / height
+        
+        for y0 in range(0, height, STRIP_ROWS):
+            y1 = min(y0 + STRIP_ROWS, height)
+            back = background.resize(
+                (width, y1 - y0),
+                Image.Resampling.LANCZOS,
+                box=(0, y0 * scale_y, background.width, y1 * scale_y)
+            )
+            ImageOperations.composite_over(buffer[y0:y1], np.asarray(back))
+    
+    def _apply_background(self, buffer: np.ndarray, plan: RenderPlan) -> Image.Image:
+        """Apply the plan's background and bring the buffer back to PIL"""
+        if plan.background == "color":
+            self.blend_color(buffer, plan.background_color)
+            return Image.fromarray(buffer).convert("RGB")
+        
+        size = (buffer.shape[1], buffer.shape[0])
+        
+        if plan.background == "image":
+            try:
+                background = self.backgrounds.image(plan.background_image, size)
+            except Exception as e:
+                logger.error(f"Failed to load background image: {e}")
+            else:
+                self.blend_image(buffer, background)
+        
+        if plan.background == "gradient":
+            background = self.backgrounds.gradient(
+                size,
+                *plan.gradient_colors,
+                plan.output_settings.gradient_direction
+            )
+            self.blend_image(buffer, background)
+            return Image.fromarray(buffer).convert("RGB")
+        
+        output_image = Image.fromarray(buffer)
+        if plan.output_settings.format == "jpg":
+            # Any transparency left would be composited again when saving
+            output_image = self.image_ops.apply_solid_background(output_image, (255, 255, 255))
+        return output_image
@@ -24,6 +24,7 @@ class Preset:
     feather_edges: int = 0
     # Quality settings
     alpha_matting: bool = False
+    matting_mode: str = "closed_form"
     remove_small_objects: bool = True
     min_object_size: int = 100
     smooth_edges: bool = True
@@ -87,6 +88,15 @@ class PresetManager:
             edge_smooth_kernel=7,
         ),
         
+        "portrait_hair": Preset(
+            name="Portrait - Soft Hair",
+            description="حواف ناعمة للشعر والفرو - Soft edges for hair and fur",
+            format="png",
+            background_type="transparent",
+            alpha_matting=True,
+            matting_mode="guided",
+        ),
+        
         "catalog_print": Preset(
             name="Catalog / Print",
             description="للكتالوجات والطباعة - For catalogs and print",
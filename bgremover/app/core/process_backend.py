@@ -0,0 +1,224 @@
+"""Process-pool execution backend"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Optional
+from loguru import logger
+
+from bgremover.app.core.settings import OutputSettings, QualitySettings, DEFAULT_BUFFER_POOL_MB
+from bgremover.app.core.render_plan import RenderPlan
+from bgremover.app.core.session_manager import compute_thread_layout
+from bgremover.app.core.model_store import get_model_store
+
+
+# Pipeline owned by the current worker process
+_worker_pipeline = None
+
+
+def _init_worker(model_name: str, cache_dir: Optional[str], thread_budget: int, buffer_pool_mb: int) -> None:
+    """Create and warm up the worker's own pipeline (and ONNX session) once"""
+    global _worker_pipeline
+    
+    # Imported here so the parent process does not need to load rembg
+    from bgremover.app.core.pipeline import BackgroundRemovalPipeline
+    from bgremover.app.core.mask_cache import MaskCache
+    from bgremover.app.core.session_manager import get_session_manager
+    from bgremover.app.core.buffer_pool import get_buffer_pool
+    
+    # This process is the only inference worker within its share of the budget
+    get_session_manager().configure(thread_budget, workers=1)
+    get_buffer_pool().set_max_size(buffer_pool_mb)
+    
+    mask_cache = MaskCache(Path(cache_dir)) if cache_dir else None
+    _worker_pipeline = BackgroundRemovalPipeline(model_name, mask_cache=mask_cache, warmup=True)
+    
+    if _worker_pipeline.session is None:
+        raise RuntimeError(f"Worker could not initialize model {model_name}")
+
+
+def _worker_process_batch(
+    input_paths: List[Path],
+    output_paths: List[Path],
+    output_settings: OutputSettings,
+    quality_settings: QualitySettings,
+    batch_size: int,
+    plan: Optional[RenderPlan] = None
+) -> List[bool]:
+    """Decode, infer, render and save a chunk of images inside a worker"""
+    return _worker_pipeline.process_batch(
+        input_paths,
+        output_paths,
+        output_settings,
+        quality_settings,
+        batch_size=batch_size,
+        plan=plan
+    )
+
+
+class ProcessPoolBackend:
+    """Runs the pipeline in worker processes, one ONNX session per process"""
+    
+    def __init__(
+        self,
+        max_workers: int = 4,
+        model_name: str = "u2net",
+        cache_dir: Optional[Path] = None,
+        thread_budget: int = 0,
+        buffer_pool_mb: int = DEFAULT_BUFFER_POOL_MB
+    ):
+        """
+        Initialize process pool backend
+        
+        Args:
+            max_workers: Number of worker processes
+            model_name: Model loaded by each worker
+            cache_dir: Mask cache directory shared by the workers (None disables it)
+            thread_budget: Total threads across all workers (0 = number of CPUs)
+            buffer_pool_mb: Image buffer memory kept for reuse across all workers
+        """
+        self.max_workers = max_workers
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.thread_budget = thread_budget
+        self.buffer_pool_mb = buffer_pool_mb
+        
+        # Workers start with the first batch, from whichever thread submits
+        # it, so constructing the backend never blocks the UI thread
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Prepare the model and start the worker processes on first use"""
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = self._start()
+        return self._executor
+    
+    def _start(self) -> ProcessPoolExecutor:
+        """Prepare the model and start the worker processes"""
+        # Download, build and optimize the model once here, not in every
+        # worker at once
+        get_model_store().get_optimized_model_path(self.model_name)
+        
+        # Each process gets an equal share of the budget
+        layout = compute_thread_layout(self.thread_budget, self.max_workers)
+        
+        # "spawn" keeps workers independent of the parent's threads and
+        # behaves the same on Windows, macOS and Linux
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(
+                self.model_name,
+                str(self.cache_dir) if self.cache_dir else None,
+                layout.intra_op_threads,
+                self.buffer_pool_mb // max(1, self.max_workers)
+            )
+        )
+        
+        logger.info(
+            f"Process pool started: {self.max_workers} workers, model {self.model_name}, "
+            f"{layout.describe()}"
+        )
+        return executor
+    
+    def process_image(
+        self,
+        input_path: Path,
+        output_path: Path,
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        plan: Optional[RenderPlan] = None
+    ) -> bool:
+        """
+        Process a single image in a worker process
+        
+        Args:
+            input_path: Path to input image
+            output_path: Path to save output
+            output_settings: Output configuration
+            quality_settings: Quality configuration
+            plan: Settings already compiled with RenderPlan.compile()
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        return self.process_batch(
+            [input_path],
+            [output_path],
+            output_settings,
+            quality_settings,
+            batch_size=1,
+            plan=plan
+        )[0]
+    
+    def process_batch(
+        self,
+        input_paths: List[Path],
+        output_paths: List[Path],
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        batch_size: int = 1,
+        plan: Optional[RenderPlan] = None
+    ) -> List[bool]:
+        """
+        Process images across the worker processes
+        
+        Only paths and settings are sent to the workers: each worker decodes,
+        infers, renders and writes its own chunk, so pixels never cross the
+        process boundary.
+        
+        Args:
+            input_paths: Paths to input images
+            output_paths: Paths to save outputs (same order as input_paths)
+            output_settings: Output configuration
+            quality_settings: Quality configuration
+            batch_size: Images per chunk sent to a worker
+            plan: Settings already compiled with RenderPlan.compile(); only
+                its settings are pickled, and each worker compiles it again
+        
+        Returns:
+            Success flag for every input, in input order
+        """
+        if len(input_paths) != len(output_paths):
+            raise ValueError("input_paths and output_paths must have the same length")
+        
+        batch_size = max(1, batch_size)
+        executor = self._get_executor()
+        futures = []
+        
+        for start in range(0, len(input_paths), batch_size):
+            chunk = input_paths[start:start + batch_size]
+            future = executor.submit(
+                _worker_process_batch,
+                chunk,
+                output_paths[start:start + batch_size],
+                output_settings,
+                quality_settings,
+                batch_size,
+                plan
+            )
+            futures.append((future, len(chunk)))
+        
+        results = []
+        for future, count in futures:
+            try:
+                results.extend(future.result())
+            except Exception as e:
+                logger.error(f"Worker process failed: {e}")
+                results.extend([False] * count)
+        
+        return results
+    
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker processes, if they were started"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        
+        if executor is not None:
+            executor.shutdown(wait=wait)
+            logger.info("Process pool stopped")
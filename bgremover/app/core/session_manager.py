@@ -0,0 +1,417 @@
+"""Thread-safe inference session creation with a global CPU thread budget"""
+
+import os
+import threading
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import cv2
+from loguru import logger
+
+
+@dataclass
+class ThreadLayout:
+    """How the CPU thread budget is split"""
+    budget: int
+    workers: int
+    intra_op_threads: int
+    inter_op_threads: int
+    opencv_threads: int
+    
+    def describe(self) -> str:
+        """Human readable summary for the logs"""
+        return (
+            f"thread budget {self.budget}: {self.workers} worker(s) × "
+            f"{self.intra_op_threads} ORT intra-op thread(s), "
+            f"{self.inter_op_threads} inter-op, OpenCV {self.opencv_threads} thread(s)"
+        )
+
+
+def compute_thread_layout(budget: int = 0, workers: int = 1) -> ThreadLayout:
+    """
+    Split a thread budget across concurrent workers
+    
+    Every worker gets an equal share for ONNX Runtime's intra-op pool, and
+    OpenCV is capped to the same share, so that all workers running at once
+    stay within the budget instead of each assuming the whole machine.
+    
+    Args:
+        budget: Total threads to use (0 = number of CPUs)
+        workers: Number of workers running inference concurrently
+    
+    Returns:
+        Thread layout
+    """
+    if budget <= 0:
+        budget = os.cpu_count() or 1
+    workers = max(1, workers)
+    
+    share = max(1, budget // workers)
+    
+    return ThreadLayout(
+        budget=budget,
+        workers=workers,
+        intra_op_threads=share,
+        inter_op_threads=1,
+        opencv_threads=share
+    )
+
+
+def resident_memory_mb() -> Optional[float]:
+    """Resident memory of this process in MB, or None if it cannot be read"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    
+    try:
+        with open("/proc/self/statm", "r") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class SessionManager:
+    """
+    Creates inference sessions once per model, sized to the thread budget
+    
+    Sessions are kept in least-recently-used order. When their size exceeds
+    the memory budget, the least recently used ones are dropped, so
+    switching between a few models stays cheap without keeping every model
+    in memory. A dropped session's memory is only freed, and the eviction
+    counted, once no pipeline holds the session any more.
+    """
+    
+    def __init__(self, thread_budget: int = 0, workers: int = 1, memory_budget_mb: int = 0):
+        """
+        Initialize session manager
+        
+        Args:
+            thread_budget: Total threads to use (0 = number of CPUs)
+            workers: Number of workers running inference concurrently
+            memory_budget_mb: Resident memory all sessions may use (0 = unlimited)
+        """
+        self._lock = threading.Lock()
+        self._model_locks: Dict[str, threading.Lock] = {}
+        # Session builds and first runs, one at a time so their memory can be told apart
+        self._memory_lock = threading.Lock()
+        self._sessions: "OrderedDict[str, object]" = OrderedDict()
+        self._session_sizes: Dict[str, float] = {}
+        # Evicted sessions still held elsewhere: model -> (session ref, size)
+        self._retired: Dict[str, Tuple[weakref.ref, float]] = {}
+        # Retired sessions that have been freed, appended by weakref callbacks
+        self._freed: deque = deque()
+        self._evictions = 0
+        self.memory_budget_mb = memory_budget_mb
+        self.hits = 0
+        self.misses = 0
+        self.layout = compute_thread_layout(thread_budget, workers)
+        self._apply_opencv_threads()
+    
+    def configure(self, thread_budget: int = 0, workers: int = 1) -> ThreadLayout:
+        """
+        Change the thread budget
+        
+        Sessions that already exist keep their thread counts; the new layout
+        applies to OpenCV immediately and to sessions created afterwards.
+        
+        Args:
+            thread_budget: Total threads to use (0 = number of CPUs)
+            workers: Number of workers running inference concurrently
+        
+        Returns:
+            The new thread layout
+        """
+        with self._lock:
+            self.layout = compute_thread_layout(thread_budget, workers)
+            if self._sessions:
+                logger.warning(
+                    f"Thread layout changed with {len(self._sessions)} session(s) loaded; "
+                    "they keep their previous thread counts"
+                )
+        self._apply_opencv_threads()
+        logger.info(f"Thread layout: {self.layout.describe()}")
+        return self.layout
+    
+    def set_memory_budget(self, memory_budget_mb: int) -> None:
+        """
+        Change the memory budget of the session cache
+        
+        Args:
+            memory_budget_mb: Resident memory all sessions may use (0 = unlimited)
+        """
+        with self._lock:
+            self.memory_budget_mb = memory_budget_mb
+            self._evict()
+    
+    @property
+    def evictions(self) -> int:
+        """Evicted sessions whose memory has been freed"""
+        with self._lock:
+            self._collect_freed()
+            return self._evictions
+    
+    def cached_memory_mb(self) -> float:
+        """Estimated resident memory of all cached sessions"""
+        with self._lock:
+            return sum(self._session_sizes.values())
+    
+    def retired_memory_mb(self) -> float:
+        """Estimated memory of evicted sessions that pipelines still hold"""
+        with self._lock:
+            self._collect_freed()
+            return sum(size for _, size in self._retired.values())
+    
+    def describe_cache(self) -> str:
+        """Human readable cache summary for the logs; call with the lock held"""
+        self._collect_freed()
+        budget = f"{self.memory_budget_mb} MB" if self.memory_budget_mb > 0 else "unlimited"
+        retired = sum(size for _, size in self._retired.values())
+        return (
+            f"{len(self._sessions)} session(s), {sum(self._session_sizes.values()):.0f} MB "
+            f"of {budget} ({retired:.0f} MB evicted but still in use); "
+            f"{self.hits} hit(s), {self.misses} miss(es), {self._evictions} eviction(s)"
+        )
+    
+    def get_session(
+        self,
+        model_name: str,
+        model_path: Optional[Path] = None,
+        family: str = "u2net"
+    ):
+        """
+        Get the session for a model, creating it on first use
+        
+        Concurrent callers asking for the same model wait for a single
+        session to be built instead of each loading their own copy.
+        
+        Args:
+            model_name: Name of the model
+            model_path: Load this ONNX file (e.g. a quantized variant or a
+                registered local model) instead of rembg's own copy of model_name
+            family: Pre/post-processing of the file at model_path ("u2net" or "isnet")
+        
+        Returns:
+            rembg session
+        """
+        with self._lock:
+            session = self._sessions.get(model_name)
+            if session is not None:
+                self._sessions.move_to_end(model_name)
+                self.hits += 1
+                return session
+            model_lock = self._model_locks.setdefault(model_name, threading.Lock())
+        
+        with model_lock:
+            # Another thread may have finished building it while we waited,
+            # or a pipeline may still hold it since it was evicted
+            with self._lock:
+                session = self._sessions.get(model_name) or self._revive(model_name)
+                if session is not None:
+                    self._sessions.move_to_end(model_name)
+                    self.hits += 1
+                    return session
+            
+            with self.track_memory(model_name):
+                session = self._create_session(model_name, model_path, family)
+                with self._lock:
+                    self._sessions[model_name] = session
+                    self.misses += 1
+            
+            return session
+    
+    @contextmanager
+    def track_memory(self, model_name: str):
+        """
+        Add the resident memory a block allocates to a cached session's size
+        
+        Wraps session creation, and can wrap a session's first run, where
+        ONNX Runtime grows its memory arena. Blocks run one at a time, so
+        the resident memory growth of one is never another session's; what
+        other threads allocate meanwhile is bounded by the model's measured
+        peak from the model registry, which is also used when resident
+        memory cannot be read.
+        
+        Args:
+            model_name: Name of the model the memory belongs to
+        """
+        with self._memory_lock:
+            before = resident_memory_mb()
+            try:
+                yield
+            finally:
+                after = resident_memory_mb()
+                peak = self._peak_memory_mb(model_name)
+                
+                with self._lock:
+                    if model_name in self._sessions:
+                        size = self._session_sizes.get(model_name, 0.0)
+                        if before is not None and after is not None:
+                            size += max(0.0, after - before)
+                            if peak is not None:
+                                size = min(size, peak)
+                        elif peak is not None:
+                            size = max(size, peak)
+                        
+                        grown = size - self._session_sizes.get(model_name, 0.0)
+                        self._session_sizes[model_name] = size
+                        self._evict()
+                        logger.info(f"Session cache ({model_name} +{grown:.0f} MB): {self.describe_cache()}")
+    
+    @staticmethod
+    def _peak_memory_mb(model_name: str) -> Optional[float]:
+        """Measured peak resident memory of a process running the model, if known"""
+        from bgremover.app.core.model_registry import get_model_registry
+        
+        try:
+            profile = get_model_registry().get(model_name)
+        except Exception as e:
+            logger.debug(f"No memory profile for {model_name}: {e}")
+            return None
+        if profile is None or profile.peak_rss_mb <= 0:
+            return None
+        return float(profile.peak_rss_mb)
+    
+    def release(self, model_name: str) -> None:
+        """Drop a model's session"""
+        with self._lock:
+            self._sessions.pop(model_name, None)
+            self._session_sizes.pop(model_name, None)
+            self._retired.pop(model_name, None)
+    
+    def _evict(self) -> None:
+        """Drop least recently used sessions while over the memory budget (lock held)"""
+        if self.memory_budget_mb <= 0:
+            return
+        
+        # The most recently used session stays, even if it alone is over budget
+        while len(self._sessions) > 1 and sum(self._session_sizes.values()) > self.memory_budget_mb:
+            model_name, session = self._sessions.popitem(last=False)
+            size = self._session_sizes.pop(model_name, 0.0)
+            self._retire(model_name, session, size)
+    
+    def _retire(self, model_name: str, session, size: float) -> None:
+        """Track an evicted session until the pipelines holding it let go (lock held)"""
+        def freed(ref):
+            # Runs wherever the last reference is dropped, possibly with the
+            # lock held, so only queue the event
+            self._freed.append((model_name, ref))
+        
+        try:
+            ref = weakref.ref(session, freed)
+        except TypeError:
+            # Cannot be tracked; assume it is freed with the cache's reference
+            self._evictions += 1
+            logger.info(f"Evicted session {model_name} ({size:.0f} MB) from the session cache")
+            return
+        
+        self._retired[model_name] = (ref, size)
+        logger.info(
+            f"Evicted session {model_name} ({size:.0f} MB) from the session cache; "
+            "its memory is freed once no pipeline uses it"
+        )
+    
+    def _revive(self, model_name: str):
+        """Put an evicted session that is still in use back in the cache (lock held)"""
+        self._collect_freed()
+        retired = self._retired.pop(model_name, None)
+        if retired is None:
+            return None
+        
+        ref, size = retired
+        session = ref()
+        if session is None:
+            return None
+        
+        self._sessions[model_name] = session
+        self._session_sizes[model_name] = size
+        self._evict()
+        return session
+    
+    def _collect_freed(self) -> None:
+        """Count retired sessions that have been freed as evicted (lock held)"""
+        while self._freed:
+            model_name, ref = self._freed.popleft()
+            retired = self._retired.get(model_name)
+            if retired is not None and retired[0] is ref:
+                del self._retired[model_name]
+                self._evictions += 1
+                logger.info(f"Session {model_name} freed ({retired[1]:.0f} MB)")
+    
+    def _create_session(
+        self,
+        model_name: str,
+        model_path: Optional[Path] = None,
+        family: str = "u2net"
+    ):
+        """Build a rembg session with the current thread layout"""
+        import onnxruntime as ort
+        from rembg import new_session
+        
+        layout = self.layout
+        
+        # rembg's custom sessions run any file with their family's pre/post-processing
+        session_name = model_name
+        if model_path is not None:
+            session_name = "dis_custom" if family == "isnet" else "u2net_custom"
+        
+        sess_opts = ort.SessionOptions()
+        sess_opts.intra_op_num_threads = layout.intra_op_threads
+        sess_opts.inter_op_num_threads = layout.inter_op_threads
+        sess_opts.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        
+        logger.info(f"Creating session for {model_name} ({layout.describe()})")
+        
+        if model_path is not None:
+            # Load the graph optimized on an earlier run, skipping optimization
+            from bgremover.app.core.model_store import get_model_store
+            
+            model_store = get_model_store()
+            artifact_path = model_store.get_optimized_model_path(model_name)
+            if artifact_path is not None:
+                sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_DISABLE_ALL
+                try:
+                    return new_session(session_name, sess_opts=sess_opts, model_path=str(artifact_path))
+                except TypeError:
+                    # Without sess_opts the artifact would be optimized again
+                    pass
+                except Exception as e:
+                    logger.warning(f"Optimized model for {model_name} failed to load: {e}")
+                    model_store.discard_optimized_model(artifact_path)
+                sess_opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        
+        session_kwargs = {}
+        if model_path is not None:
+            session_kwargs["model_path"] = str(model_path)
+        
+        try:
+            return new_session(session_name, sess_opts=sess_opts, **session_kwargs)
+        except TypeError:
+            # Older rembg releases build their own SessionOptions and only
+            # honour OMP_NUM_THREADS
+            os.environ["OMP_NUM_THREADS"] = str(layout.intra_op_threads)
+            return new_session(session_name, **session_kwargs)
+    
+    def _apply_opencv_threads(self) -> None:
+        """Cap OpenCV's own thread pool to the layout"""
+        cv2.setNumThreads(self.layout.opencv_threads)
+
+
+# Singleton instance
+_session_manager_instance: Optional[SessionManager] = None
+_session_manager_lock = threading.Lock()
+
+
+def get_session_manager() -> SessionManager:
+    """Get singleton session manager instance"""
+    global _session_manager_instance
+    if _session_manager_instance is None:
+        with _session_manager_lock:
+            if _session_manager_instance is None:
+                _session_manager_instance = SessionManager()
+    return _session_manager_instance
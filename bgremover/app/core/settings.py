@@ -6,17 +6,28 @@ from typing import Optional, Literal
 from pydantic import BaseModel, Field, validator
 
 
+# Images per inference run when not configured
+DEFAULT_BATCH_SIZE = 4
+
+# Memory kept for reusing image buffers; a 24 MP RGBA buffer is ~92 MB
+DEFAULT_BUFFER_POOL_MB = 512
+
+
 class OutputSettings(BaseModel):
     """Output configuration settings"""
     format: Literal["png", "webp", "jpg"] = "png"
     quality: int = Field(default=95, ge=1, le=100)
-    background_type: Literal["transparent", "color", "image"] = "transparent"
+    background_type: Literal["transparent", "color", "image", "gradient"] = "transparent"
     background_color: str = "#FFFFFF"
+    gradient_color: str = "#000000"
+    gradient_direction: Literal["vertical", "horizontal", "diagonal"] = "vertical"
     background_image: Optional[str] = None
     canvas_width: Optional[int] = None
     canvas_height: Optional[int] = None
     center_object: bool = True
     margin: int = Field(default=0, ge=0)
+    auto_crop: bool = False
+    auto_crop_threshold: int = Field(default=0, ge=0, le=254)
     feather_edges: int = Field(default=0, ge=0, le=50)
 
 
@@ -25,10 +36,17 @@ class QualitySettings(BaseModel):
     alpha_matting: bool = False
     alpha_matting_foreground_threshold: int = Field(default=240, ge=0, le=255)
     alpha_matting_background_threshold: int = Field(default=10, ge=0, le=255)
+    matting_mode: Literal["closed_form", "guided"] = "closed_form"  # guided = fast, no pymatting
+    guided_radius: int = Field(default=16, ge=1, le=128)
+    guided_eps: float = Field(default=1e-4, gt=0, le=1)
     remove_small_objects: bool = True
     min_object_size: int = Field(default=100, ge=0)
+    fill_holes: bool = False
+    max_hole_size: int = Field(default=100, ge=0)
     smooth_edges: bool = True
     edge_smooth_kernel: int = Field(default=5, ge=1, le=15)
+    refine_mode: Literal["full", "proxy"] = "full"  # proxy = refine downscaled, guided upsample
+    refine_proxy_size: int = Field(default=1024, ge=128, le=8192)
 
 
 class Settings(BaseModel):
@@ -50,10 +68,35 @@ class Settings(BaseModel):
     window_height: int = 800
     window_maximized: bool = False
     
+    # Model
+    model_name: str = "u2net"  # any ModelStore model; u2net_int8 = quantized, built locally
+    
     # Performance
     max_workers: int = Field(default=4, ge=1, le=16)
+    thread_budget: int = Field(default=0, ge=0, le=256)  # 0 = all CPUs
+    session_memory_mb: int = Field(default=2048, ge=0, le=65536)  # loaded models, 0 = unlimited
+    buffer_pool_mb: int = Field(default=DEFAULT_BUFFER_POOL_MB, ge=0, le=65536)  # reused image buffers, 0 = off
+    batch_size: int = Field(default=DEFAULT_BATCH_SIZE, ge=1, le=32)
+    backend: Literal["thread", "process"] = "thread"
+    
+    # Streaming stages (thread backend)
+    decode_workers: int = Field(default=2, ge=1, le=16)
+    infer_workers: int = Field(default=1, ge=1, le=8)
+    postprocess_workers: int = Field(default=2, ge=1, le=16)
+    encode_workers: int = Field(default=2, ge=1, le=16)
+    stage_queue_size: int = Field(default=8, ge=1, le=64)
     use_gpu: bool = False
     
+    def inference_workers(self) -> int:
+        """
+        Workers running inference at once, which share the thread budget
+        
+        The process backend runs one session per worker process; the thread
+        backend runs only the streaming infer stage's threads, however many
+        workers decode and post-process.
+        """
+        return self.max_workers if self.backend == "process" else self.infer_workers
+    
     @classmethod
     def get_settings_path(cls) -> Path:
         """Get path to settings file"""
@@ -0,0 +1,258 @@
+"""Staged streaming pipeline: decode → infer → post-process → encode"""
+
+import queue
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, List, Optional
+from loguru import logger
+
+from bgremover.app.core.settings import OutputSettings, QualitySettings, DEFAULT_BATCH_SIZE
+from bgremover.app.core.render_plan import RenderPlan
+
+if TYPE_CHECKING:
+    # Importing the pipeline loads rembg/onnxruntime; only needed for typing
+    from bgremover.app.core.pipeline import BackgroundRemovalPipeline
+
+
+# Marks the end of a stage's input
+_END = object()
+
+
+@dataclass
+class StageConfig:
+    """Per-stage concurrency of the streaming pipeline"""
+    decode_workers: int = 2
+    infer_workers: int = 1
+    postprocess_workers: int = 2
+    encode_workers: int = 2
+    queue_size: int = 8
+
+
+class StagedPipeline:
+    """Runs decode, inference, post-processing and encoding as overlapping stages
+    
+    Each stage has its own worker threads and the stages are joined by bounded
+    queues, so disk reads and PNG/WebP encoding overlap with inference instead
+    of adding to it, and no stage can run more than queue_size items ahead.
+    """
+    
+    def __init__(self, pipeline: "BackgroundRemovalPipeline", config: Optional[StageConfig] = None):
+        """
+        Initialize staged pipeline
+        
+        Args:
+            pipeline: Pipeline providing the model and the per-image steps
+            config: Stage concurrency (default: StageConfig())
+        """
+        self.pipeline = pipeline
+        self.config = config or StageConfig()
+    
+    def process_batch(
+        self,
+        input_paths: List[Path],
+        output_paths: List[Path],
+        output_settings: OutputSettings,
+        quality_settings: QualitySettings,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        on_start: Optional[Callable[[int], None]] = None,
+        on_result: Optional[Callable[[int, bool], None]] = None,
+        should_stop: Optional[Callable[[], bool]] = None,
+        plan: Optional[RenderPlan] = None
+    ) -> List[bool]:
+        """
+        Stream images through the stages
+        
+        Args:
+            input_paths: Paths to input images
+            output_paths: Paths to save outputs (same order as input_paths)
+            output_settings: Output configuration
+            quality_settings: Quality configuration
+            batch_size: Maximum images per inference run
+            on_start: Called with an image's index when it starts decoding
+            on_result: Called with an image's index and success flag when it is done
+            should_stop: Polled before each image is decoded; True stops the stream
+            plan: Settings already compiled with RenderPlan.compile()
+        
+        Returns:
+            Success flag for every input, in input order (False if never processed)
+        """
+        if len(input_paths) != len(output_paths):
+            raise ValueError("input_paths and output_paths must have the same length")
+        
+        config = self.config
+        pipeline = self.pipeline
+        buffer_pool = pipeline.buffer_pool
+        if plan is None:
+            plan = RenderPlan.compile(output_settings, quality_settings)
+        batch_size = max(1, batch_size)
+        results = [False] * len(input_paths)
+        
+        def finish(index: int, success: bool) -> None:
+            results[index] = success
+            if on_result:
+                on_result(index, success)
+        
+        # Stage queues. Inputs are all known up front, so the first one is unbounded.
+        decode_q: queue.Queue = queue.Queue()
+        infer_q: queue.Queue = queue.Queue(maxsize=config.queue_size)
+        post_q: queue.Queue = queue.Queue(maxsize=config.queue_size)
+        encode_q: queue.Queue = queue.Queue(maxsize=config.queue_size)
+        
+        for index in range(len(input_paths)):
+            decode_q.put(index)
+        
+        def decode(index: int) -> None:
+            if should_stop and should_stop():
+                return
+            if on_start:
+                on_start(index)
+            try:
+                image = pipeline.load_image(input_paths[index])
+                cache_key = pipeline.cache_keys_for([image])[0]
+            except Exception as e:
+                logger.error(f"Failed to load {input_paths[index].name}: {e}")
+                finish(index, False)
+                return
+            infer_q.put((index, image, cache_key))
+        
+        def infer(first) -> None:
+            # Take whatever else is already decoded, up to batch_size
+            items = [first]
+            end_seen = False
+            while len(items) < batch_size:
+                try:
+                    item = infer_q.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _END:
+                    end_seen = True
+                    break
+                items.append(item)
+            
+            try:
+                masks = pipeline.predict_masks(
+                    [image for _, image, _ in items],
+                    [cache_key for _, _, cache_key in items]
+                )
+            except Exception as e:
+                logger.error(f"Batch inference failed: {e}")
+                for index, _, _ in items:
+                    finish(index, False)
+            else:
+                for (index, image, cache_key), mask in zip(items, masks):
+                    post_q.put((index, image, mask, cache_key))
+            
+            if end_seen:
+                raise _StageEnd
+        
+        def postprocess(item) -> None:
+            index, image, mask, cache_key = item
+            # Held until the encoder has saved the image, which may share its buffers
+            lease = buffer_pool.lease()
+            try:
+                output_image = pipeline.render(
+                    image,
+                    mask,
+                    output_settings,
+                    quality_settings,
+                    cache_key=cache_key,
+                    plan=plan,
+                    lease=lease
+                )
+            except Exception as e:
+                lease.release()
+                logger.error(f"Failed to process {input_paths[index].name}: {e}")
+                finish(index, False)
+                return
+            encode_q.put((index, output_image, lease))
+        
+        def encode(item) -> None:
+            index, output_image, lease = item
+            try:
+                pipeline.save_image(output_image, output_paths[index], plan.output_settings)
+            except Exception as e:
+                logger.error(f"Failed to save {output_paths[index].name}: {e}")
+                finish(index, False)
+                return
+            finally:
+                lease.release()
+            logger.success(f"Saved: {output_paths[index].name}")
+            finish(index, True)
+        
+        stages = [
+            ("decode", decode, decode_q, config.decode_workers),
+            ("infer", infer, infer_q, config.infer_workers),
+            ("postprocess", postprocess, post_q, config.postprocess_workers),
+            ("encode", encode, encode_q, config.encode_workers),
+        ]
+        
+        threads = []
+        for position, (name, handle, in_q, workers) in enumerate(stages):
+            if position + 1 < len(stages):
+                _, _, out_q, downstream_workers = stages[position + 1]
+            else:
+                out_q, downstream_workers = None, 0
+            
+            stage = _Stage(name, handle, in_q, out_q, max(1, workers), max(1, downstream_workers))
+            threads.extend(stage.start())
+        
+        # The decode stage ends once every worker has taken an end marker
+        for _ in range(max(1, config.decode_workers)):
+            decode_q.put(_END)
+        
+        for thread in threads:
+            thread.join()
+        
+        return results
+
+
+class _StageEnd(Exception):
+    """Raised by a handler that consumed its stage's end marker itself"""
+
+
+class _Stage:
+    """Worker threads of one stage"""
+    
+    def __init__(self, name, handle, in_q, out_q, workers, downstream_workers):
+        self.name = name
+        self.handle = handle
+        self.in_q = in_q
+        self.out_q = out_q
+        self.workers = workers
+        self.downstream_workers = downstream_workers
+        self._remaining = workers
+        self._lock = threading.Lock()
+    
+    def start(self) -> List[threading.Thread]:
+        """Start the stage's worker threads"""
+        threads = [
+            threading.Thread(target=self._run, name=f"bgremover-{self.name}-{i}", daemon=True)
+            for i in range(self.workers)
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
+    
+    def _run(self) -> None:
+        """Handle items until the end marker, then signal the next stage"""
+        try:
+            while True:
+                item = self.in_q.get()
+                if item is _END:
+                    break
+                try:
+                    self.handle(item)
+                except _StageEnd:
+                    break
+                except Exception as e:
+                    logger.error(f"Unexpected error in {self.name} stage: {e}")
+        finally:
+            with self._lock:
+                self._remaining -= 1
+                last = self._remaining == 0
+            
+            # The last worker out closes the downstream stage
+            if last and self.out_q is not None:
+                for _ in range(self.downstream_workers):
+                    self.out_q.put(_END)
@@ -8,6 +8,8 @@ from PySide6.QtGui import QIcon
 
 from bgremover.app.core.logger import setup_logger
 from bgremover.app.core.settings import Settings
+from bgremover.app.core.session_manager import get_session_manager
+from bgremover.app.core.buffer_pool import get_buffer_pool
 from bgremover.app.ui.main_window import MainWindow
 
 
@@ -45,11 +47,23 @@ def main():
         settings = Settings()
         settings.save()
     
+    # Split the CPU thread budget between the inference workers, ONNX Runtime and OpenCV
+    get_session_manager().configure(settings.thread_budget, settings.inference_workers())
+    
+    # Keep recently used models loaded, within the memory budget
+    get_session_manager().set_memory_budget(settings.session_memory_mb)
+    
+    # Reuse same-sized image buffers across a batch, within this limit
+    get_buffer_pool().set_max_size(settings.buffer_pool_mb)
+    
     # Create and show main window
     try:
         window = MainWindow(settings)
         window.show()
         logger.info("Main window displayed successfully")
+        
+        # Heavy imports and model setup happen after the window is up
+        window.start_model_loader()
     except Exception as e:
         logger.error(f"Failed to create main window: {e}")
         sys.exit(1)
@@ -12,6 +12,8 @@ from loguru import logger
 
 from bgremover.app.core.settings import Settings, get_settings, update_settings
 from bgremover.app.core.batch_worker import BatchWorker
+from bgremover.app.core.model_loader import ModelLoader
+from bgremover.app.core.streaming import StageConfig
 from bgremover.app.ui.i18n_manager import get_i18n
 from bgremover.app.widgets.queue_panel import QueuePanel
 from bgremover.app.widgets.preview_panel import PreviewPanel
@@ -26,7 +28,11 @@ class MainWindow(QMainWindow):
         
         self.settings = settings
         self.i18n = get_i18n(settings.language)
-        self.batch_worker = BatchWorker(max_workers=settings.max_workers)
+        self.batch_worker = BatchWorker()
+        self._configure_batch_worker()
+        
+        # Process-backend workers load their own sessions
+        self.model_loader = ModelLoader(warm_pipeline=settings.backend == "thread")
         
         self.output_dir = Path(settings.last_output_dir) if settings.last_output_dir else Path.home()
         
@@ -37,6 +43,25 @@ class MainWindow(QMainWindow):
         
         logger.info("Main window initialized")
     
+    def _configure_batch_worker(self):
+        """Pass the current performance and model settings to the batch worker"""
+        settings = self.settings
+        self.batch_worker.configure(
+            max_workers=settings.max_workers,
+            batch_size=settings.batch_size,
+            backend=settings.backend,
+            stage_config=StageConfig(
+                decode_workers=settings.decode_workers,
+                infer_workers=settings.infer_workers,
+                postprocess_workers=settings.postprocess_workers,
+                encode_workers=settings.encode_workers,
+                queue_size=settings.stage_queue_size
+            ),
+            thread_budget=settings.thread_budget,
+            model_name=settings.model_name,
+            buffer_pool_mb=settings.buffer_pool_mb
+        )
+    
     def _setup_ui(self):
         """Setup user interface"""
         self.setWindowTitle(self.i18n.t("app_name"))
@@ -73,7 +98,7 @@ class MainWindow(QMainWindow):
         self._create_menubar()
         
         # Create status bar
-        self.statusBar().showMessage(self.i18n.t("messages.model_ready"))
+        self.statusBar().showMessage(self.i18n.t("messages.model_loading"))
     
     def _create_toolbar(self):
         """Create main toolbar with improved buttons"""
@@ -306,6 +331,14 @@ class MainWindow(QMainWindow):
         self.batch_worker.task_failed.connect(self._on_task_failed)
         self.batch_worker.batch_progress.connect(self._on_batch_progress)
         self.batch_worker.batch_completed.connect(self._on_batch_completed)
+        
+        # Model loader signals
+        self.model_loader.ready.connect(self._on_model_ready)
+        self.model_loader.failed.connect(self._on_model_failed)
+    
+    def start_model_loader(self):
+        """Load the model in the background once the window is visible"""
+        self.model_loader.start()
     
     def _apply_theme(self):
         """Apply theme to window"""
@@ -527,12 +560,17 @@ class MainWindow(QMainWindow):
             self.settings.quality
         )
         
-        # Start processing
+        # Start processing, restarting worker processes whose settings changed
+        self._configure_batch_worker()
         if self.batch_worker.start():
             self.start_btn.setEnabled(False)
             self.pause_btn.setEnabled(True)
             self.cancel_btn.setEnabled(True)
-            self.statusBar().showMessage(self.i18n.t("messages.processing_started"))
+            if self.model_loader.is_ready():
+                self.statusBar().showMessage(self.i18n.t("messages.processing_started"))
+            else:
+                # Workers wait for the model; let the user know why nothing moves yet
+                self.statusBar().showMessage(self.i18n.t("messages.model_loading"))
     
     def _on_pause_processing(self):
         """Pause processing"""
@@ -568,6 +606,15 @@ class MainWindow(QMainWindow):
                 self.queue_panel.clear()
                 self.batch_worker.clear()
     
+    def _on_model_ready(self, cold_start: float):
+        """Handle model loaded and warmed up"""
+        logger.info(f"Model ready (warm-up {cold_start:.2f}s)")
+        self.statusBar().showMessage(self.i18n.t("messages.model_ready"))
+    
+    def _on_model_failed(self, error: str):
+        """Handle model loading failure"""
+        self.statusBar().showMessage(self.i18n.t("messages.model_failed", error))
+    
     def _on_files_added(self, count: int):
         """Handle files added to queue"""
         self.statusBar().showMessage(self.i18n.t("messages.images_added", count))
@@ -738,6 +785,8 @@ class MainWindow(QMainWindow):
             
             self.batch_worker.cancel()
         
+        self.batch_worker.shutdown()
+        
         # Save window state
         self.settings.window_width = self.width()
         self.settings.window_height = self.height()
@@ -252,6 +252,16 @@ class SettingsPanel(QWidget):
         self.edge_smooth.valueChanged.connect(self._on_setting_changed)
         layout.addRow(self.i18n.t("settings_panel.edge_smooth_kernel"), self.edge_smooth)
         
+        # Proxy-resolution refinement
+        self.fast_refinement = QCheckBox(self.i18n.t("settings_panel.fast_refinement"))
+        self.fast_refinement.toggled.connect(self._on_setting_changed)
+        layout.addRow(self.fast_refinement)
+        
+        refine_desc = QLabel(self.i18n.t("settings_panel.fast_refinement_desc"))
+        refine_desc.setStyleSheet("color: gray; font-size: 11px;")
+        refine_desc.setWordWrap(True)
+        layout.addRow(refine_desc)
+        
         return widget
     
     def _create_presets_tab(self) -> QWidget:
@@ -330,6 +340,7 @@ class SettingsPanel(QWidget):
         self.min_object_size.setValue(self.settings.quality.min_object_size)
         self.smooth_edges.setChecked(self.settings.quality.smooth_edges)
         self.edge_smooth.setValue(self.settings.quality.edge_smooth_kernel)
+        self.fast_refinement.setChecked(self.settings.quality.refine_mode == "proxy")
     
     def _on_setting_changed(self):
         """Handle setting changed"""
@@ -358,6 +369,7 @@ class SettingsPanel(QWidget):
         self.settings.quality.min_object_size = self.min_object_size.value()
         self.settings.quality.smooth_edges = self.smooth_edges.isChecked()
         self.settings.quality.edge_smooth_kernel = self.edge_smooth.value()
+        self.settings.quality.refine_mode = "proxy" if self.fast_refinement.isChecked() else "full"
         
         self.settings_changed.emit()
     
@@ -417,11 +429,17 @@ class SettingsPanel(QWidget):
             self.settings.output.feather_edges = preset.feather_edges
             
             self.settings.quality.alpha_matting = preset.alpha_matting
+            self.settings.quality.matting_mode = preset.matting_mode
             self.settings.quality.remove_small_objects = preset.remove_small_objects
             self.settings.quality.min_object_size = preset.min_object_size
             self.settings.quality.smooth_edges = preset.smooth_edges
             self.settings.quality.edge_smooth_kernel = preset.edge_smooth_kernel
             
+            if preset.alpha_matting:
+                # Load the matting kernels in the background before the first image needs them
+                from bgremover.app.core.matting import start_matting_prewarm
+                start_matting_prewarm(preset.matting_mode)
+            
             # Reload UI
             self._load_settings()
             self.settings_changed.emit()
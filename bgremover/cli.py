@@ -2,12 +2,21 @@
 
 import argparse
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import List
 from loguru import logger
 
-from bgremover.app.core.pipeline import get_pipeline
-from bgremover.app.core.settings import OutputSettings, QualitySettings
+from bgremover.app.core.pipeline import get_pipeline, select_model_for_budget
+from bgremover.app.core.matting import start_matting_prewarm
+from bgremover.app.core.model_store import get_model_store
+from bgremover.app.core.mask_cache import DEFAULT_CACHE_DIR
+from bgremover.app.core.process_backend import ProcessPoolBackend
+from bgremover.app.core.streaming import StagedPipeline, StageConfig
+from bgremover.app.core.session_manager import get_session_manager
+from bgremover.app.core.buffer_pool import get_buffer_pool
+from bgremover.app.core.settings import OutputSettings, QualitySettings, DEFAULT_BATCH_SIZE, DEFAULT_BUFFER_POOL_MB
+from bgremover.app.core.render_plan import RenderPlan
 from bgremover.app.core.presets import get_preset_manager
 from bgremover.app.core.logger import setup_logger
 
@@ -36,12 +45,42 @@ def find_images(input_path: Path) -> List[Path]:
     return sorted(images)
 
 
+def sample_megapixels(input_paths: List[Path], count: int) -> List[float]:
+    """
+    Sizes of a typical batch, in megapixels
+    
+    Only image headers are read, from the first images of the run.
+    
+    Args:
+        input_paths: Images to process
+        count: Number of images in a batch
+    
+    Returns:
+        Megapixels of count images
+    """
+    from PIL import Image
+    
+    sizes = []
+    for path in input_paths[:max(count, 1)]:
+        try:
+            with Image.open(path) as image:
+                sizes.append(image.width * image.height / 1_000_000)
+        except Exception as e:
+            logger.warning(f"Could not read size of {path.name}: {e}")
+    
+    average = sum(sizes) / len(sizes) if sizes else 1.0
+    return [average] * count
+
+
 def process_images(
     input_paths: List[Path],
     output_dir: Path,
     output_settings: OutputSettings,
     quality_settings: QualitySettings,
-    suffix: str = "_nobg"
+    suffix: str = "_nobg",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    jobs: int = 1,
+    processor=None
 ) -> tuple:
     """
     Process multiple images
@@ -52,34 +91,45 @@ def process_images(
         output_settings: Output configuration
         quality_settings: Quality configuration
         suffix: Filename suffix
+        batch_size: Number of images per inference run
+        jobs: Number of batches processed concurrently
+        processor: Pipeline, StagedPipeline or ProcessPoolBackend to use
+            (default: shared pipeline)
     
     Returns:
         Tuple of (successful_count, failed_count)
     """
     output_dir.mkdir(parents=True, exist_ok=True)
     
-    pipeline = get_pipeline()
+    if processor is None:
+        processor = get_pipeline()
+    
+    # Resolve the settings once; every batch and worker renders from this plan
+    plan = RenderPlan.compile(output_settings, quality_settings)
     
     successful = 0
     failed = 0
     
     total = len(input_paths)
-    
-    for i, input_path in enumerate(input_paths, 1):
-        logger.info(f"Processing {i}/{total}: {input_path.name}")
+    batch_size = max(1, batch_size)
+    
+    if isinstance(processor, StagedPipeline):
+        # Stream everything through the stages in one go
+        output_paths = [
+            output_dir / f"{input_path.stem}{suffix}.{output_settings.format}"
+            for input_path in input_paths
+        ]
         
-        # Create output filename
-        output_filename = f"{input_path.stem}{suffix}.{output_settings.format}"
-        output_path = output_dir / output_filename
+        results = processor.process_batch(
+            input_paths,
+            output_paths,
+            output_settings,
+            quality_settings,
+            batch_size=batch_size,
+            plan=plan
+        )
         
-        try:
-            success = pipeline.process_image(
-                input_path,
-                output_path,
-                output_settings,
-                quality_settings
-            )
-            
+        for input_path, output_path, success in zip(input_paths, output_paths, results):
             if success:
                 successful += 1
                 logger.success(f"✓ Saved: {output_path.name}")
@@ -87,9 +137,42 @@ def process_images(
                 failed += 1
                 logger.error(f"✗ Failed: {input_path.name}")
         
+        return successful, failed
+    
+    def process_chunk(start: int) -> tuple:
+        batch = input_paths[start:start + batch_size]
+        logger.info(f"Processing {start + 1}-{start + len(batch)}/{total}")
+        
+        # Create output filenames
+        output_paths = [
+            output_dir / f"{input_path.stem}{suffix}.{output_settings.format}"
+            for input_path in batch
+        ]
+        
+        try:
+            results = processor.process_batch(
+                batch,
+                output_paths,
+                output_settings,
+                quality_settings,
+                batch_size=batch_size,
+                plan=plan
+            )
         except Exception as e:
-            failed += 1
-            logger.error(f"✗ Error processing {input_path.name}: {e}")
+            logger.error(f"✗ Error processing batch: {e}")
+            results = [False] * len(batch)
+        
+        return batch, output_paths, results
+    
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+        for batch, output_paths, results in executor.map(process_chunk, range(0, total, batch_size)):
+            for input_path, output_path, success in zip(batch, output_paths, results):
+                if success:
+                    successful += 1
+                    logger.success(f"✓ Saved: {output_path.name}")
+                else:
+                    failed += 1
+                    logger.error(f"✗ Failed: {input_path.name}")
     
     return successful, failed
 
@@ -110,8 +193,26 @@ Examples:
   # Custom background color
   python -m bgremover.cli --input ./photos --output ./output --bg-color "#FF0000"
   
+  # Vertical gradient background
+  python -m bgremover.cli --input ./photos --output ./output --bg-gradient "#FFFFFF,#C0C0C0"
+  
   # Custom canvas size
   python -m bgremover.cli --input ./photos --output ./output --size 1600x1600
+  
+  # One model per process on 16 cores
+  python -m bgremover.cli --input ./photos --output ./output --jobs 16 --backend process
+  
+  # Quantized INT8 model (smaller and faster on CPU)
+  python -m bgremover.cli --input ./photos --output ./output --model u2net_int8
+  
+  # Best model that predicts a batch in under 2 seconds within 1 GB
+  python -m bgremover.cli --input ./photos --output ./output --model auto --latency-budget 2000 --memory-budget 1024
+  
+  # Show which stages a preset runs and what they cost, without processing
+  python -m bgremover.cli --input ./photos --output ./output --preset marketplace --explain
+  
+  # Soft hair edges without pymatting
+  python -m bgremover.cli --input ./photos --output ./output --matting-mode guided
         """
     )
     
@@ -164,6 +265,21 @@ Examples:
         help='Background image path'
     )
     
+    parser.add_argument(
+        '--bg-gradient',
+        type=str,
+        metavar='START,END',
+        help='Gradient background between two hex colors (e.g., #FFFFFF,#C0C0C0)'
+    )
+    
+    parser.add_argument(
+        '--gradient-direction',
+        type=str,
+        choices=['vertical', 'horizontal', 'diagonal'],
+        default='vertical',
+        help='Gradient background direction (default: vertical)'
+    )
+    
     parser.add_argument(
         '--size',
         type=str,
@@ -190,6 +306,108 @@ Examples:
         help='Enable alpha matting for better quality (slower)'
     )
     
+    parser.add_argument(
+        '--matting-mode',
+        type=str,
+        choices=['closed_form', 'guided'],
+        help='Alpha matting method: closed_form (pymatting) or guided (fast guided filter, '
+             'no pymatting needed); implies --alpha-matting'
+    )
+    
+    parser.add_argument(
+        '--model',
+        type=str,
+        default='u2net',
+        help='Model to use (u2net, u2net_int8, u2netp, silueta, isnet-general-use, a registered local model, '
+             'or auto to pick one from the budgets); u2net_int8 is quantized from u2net on first use '
+             '(needs the onnx package) (default: u2net)'
+    )
+    
+    parser.add_argument(
+        '--latency-budget',
+        type=float,
+        help='With --model auto: maximum estimated inference time per batch, in milliseconds'
+    )
+    
+    parser.add_argument(
+        '--memory-budget',
+        type=float,
+        help='With --model auto: maximum peak memory of the model, in MB'
+    )
+    
+    parser.add_argument(
+        '--refine-mode',
+        type=str,
+        choices=['full', 'proxy'],
+        default='full',
+        help='Refine masks at full resolution, or at reduced resolution with edge-aware upsampling (faster on large images) (default: full)'
+    )
+    
+    parser.add_argument(
+        '--fill-holes',
+        type=int,
+        metavar='PIXELS',
+        help='Fill holes in the mask up to this many pixels (default: off)'
+    )
+    
+    parser.add_argument(
+        '--auto-crop',
+        type=int,
+        nargs='?',
+        const=0,
+        metavar='ALPHA',
+        help='Crop output to the object, ignoring pixels with alpha at or below ALPHA (default: off; ALPHA: 0)'
+    )
+    
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=DEFAULT_BATCH_SIZE,
+        help=f'Images per inference run (default: {DEFAULT_BATCH_SIZE})'
+    )
+    
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=1,
+        help='Number of parallel workers (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--backend',
+        type=str,
+        choices=['thread', 'process'],
+        default='thread',
+        help='Run workers as streaming threads sharing one model, or as processes with one model each (default: thread)'
+    )
+    
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=0,
+        help='Total CPU threads shared by all workers (default: all CPUs)'
+    )
+    
+    parser.add_argument(
+        '--buffer-pool',
+        type=int,
+        default=DEFAULT_BUFFER_POOL_MB,
+        metavar='MB',
+        help=f'Memory kept for reusing same-sized image buffers, 0 to disable (default: {DEFAULT_BUFFER_POOL_MB})'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Disable the on-disk mask cache'
+    )
+    
+    parser.add_argument(
+        '--cache-dir',
+        type=str,
+        help='Mask cache directory (default: ~/.bgremover/cache)'
+    )
+    
     parser.add_argument(
         '--lang',
         type=str,
@@ -198,6 +416,12 @@ Examples:
         help='Language for messages (default: en)'
     )
     
+    parser.add_argument(
+        '--explain',
+        action='store_true',
+        help='Print the render plan with estimated per-stage cost and exit without processing'
+    )
+    
     parser.add_argument(
         '--debug',
         action='store_true',
@@ -228,6 +452,11 @@ Examples:
     
     logger.info(f"Found {len(images)} images")
     
+    if args.model != "auto" and args.model not in get_model_store().MODELS:
+        logger.error(f"Unknown model: {args.model}")
+        logger.info(f"Available models: auto, {', '.join(get_model_store().MODELS)}")
+        sys.exit(1)
+    
     # Configure settings
     if args.preset:
         # Load preset
@@ -258,6 +487,7 @@ Examples:
         
         quality_settings = QualitySettings(
             alpha_matting=preset.alpha_matting,
+            matting_mode=preset.matting_mode,
             remove_small_objects=preset.remove_small_objects,
             min_object_size=preset.min_object_size,
             smooth_edges=preset.smooth_edges,
@@ -266,10 +496,18 @@ Examples:
     else:
         # Create settings from arguments
         background_type = "transparent"
+        gradient_start, gradient_end = None, "#000000"
         if args.bg_color:
             background_type = "color"
         elif args.bg_image:
             background_type = "image"
+        elif args.bg_gradient:
+            background_type = "gradient"
+            try:
+                gradient_start, gradient_end = args.bg_gradient.split(',')
+            except ValueError:
+                logger.error(f"Invalid gradient: {args.bg_gradient}. Use START,END")
+                sys.exit(1)
         
         canvas_width = None
         canvas_height = None
@@ -286,8 +524,10 @@ Examples:
             format=args.format,
             quality=args.quality,
             background_type=background_type,
-            background_color=args.bg_color or "#FFFFFF",
+            background_color=args.bg_color or gradient_start or "#FFFFFF",
             background_image=args.bg_image,
+            gradient_color=gradient_end,
+            gradient_direction=args.gradient_direction,
             canvas_width=canvas_width,
             canvas_height=canvas_height,
             center_object=True,
@@ -298,15 +538,87 @@ Examples:
             alpha_matting=args.alpha_matting
         )
     
+    quality_settings.refine_mode = args.refine_mode
+    if args.matting_mode:
+        quality_settings.alpha_matting = True
+        quality_settings.matting_mode = args.matting_mode
+    if args.fill_holes:
+        quality_settings.fill_holes = True
+        quality_settings.max_hole_size = args.fill_holes
+    if args.auto_crop is not None:
+        output_settings.auto_crop = True
+        output_settings.auto_crop_threshold = args.auto_crop
+    
+    if args.explain:
+        plan = RenderPlan.compile(output_settings, quality_settings)
+        print(plan.explain(sample_megapixels(images, 1)[0]))
+        sys.exit(0)
+    
+    # Configure mask cache
+    cache_dir = None if args.no_cache else Path(args.cache_dir or DEFAULT_CACHE_DIR)
+    
+    # Only the streaming infer stage runs inference on the thread backend;
+    # --jobs widens decoding and post-processing there
+    jobs = max(1, args.jobs)
+    infer_workers = jobs if args.backend == "process" else StageConfig().infer_workers
+    
+    # Pick a model from the budgets, for a batch of typical images
+    model_name = args.model
+    if model_name == "auto":
+        get_session_manager().configure(args.threads, workers=infer_workers)
+        model_name = select_model_for_budget(
+            sample_megapixels(images, max(1, args.batch_size)),
+            latency_budget_ms=args.latency_budget,
+            memory_budget_mb=args.memory_budget
+        )
+    
+    # Configure backend
+    mask_cache = None
+    pipeline = None
+    if args.backend == "process":
+        processor = ProcessPoolBackend(
+            max_workers=max(1, args.jobs),
+            model_name=model_name,
+            cache_dir=cache_dir,
+            thread_budget=args.threads,
+            buffer_pool_mb=args.buffer_pool
+        )
+    else:
+        get_session_manager().configure(args.threads, workers=infer_workers)
+        get_buffer_pool().set_max_size(args.buffer_pool)
+        if quality_settings.alpha_matting:
+            # Warm up the matting kernels while the model loads
+            start_matting_prewarm(quality_settings.matting_mode)
+        pipeline = get_pipeline(model_name, cache_dir=cache_dir)
+        mask_cache = pipeline.mask_cache
+        
+        # Overlap decoding and encoding with inference
+        processor = StagedPipeline(
+            pipeline,
+            StageConfig(
+                decode_workers=jobs,
+                infer_workers=infer_workers,
+                postprocess_workers=jobs,
+                encode_workers=jobs
+            )
+        )
+    
     # Process images
     logger.info("Starting batch processing...")
-    successful, failed = process_images(
-        images,
-        output_dir,
-        output_settings,
-        quality_settings,
-        args.suffix
-    )
+    try:
+        successful, failed = process_images(
+            images,
+            output_dir,
+            output_settings,
+            quality_settings,
+            args.suffix,
+            args.batch_size,
+            args.jobs,
+            processor
+        )
+    finally:
+        if isinstance(processor, ProcessPoolBackend):
+            processor.shutdown()
     
     # Summary
     logger.info("=" * 50)
@@ -314,6 +626,11 @@ Examples:
     if failed > 0:
         logger.error(f"✗ Failed: {failed}/{len(images)} images")
     logger.info(f"Output directory: {output_dir}")
+    if mask_cache is not None:
+        logger.info(f"Mask cache: {mask_cache.hits} hits, {mask_cache.misses} misses")
+    if pipeline is not None:
+        pipeline.log_latency_summary()
+        logger.info(f"Buffer pool: {pipeline.buffer_pool.describe()}")
     logger.info("=" * 50)
     
     # Exit code
@@ -0,0 +1,125 @@
+"""Test background asset cache"""
+
+import os
+import threading
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from bgremover.app.core.backgrounds import BackgroundCache
+from bgremover.app.core.image_ops import ImageOperations
+
+
+@pytest.fixture
+def background_path(tmp_path):
+    """Create a background image file"""
+    path = tmp_path / "background.png"
+    Image.new("RGB", (40, 30), (0, 0, 255)).save(path)
+    return path
+
+
+def test_image_decoded_once_per_size(background_path):
+    """Test the same background at the same size is decoded once"""
+    cache = BackgroundCache()
+    
+    first = cache.image(background_path, (80, 60))
+    second = cache.image(str(background_path), (80, 60))
+    
+    assert first is second
+    assert first.shape == (60, 80, 3)
+    assert tuple(first[30, 40]) == (0, 0, 255)
+    assert not first.flags.writeable
+    assert (cache.hits, cache.misses) == (1, 1)
+    
+    # Another size is resized from the decoded source, not decoded again
+    cache.image(background_path, (40, 30))
+    cache.image(background_path, (100, 70))
+    assert cache.misses == 3
+    assert cache.decodes == 1
+
+
+def test_image_reloaded_when_modified(background_path):
+    """Test a changed file is decoded again"""
+    cache = BackgroundCache()
+    cache.image(background_path, (40, 30))
+    
+    Image.new("RGB", (40, 30), (255, 0, 0)).save(background_path)
+    stat = os.stat(background_path)
+    os.utime(background_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    
+    assert tuple(cache.image(background_path, (40, 30))[0, 0]) == (255, 0, 0)
+
+
+def test_image_keeps_transparency(tmp_path):
+    """Test a background with an alpha channel keeps it"""
+    path = tmp_path / "overlay.png"
+    Image.new("RGBA", (40, 30), (0, 255, 0, 128)).save(path)
+    
+    background = BackgroundCache().image(path, (20, 15))
+    
+    assert background.shape == (15, 20, 4)
+    assert tuple(background[7, 10]) == (0, 255, 0, 128)
+
+
+def test_concurrent_requests_build_once(background_path):
+    """Test workers asking at the same time share one decode"""
+    cache = BackgroundCache()
+    results = []
+    
+    def worker():
+        results.append(cache.image(background_path, (400, 300)))
+    
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert cache.misses == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_least_recently_used_evicted():
+    """Test the cache keeps backgrounds within its byte limit"""
+    cache = BackgroundCache(max_mb=1)
+    
+    # Diagonal gradients are full arrays of 480 KB each
+    cache.gradient((400, 400), (0, 0, 0), (255, 255, 255), "diagonal")
+    cache.gradient((400, 401), (0, 0, 0), (255, 255, 255), "diagonal")
+    cache.gradient((400, 400), (0, 0, 0), (255, 255, 255), "diagonal")
+    cache.gradient((400, 402), (0, 0, 0), (255, 255, 255), "diagonal")
+    
+    assert len(cache) == 2
+    assert cache.size_mb() <= 1
+    cache.gradient((400, 400), (0, 0, 0), (255, 255, 255), "diagonal")
+    assert cache.misses == 3
+
+
+def test_gradient_kept_as_broadcast_view():
+    """Test a vertical gradient costs one column of memory, however large"""
+    cache = BackgroundCache()
+    
+    gradient = cache.gradient((4000, 3000), (0, 0, 0), (255, 255, 255))
+    
+    assert gradient.shape == (3000, 4000, 3)
+    assert not gradient.flags.writeable
+    assert cache.size_mb() < 0.01
+
+
+@pytest.mark.parametrize("direction", ["vertical", "horizontal", "diagonal"])
+def test_gradient_array_matches_float_reference(direction):
+    """Test the uint8 gradient matches the float computation"""
+    width, height = 70, 300
+    x = np.linspace(0, 1, width)[None, :]
+    y = np.linspace(0, 1, height)[:, None]
+    t = {"vertical": y + 0 * x, "horizontal": x + 0 * y, "diagonal": (x + y) / 2}[direction]
+    reference = np.rint(np.array([10, 200, 30]) + np.array([230, -200, 0]) * t[:, :, None])
+    
+    result = ImageOperations.gradient_array((width, height), (10, 200, 30), (240, 0, 30), direction)
+    
+    assert result.shape == (height, width, 3)
+    assert result.dtype == np.uint8
+    assert np.abs(result.astype(int) - reference).max() <= 1
+    assert tuple(result[0, 0]) == (10, 200, 30)
+    assert tuple(result[-1, -1]) == (240, 0, 30)
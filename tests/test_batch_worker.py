@@ -0,0 +1,136 @@
+"""Test batch workers"""
+
+import pytest
+from PIL import Image
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QCoreApplication
+
+from bgremover.app.core import batch_worker
+from bgremover.app.core.batch_worker import (
+    BatchWorker, BatchProcessingWorker, ProcessingTask, ProcessingWorker, StreamingWorker, WorkerSignals
+)
+from bgremover.app.core.settings import OutputSettings, QualitySettings
+from bgremover.app.core.streaming import StageConfig
+from tests.test_streaming import FakePipeline
+
+
+@pytest.fixture
+def app():
+    """Application whose event loop delivers cross-thread signals"""
+    return QCoreApplication.instance() or QCoreApplication([])
+
+
+@pytest.fixture
+def tasks(tmp_path):
+    """Create tasks with test images"""
+    tasks = []
+    for i in range(3):
+        input_path = tmp_path / f"input_{i}.png"
+        Image.new('RGB', (50, 40), color=(i * 40, 0, 0)).save(input_path)
+        tasks.append(ProcessingTask(id=i, input_path=input_path, output_path=tmp_path / f"output_{i}.png"))
+    return tasks
+
+
+def record_signals(signals):
+    """Collect the task signals a worker emits"""
+    events = []
+    signals.task_started.connect(lambda task_id: events.append(("started", task_id)))
+    signals.task_completed.connect(lambda task_id, path: events.append(("completed", task_id)))
+    signals.task_failed.connect(lambda task_id, error: events.append(("failed", task_id)))
+    return events
+
+
+def test_workers_construct(tasks):
+    """Test every worker type can be built with its defaults"""
+    signals = WorkerSignals()
+    
+    ProcessingWorker(tasks[0], OutputSettings(), QualitySettings(), signals)
+    BatchProcessingWorker(tasks, OutputSettings(), QualitySettings(), signals)
+    StreamingWorker(tasks, OutputSettings(), QualitySettings(), signals, StageConfig())
+    
+    for backend in ("thread", "process"):
+        worker = BatchWorker(backend=backend, stage_config=StageConfig())
+        assert worker.process_backend is None  # processes start with the first batch
+
+
+class FakeProcessBackend:
+    """Process pool stand-in that records its settings and shutdown"""
+    
+    def __init__(self, max_workers, model_name, cache_dir, thread_budget, buffer_pool_mb):
+        self.max_workers = max_workers
+        self.model_name = model_name
+        self.thread_budget = thread_budget
+        self.buffer_pool_mb = buffer_pool_mb
+        self.stopped = False
+    
+    def process_image(self, input_path, output_path, output_settings, quality_settings, plan=None):
+        return True
+    
+    def shutdown(self, wait=True):
+        self.stopped = True
+
+
+def test_process_pool_rebuilt_when_settings_change(tasks, tmp_path, monkeypatch):
+    """Test worker processes are reused across batches until their settings change"""
+    monkeypatch.setattr(batch_worker, "ProcessPoolBackend", FakeProcessBackend)
+    monkeypatch.setattr(batch_worker, "_get_pipeline", FakePipeline)
+    settings = dict(
+        max_workers=2, batch_size=1, backend="process", stage_config=None,
+        thread_budget=4, model_name="u2net", buffer_pool_mb=64
+    )
+    worker = BatchWorker()
+    worker.configure(**settings)
+    worker.add_tasks([task.input_path for task in tasks], tmp_path / "out", OutputSettings(), QualitySettings())
+    
+    def run_batch():
+        assert worker.start()
+        worker.thread_pool.waitForDone()
+        return worker.process_backend
+    
+    first = run_batch()
+    assert run_batch() is first
+    
+    for name, value in (("model_name", "isnet-general-use"), ("max_workers", 3), ("thread_budget", 8)):
+        settings[name] = value
+        worker.configure(**settings)
+        backend = run_batch()
+        assert backend is not first and first.stopped
+        assert getattr(backend, name) == value
+        first = backend
+    
+    # Switching to the thread backend stops the processes
+    settings.update(backend="thread", stage_config=StageConfig())
+    worker.configure(**settings)
+    run_batch()
+    assert first.stopped and worker.process_backend is None
+
+
+def test_streaming_worker_reports_every_task(app, tasks, monkeypatch):
+    """Test the streaming worker runs its tasks through the staged pipeline"""
+    monkeypatch.setattr(batch_worker, "_get_pipeline", FakePipeline)
+    signals = WorkerSignals()
+    events = record_signals(signals)
+    
+    worker = StreamingWorker(tasks, OutputSettings(), QualitySettings(), signals, StageConfig(), batch_size=2)
+    worker.run()
+    # Results are signalled from the encode threads and delivered through the event loop
+    app.processEvents()
+    
+    assert sorted(event for event in events if event[0] == "completed") == [("completed", task.id) for task in tasks]
+    assert not [event for event in events if event[0] == "failed"]
+    assert all(task.output_path.exists() for task in tasks)
+
+
+def test_cancelled_streaming_worker_fails_tasks(tasks, monkeypatch):
+    """Test tasks a cancelled streaming worker never finished are reported"""
+    monkeypatch.setattr(batch_worker, "_get_pipeline", FakePipeline)
+    signals = WorkerSignals()
+    events = record_signals(signals)
+    
+    worker = StreamingWorker(tasks, OutputSettings(), QualitySettings(), signals, StageConfig())
+    worker.cancel()
+    worker.run()
+    
+    assert sorted(event for event in events if event[0] == "failed") == [("failed", task.id) for task in tasks]
@@ -0,0 +1,112 @@
+"""Test reusable buffer pool"""
+
+import threading
+
+import numpy as np
+
+from bgremover.app.core.buffer_pool import BufferPool, borrow
+
+
+def test_released_buffer_reused():
+    """Test a returned array is handed out again for the same shape and dtype"""
+    pool = BufferPool(max_mb=16)
+    
+    first = pool.acquire((100, 200, 4))
+    pool.release(first)
+    second = pool.acquire((100, 200, 4))
+    
+    assert second is first
+    assert (pool.allocations, pool.reuses) == (1, 1)
+    assert pool.retained_mb() == 0
+
+
+def test_shape_and_dtype_keep_separate_lists():
+    """Test arrays are only reused for the exact shape and dtype"""
+    pool = BufferPool(max_mb=16)
+    array = pool.acquire((100, 200))
+    pool.release(array)
+    
+    assert pool.acquire((200, 100)) is not array
+    assert pool.acquire((100, 200), np.float32) is not array
+    assert pool.acquire((100, 200)) is array
+    assert pool.allocations == 3
+
+
+def test_retained_memory_capped():
+    """Test the least recently returned arrays are dropped beyond the limit"""
+    pool = BufferPool(max_mb=1)
+    small = [pool.acquire((512, 512)) for _ in range(3)]
+    large = pool.acquire((1024, 1024))
+    
+    for array in small:
+        pool.release(array)
+    assert pool.retained_mb() == 0.75
+    
+    pool.release(large)
+    
+    assert pool.retained_mb() == 1
+    assert pool.drops == 3
+    assert pool.acquire((1024, 1024)) is large
+
+
+def test_disabled_pool_keeps_nothing():
+    """Test a zero limit allocates every time"""
+    pool = BufferPool(max_mb=0)
+    array = pool.acquire((10, 10))
+    pool.release(array)
+    
+    assert pool.acquire((10, 10)) is not array
+    assert pool.retained_mb() == 0
+
+
+def test_views_not_taken_back():
+    """Test arrays that do not own their memory are ignored"""
+    pool = BufferPool(max_mb=16)
+    array = pool.acquire((100, 100, 4))
+    
+    pool.release(array[:, :, 3])
+    pool.release(array[10:20])
+    
+    assert pool.retained_mb() == 0
+
+
+def test_lease_returns_everything():
+    """Test a lease gives back all its arrays when it closes"""
+    pool = BufferPool(max_mb=16)
+    
+    with pool.lease() as lease:
+        buffer = lease.empty((50, 60, 4))
+        alpha = borrow((50, 60), lease=lease)
+        assert pool.retained_mb() == 0
+    
+    assert pool.acquire((50, 60, 4)) is buffer
+    assert pool.acquire((50, 60)) is alpha
+    assert borrow((50, 60)).shape == (50, 60)
+
+
+def test_concurrent_leases_never_share_arrays():
+    """Test workers borrowing at the same time each get their own arrays"""
+    pool = BufferPool(max_mb=16)
+    seen = []
+    lock = threading.Lock()
+    
+    def worker():
+        for _ in range(50):
+            with pool.lease() as lease:
+                array = lease.empty((64, 64))
+                with lock:
+                    seen.append(id(array))
+                    in_use = seen.count(id(array))
+                array.fill(0)
+                with lock:
+                    seen.remove(id(array))
+                assert in_use == 1
+    
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert pool.allocations + pool.reuses == 200
+    assert pool.allocations <= 4
@@ -29,6 +29,35 @@ def test_apply_feather(test_image, test_mask):
     assert result.size == test_image.size
 
 
+@pytest.mark.parametrize("radius", [2, 12])
+def test_feather_alpha_matches_whole_image_blur(radius):
+    """Test band-only feathering equals blurring the whole channel"""
+    alpha = np.zeros((300, 400), dtype=np.uint8)
+    alpha[100:200, 150:250] = 255
+    alpha[0:10, 390:400] = 128  # edge touching the image border
+    
+    blur, reach = ImageOperations._feather_filter(radius)
+    expected = blur(alpha.copy())
+    result = ImageOperations.feather_alpha(alpha.copy(), radius, tile_size=32)
+    
+    assert np.array_equal(result, expected)
+    assert result[150, 200] == 255
+    assert result[280, 20] == 0
+
+
+def test_feather_alpha_strided_view():
+    """Test feathering the alpha plane of an RGBA buffer in place"""
+    buffer = np.zeros((120, 160, 4), dtype=np.uint8)
+    buffer[:, :, 0] = 200
+    buffer[40:80, 60:100, 3] = 255
+    
+    ImageOperations.feather_alpha(buffer[:, :, 3], 3)
+    
+    assert 0 < buffer[40, 80, 3] < 255
+    assert buffer[60, 80, 3] == 255
+    assert np.all(buffer[:, :, 0] == 200)
+
+
 def test_resize_with_padding(test_image):
     """Test resize with padding"""
     ops = ImageOperations()
@@ -43,6 +72,44 @@ def test_resize_with_padding(test_image):
     assert result.size == (200, 200)
 
 
+@pytest.mark.parametrize("bg_color", [(255, 255, 255, 0), (0, 0, 255, 255)])
+def test_resize_with_padding_resamples_content_only(bg_color):
+    """Test the canvas matches resizing the whole image, without touching the input"""
+    rng = np.random.default_rng(0)
+    pixels = np.zeros((400, 300, 4), dtype=np.uint8)
+    pixels[150:250, 100:180] = rng.integers(0, 256, (100, 80, 4), dtype=np.uint8)
+    pixels[160:240, 110:170, 3] = 255
+    image = Image.fromarray(pixels)
+    
+    result = ImageOperations.resize_with_padding(image, (150, 150), margin=5, bg_color=bg_color)
+    
+    resized = image.resize((105, 140), Image.Resampling.LANCZOS)
+    reference = Image.new("RGBA", (150, 150), bg_color)
+    if bg_color[3] == 0:
+        reference.paste(resized, (22, 5))
+    else:
+        reference.alpha_composite(resized, (22, 5))
+    
+    assert result.mode == ("RGB" if bg_color[3] == 255 else "RGBA")
+    result, reference = np.asarray(result.convert("RGBA")), np.asarray(reference)
+    visible = reference[:, :, 3] > 0  # the color of transparent pixels does not matter
+    assert np.array_equal(result[:, :, 3], reference[:, :, 3])
+    # Resampling from a shifted box origin rounds Pillow's coefficients slightly differently
+    assert np.abs(result[visible].astype(int) - reference[visible].astype(int)).max() <= 2
+    assert np.array_equal(np.asarray(image), pixels)
+
+
+def test_content_bbox():
+    """Test the bounding box of pixels above the alpha threshold"""
+    alpha = np.zeros((50, 60), dtype=np.uint8)
+    alpha[10:20, 30:40] = 255
+    alpha[5, 5] = 8
+    
+    assert ImageOperations.content_bbox(alpha) == (5, 5, 40, 20)
+    assert ImageOperations.content_bbox(alpha, threshold=8) == (30, 10, 40, 20)
+    assert ImageOperations.content_bbox(np.zeros((5, 5), dtype=np.uint8)) is None
+
+
 def test_apply_solid_background(test_image):
     """Test solid background"""
     ops = ImageOperations()
@@ -53,6 +120,38 @@ def test_apply_solid_background(test_image):
     assert result.size == test_image.size
 
 
+def test_composite_over_matches_alpha_composite():
+    """Test the integer compositor matches PIL over opaque and translucent backgrounds"""
+    rng = np.random.default_rng(0)
+    foreground = rng.integers(0, 256, (300, 80, 4), dtype=np.uint8)
+    foreground[:100, :, 3] = 0
+    foreground[100:200, :, 3] = 255
+    
+    for background_alpha in (255, 100):
+        background = rng.integers(0, 256, (300, 80, 4), dtype=np.uint8)
+        background[:, :, 3] = background_alpha
+        reference = Image.alpha_composite(Image.fromarray(background), Image.fromarray(foreground))
+        
+        result = foreground.copy()
+        ImageOperations.composite_over(result, background)
+        
+        assert np.abs(result.astype(int) - np.asarray(reference).astype(int)).max() <= 1
+        assert np.array_equal(result[100:200], foreground[100:200])
+
+
+def test_composite_over_color():
+    """Test compositing over a color fills transparent pixels and makes alpha opaque"""
+    foreground = np.zeros((10, 10, 4), dtype=np.uint8)
+    foreground[:, 5:] = (200, 100, 0, 255)
+    foreground[:, 4] = (200, 100, 0, 128)
+    
+    ImageOperations.composite_over(foreground, (0, 0, 255))
+    
+    assert tuple(foreground[0, 0]) == (0, 0, 255, 255)
+    assert tuple(foreground[0, 9]) == (200, 100, 0, 255)
+    assert tuple(foreground[0, 4]) == (100, 50, 127, 255)
+
+
 def test_apply_image_background(test_image):
     """Test image background"""
     ops = ImageOperations()
@@ -85,6 +184,134 @@ def test_refine_mask_morphology():
     assert result.shape == mask.shape
 
 
+def test_refine_mask_morphology_in_place():
+    """Test refining into the mask itself matches refining a copy"""
+    rng = np.random.default_rng(0)
+    mask = np.where(rng.random((120, 150)) > 0.4, 255, 0).astype(np.uint8)
+    original = mask.copy()
+    settings = dict(min_object_size=20, smooth_edges=True, kernel_size=5, fill_holes=True, max_hole_size=30)
+    
+    expected = ImageOperations.refine_mask_morphology(mask, **settings)
+    assert np.array_equal(mask, original)
+    
+    result = ImageOperations.refine_mask_morphology(mask, out=mask, **settings)
+    
+    assert result is mask
+    assert np.array_equal(result, expected)
+
+
+def test_remove_small_components_by_pixel_area():
+    """Test regions below the size are cleared, including ones touching each other diagonally"""
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[10:40, 10:40] = 255  # 900 px, kept
+    mask[60:65, 60:65] = 128  # 25 px, soft, removed
+    mask[65:70, 65:70] = 255  # diagonal neighbour: one 50 px region with the above
+    mask[80:82, 10:12] = 255  # 4 px, removed
+    
+    result = ImageOperations.remove_small_components(mask.copy(), 50)
+    
+    assert result[20, 20] == 255
+    assert result[62, 62] == 128
+    assert result[67, 67] == 255
+    assert result[81, 11] == 0
+    
+    result = ImageOperations.remove_small_components(mask.copy(), 51)
+    assert result[62, 62] == 0
+    assert result[67, 67] == 0
+
+
+def test_remove_small_components_many_specks():
+    """Test thousands of specks are removed in one pass"""
+    mask = np.zeros((400, 400), dtype=np.uint8)
+    mask[::4, ::4] = 255
+    mask[102:298, 102:298] = 255
+    
+    result = ImageOperations.remove_small_components(mask, 100)
+    
+    assert np.count_nonzero(result) == 196 * 196
+
+
+def test_remove_small_components_past_16_bit_labels():
+    """Test more regions than 16-bit labels can count are still removed"""
+    mask = np.zeros((900, 900), dtype=np.uint8)
+    mask[::3, ::3] = 255  # 90000 specks
+    mask[302:598, 302:598] = 255
+    
+    result = ImageOperations.remove_small_components(mask, 100)
+    
+    assert np.count_nonzero(result) == 296 * 296
+
+
+def test_fill_small_holes():
+    """Test only enclosed holes up to the size are filled"""
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[10:90, 10:90] = 255
+    mask[20:25, 20:25] = 0  # 25 px hole, filled
+    mask[40:60, 40:60] = 0  # 400 px hole, kept
+    
+    result = ImageOperations.refine_mask_morphology(
+        mask,
+        remove_small_objects=False,
+        smooth_edges=False,
+        fill_holes=True,
+        max_hole_size=100
+    )
+    
+    assert result[22, 22] == 255
+    assert result[50, 50] == 0
+    assert result[5, 5] == 0  # outside, touches the border
+
+
+def test_guided_upsample_follows_edges():
+    """Test guided upsampling snaps to the guide's edges"""
+    ops = ImageOperations()
+    
+    # Guide with a sharp edge at x=97 that falls between proxy pixels
+    guide = np.zeros((200, 200, 3), dtype=np.uint8)
+    guide[:, 97:] = 255
+    mask = np.zeros((50, 50), dtype=np.uint8)
+    mask[:, 24:] = 255
+    
+    result = ops.guided_upsample(mask, guide, radius=2)
+    
+    assert result.shape == (200, 200)
+    assert result.dtype == np.uint8
+    assert result[100, 90] < 32
+    assert result[100, 104] > 223
+
+
+def test_refine_mask_proxy_matches_full():
+    """Test proxy refinement stays close to full-resolution refinement"""
+    ops = ImageOperations()
+    
+    guide = np.full((1200, 1600, 3), 40, dtype=np.uint8)
+    guide[300:900, 400:1200] = 220
+    mask = np.zeros((1200, 1600), dtype=np.uint8)
+    mask[300:900, 400:1200] = 255
+    mask[50:53, 50:53] = 255  # speck to be removed
+    
+    full = ops.refine_mask_morphology(mask, min_object_size=100, kernel_size=5)
+    proxy = ops.refine_mask_proxy(mask, guide, proxy_size=400, min_object_size=100, kernel_size=5)
+    
+    assert proxy.shape == mask.shape
+    assert proxy[51, 51] == 0
+    assert np.mean(np.abs(proxy.astype(int) - full.astype(int))) < 2
+
+
+def test_refine_mask_proxy_small_image_uses_full_path():
+    """Test proxy refinement falls back on images below the proxy size"""
+    ops = ImageOperations()
+    
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[40:60, 40:60] = 255
+    guide = np.zeros((100, 100, 3), dtype=np.uint8)
+    
+    result = ops.refine_mask_proxy(mask, guide, proxy_size=1024, kernel_size=3)
+    expected = ops.refine_mask_morphology(mask, kernel_size=3)
+    
+    assert np.array_equal(result, expected)
+
+
 def test_auto_crop_transparent(test_image):
     """Test auto crop"""
     ops = ImageOperations()
@@ -99,6 +326,7 @@ def test_auto_crop_transparent(test_image):
     # Should be smaller than original
     assert result.width <= img.width
     assert result.height <= img.height
+    assert result.size == (110, 110)
 
 
 def test_create_gradient_background():
@@ -0,0 +1,155 @@
+"""Test mask cache"""
+
+import threading
+from pathlib import Path
+import pytest
+import cv2
+from PIL import Image
+import numpy as np
+
+from bgremover.app.core import mask_cache as mask_cache_module
+from bgremover.app.core.mask_cache import MaskCache
+from bgremover.app.core.settings import QualitySettings
+
+
+@pytest.fixture
+def mask_cache(tmp_path):
+    """Create mask cache in temp directory"""
+    return MaskCache(tmp_path / "cache")
+
+
+@pytest.fixture
+def test_image():
+    """Create a test image"""
+    return Image.new('RGB', (64, 48), color=(255, 0, 0))
+
+
+def test_key_depends_on_content_and_model(test_image):
+    """Test cache keys"""
+    other_image = Image.new('RGB', (64, 48), color=(0, 255, 0))
+    
+    key = MaskCache.make_key(test_image, "u2net")
+    
+    assert key == MaskCache.make_key(test_image.copy(), "u2net")
+    assert key != MaskCache.make_key(other_image, "u2net")
+    assert key != MaskCache.make_key(test_image, "u2netp")
+    assert key != MaskCache.make_key(test_image, "u2net", size=(512, 512))
+
+
+def test_refined_key_depends_on_quality_settings(test_image):
+    """Test refined cache keys"""
+    key = MaskCache.make_key(test_image, "u2net")
+    
+    default_key = MaskCache.refined_key(key, QualitySettings())
+    
+    assert default_key == MaskCache.refined_key(key, QualitySettings())
+    assert default_key != MaskCache.refined_key(key, QualitySettings(min_object_size=500))
+    assert default_key != key
+
+
+def test_put_and_get(mask_cache, test_image):
+    """Test storing and loading masks"""
+    key = MaskCache.make_key(test_image, "u2net")
+    mask = np.random.randint(0, 256, (48, 64), dtype=np.uint8)
+    
+    assert mask_cache.get(key) is None
+    
+    mask_cache.put(key, mask)
+    loaded = mask_cache.get(key)
+    
+    assert loaded is not None
+    assert np.array_equal(loaded, mask)
+    assert mask_cache.hits == 1
+    assert mask_cache.misses == 1
+
+
+def test_persists_across_instances(tmp_path, test_image):
+    """Test masks survive a new cache instance"""
+    key = MaskCache.make_key(test_image, "u2net")
+    mask = np.full((48, 64), 200, dtype=np.uint8)
+    
+    MaskCache(tmp_path / "cache").put(key, mask)
+    
+    reopened = MaskCache(tmp_path / "cache")
+    assert reopened.get_size_mb() > 0
+    assert np.array_equal(reopened.get(key), mask)
+
+
+def test_lru_eviction(tmp_path):
+    """Test least recently used masks are evicted over the size limit"""
+    mask_cache = MaskCache(tmp_path / "cache", max_size_mb=1)
+    
+    # Incompressible masks of ~250 KB each
+    rng = np.random.default_rng(0)
+    keys = [f"{i:02d}" + "0" * 38 for i in range(8)]
+    for key in keys:
+        mask_cache.put(key, rng.integers(0, 256, (500, 500), dtype=np.uint8))
+    
+    assert mask_cache.get_size_mb() <= 1
+    assert mask_cache.get(keys[0]) is None
+    assert mask_cache.get(keys[-1]) is not None
+
+
+def test_eviction_counts_masks_from_other_processes(tmp_path):
+    """Test eviction keeps a directory shared by several caches within the limit"""
+    caches = [MaskCache(tmp_path / "cache", max_size_mb=1) for _ in range(2)]
+    
+    # Each instance counts only its own writes, half of what lands on disk
+    rng = np.random.default_rng(0)
+    for i in range(10):
+        caches[i % 2].put(f"{i:02d}" + "0" * 38, rng.integers(0, 256, (500, 500), dtype=np.uint8))
+    
+    on_disk = sum(path.stat().st_size for path in (tmp_path / "cache" / "masks").rglob("*.png"))
+    assert on_disk <= 1024 * 1024
+
+
+def test_counters_under_concurrency(mask_cache, test_image):
+    """Test hits and misses are not lost when threads look up masks at once"""
+    key = MaskCache.make_key(test_image, "u2net")
+    mask_cache.put(key, np.zeros((48, 64), dtype=np.uint8))
+    
+    def look_up():
+        for _ in range(50):
+            mask_cache.get(key)
+            mask_cache.get("ff" + "0" * 38)
+    
+    threads = [threading.Thread(target=look_up) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert mask_cache.hits == 200
+    assert mask_cache.misses == 200
+
+
+def test_temporary_file_unique_per_process(mask_cache, test_image, monkeypatch):
+    """Test processes writing the same mask from equal thread idents use different temporary files"""
+    written = []
+    original = cv2.imwrite
+    
+    def imwrite(path, *args):
+        written.append(Path(path).name)
+        return original(path, *args)
+    
+    monkeypatch.setattr(mask_cache_module.cv2, "imwrite", imwrite)
+    monkeypatch.setattr(mask_cache_module.threading, "get_ident", lambda: 1)
+    key = MaskCache.make_key(test_image, "u2net")
+    
+    for pid in (100, 200):
+        monkeypatch.setattr(mask_cache_module.os, "getpid", lambda: pid)
+        mask_cache.put(key, np.zeros((48, 64), dtype=np.uint8))
+    
+    assert len(set(written)) == 2
+    assert mask_cache.get(key) is not None
+
+
+def test_clear(mask_cache, test_image):
+    """Test clearing the cache"""
+    key = MaskCache.make_key(test_image, "u2net")
+    mask_cache.put(key, np.zeros((48, 64), dtype=np.uint8))
+    
+    mask_cache.clear()
+    
+    assert mask_cache.get(key) is None
+    assert mask_cache.get_size_mb() == 0
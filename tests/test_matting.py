@@ -0,0 +1,137 @@
+"""Test band-restricted alpha matting"""
+
+import os
+import sys
+
+import pytest
+import numpy as np
+import cv2
+from PIL import Image
+
+from bgremover.app.core.matting import build_trimap, band_tiles, alpha_matting_cutout_tiled, guided_alpha_matte
+from bgremover.app.core.matting import configure_numba_cache, prewarm_matting, start_matting_prewarm
+
+
+@pytest.fixture
+def disc():
+    """Create an image of a bright disc and its soft mask"""
+    image = np.full((120, 160, 3), 40, dtype=np.uint8)
+    cv2.circle(image, (80, 60), 40, (220, 180, 150), -1)
+    
+    mask = np.zeros((120, 160), dtype=np.uint8)
+    cv2.circle(mask, (80, 60), 40, 255, -1)
+    mask = cv2.GaussianBlur(mask, (15, 15), 0)
+    
+    return image, mask
+
+
+def test_build_trimap(disc):
+    """Test trimap has definite regions and an unknown band"""
+    _, mask = disc
+    trimap = build_trimap(mask, 240, 10, erode_size=5)
+    
+    assert set(np.unique(trimap)) == {0, 128, 255}
+    assert trimap[60, 80] == 255
+    assert trimap[0, 0] == 0
+    assert trimap[60, 40] == 128
+
+
+def test_band_tiles_cover_unknown(disc):
+    """Test tiles cover every unknown pixel and respect the tile size"""
+    _, mask = disc
+    trimap = build_trimap(mask, 240, 10, erode_size=5)
+    labels, tiles = band_tiles(trimap, tile_size=32)
+    
+    covered = np.zeros(trimap.shape, dtype=bool)
+    for label, (y0, y1, x0, x1) in tiles:
+        assert y1 - y0 <= 32 and x1 - x0 <= 32
+        covered[y0:y1, x0:x1] |= labels[y0:y1, x0:x1] == label
+    
+    assert np.array_equal(covered, trimap == 128)
+    # The band is one ring, so it needs several tiles
+    assert len(tiles) > 1
+
+
+def test_alpha_matting_cutout_tiled(disc):
+    """Test tiled matting keeps definite regions and matches a single solve"""
+    pytest.importorskip("pymatting")
+    from rembg.bg import alpha_matting_cutout
+    
+    image, mask = disc
+    pil_image = Image.fromarray(image)
+    
+    result = alpha_matting_cutout_tiled(pil_image, mask, 240, 10, 5, tile_size=48)
+    reference = alpha_matting_cutout(pil_image, Image.fromarray(mask), 240, 10, 5)
+    
+    alpha = np.asarray(result)[:, :, 3].astype(int)
+    reference_alpha = np.asarray(reference)[:, :, 3].astype(int)
+    
+    assert result.mode == "RGBA"
+    assert result.size == pil_image.size
+    assert alpha[60, 80] == 255
+    assert alpha[0, 0] == 0
+    assert np.mean(np.abs(alpha - reference_alpha)) < 2
+
+
+def test_guided_alpha_matte(disc):
+    """Test guided matting keeps definite regions and softens only the band"""
+    image, mask = disc
+    hard = np.where(mask > 127, 255, 0).astype(np.uint8)
+    
+    alpha = guided_alpha_matte(image, hard, 240, 10, 5, radius=4)
+    trimap = build_trimap(hard, 240, 10, erode_size=5)
+    
+    assert alpha.shape == mask.shape
+    assert alpha.dtype == np.uint8
+    assert np.array_equal(alpha[trimap != 128], trimap[trimap != 128])
+    assert alpha[60, 80] == 255
+    assert alpha[0, 0] == 0
+
+
+def test_guided_alpha_matte_follows_image_edge():
+    """Test the alpha edge moves to the image's edge, not the mask's"""
+    image = np.full((100, 100, 3), 30, dtype=np.uint8)
+    image[:, 50:] = (220, 200, 180)
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[:, 46:] = 255  # coarse mask, 4 px too wide
+    
+    alpha = guided_alpha_matte(image, mask, 240, 10, 8)
+    row = alpha[50].astype(int)
+    
+    assert np.argmax(np.diff(row)) == 49
+    assert row[48] < 128
+    assert row[50] > 223
+
+
+@pytest.fixture
+def numba_cache_env(monkeypatch):
+    """Restore numba's cache directory after a test changes it"""
+    monkeypatch.delenv("NUMBA_CACHE_DIR", raising=False)
+    numba = sys.modules.get("numba")
+    if numba is not None:
+        monkeypatch.setattr(numba.config, "CACHE_DIR", numba.config.CACHE_DIR)
+    return monkeypatch
+
+
+def test_configure_numba_cache(tmp_path, numba_cache_env):
+    """Test the cache directory is created and an existing setting is kept"""
+    path = configure_numba_cache(tmp_path / "numba")
+    
+    assert path == tmp_path / "numba"
+    assert path.is_dir()
+    assert os.environ["NUMBA_CACHE_DIR"] == str(path)
+    assert configure_numba_cache(tmp_path / "other") == path
+
+
+def test_prewarm_matting(tmp_path, numba_cache_env):
+    """Test the pre-warm runs closed-form matting, and only for that mode"""
+    pytest.importorskip("pymatting")
+    numba_cache_env.setenv("NUMBA_CACHE_DIR", str(tmp_path))
+    
+    assert prewarm_matting() is not None
+    assert start_matting_prewarm("guided") is None
+    
+    thread = start_matting_prewarm("closed_form")
+    assert start_matting_prewarm("closed_form") is thread
+    thread.join(timeout=120)
+    assert not thread.is_alive()
@@ -0,0 +1,46 @@
+"""Test background model loading"""
+
+import pytest
+
+pytest.importorskip("PySide6")
+
+from bgremover.app.core import pipeline as pipeline_module
+from bgremover.app.core.model_loader import ModelLoader
+
+
+def test_loader_only_imports_without_warm_pipeline(monkeypatch):
+    """Test the process backend's loader does not build an in-process pipeline"""
+    def get_pipeline(*args, **kwargs):
+        raise AssertionError("in-process pipeline built")
+    
+    monkeypatch.setattr(pipeline_module, "get_pipeline", get_pipeline)
+    
+    loader = ModelLoader(warm_pipeline=False)
+    loader.start()
+    
+    assert loader.wait(timeout=30)
+    assert loader.error is None
+
+
+def test_loader_builds_pipeline(monkeypatch):
+    """Test the thread backend's loader builds and waits for the shared pipeline"""
+    class FakePipeline:
+        model_name = "u2net"
+        cold_start_seconds = 0.25
+        
+        def wait_ready(self):
+            return True
+    
+    built = []
+    
+    def get_pipeline(*args, **kwargs):
+        built.append(True)
+        return FakePipeline()
+    
+    monkeypatch.setattr(pipeline_module, "get_pipeline", get_pipeline)
+    
+    loader = ModelLoader()
+    loader.start()
+    
+    assert loader.wait(timeout=30)
+    assert built == [True]
@@ -0,0 +1,71 @@
+"""Test model registry"""
+
+import pytest
+
+from bgremover.app.core.model_registry import ModelRegistry
+from bgremover.app.core.model_store import ModelStore
+
+
+@pytest.fixture
+def registry(tmp_path):
+    """Create model registry over a store in temp directory"""
+    return ModelRegistry(ModelStore(tmp_path / "models"))
+
+
+def test_profiles_cover_all_models(registry):
+    """Test every model has cost metadata"""
+    names = [profile.name for profile in registry.profiles()]
+    
+    assert names == list(ModelStore.MODELS)
+    for profile in registry.profiles():
+        assert profile.input_size > 0
+        assert profile.ms_per_image > 0
+        assert profile.peak_rss_mb > 0
+        assert not profile.measured
+
+
+def test_measurements_replace_estimates(registry):
+    """Test recorded measurements override the estimates and persist"""
+    registry.record_measurement("u2netp", 120.0, 15.0, 180.0)
+    
+    profile = ModelRegistry(registry.model_store).get("u2netp")
+    assert profile.measured
+    assert profile.ms_per_image == 120.0
+    assert profile.estimate_ms(2.0) == 150.0
+    
+    with pytest.raises(ValueError):
+        registry.record_measurement("unknown", 1.0, 1.0, 1.0)
+
+
+def test_select_without_budget_prefers_quality(registry):
+    """Test the best model is used when nothing limits it"""
+    assert registry.select([1.0]) == "isnet-general-use"
+
+
+def test_select_within_latency_budget(registry):
+    """Test tighter latency budgets pick cheaper models"""
+    batch = [1.0] * 4
+    
+    loose = registry.get(registry.select(batch, latency_budget_ms=5000))
+    tight = registry.get(registry.select(batch, latency_budget_ms=1200))
+    
+    assert loose.estimate_batch_ms(batch) <= 5000
+    assert tight.estimate_batch_ms(batch) <= 1200
+    assert tight.quality <= loose.quality
+    
+    # More threads make the same budget go further
+    threaded = registry.get(registry.select(batch, latency_budget_ms=1200, threads=8))
+    assert threaded.quality > tight.quality
+
+
+def test_select_within_memory_budget(registry):
+    """Test the memory budget excludes large models"""
+    name = registry.select([1.0], memory_budget_mb=400)
+    
+    assert registry.get(name).peak_rss_mb <= 400
+    assert name != "isnet-general-use"
+
+
+def test_select_falls_back_to_cheapest(registry):
+    """Test an impossible budget still picks a model"""
+    assert registry.select([24.0] * 32, latency_budget_ms=1, memory_budget_mb=1) == "u2netp"
@@ -0,0 +1,165 @@
+"""Test model store"""
+
+import importlib.util
+import pytest
+
+from bgremover.app.core.model_store import ModelStore
+
+
+@pytest.fixture
+def model_store(tmp_path):
+    """Create model store in temp directory"""
+    return ModelStore(tmp_path / "models")
+
+
+def test_int8_variant_is_registered():
+    """Test the INT8 variant is built from u2net"""
+    info = ModelStore.MODELS["u2net_int8"]
+    
+    assert info["source"] == "u2net"
+    assert info["quantization"] == "dynamic_int8"
+    assert "url" not in info
+
+
+def test_built_model_verifies_against_recorded_checksum(model_store):
+    """Test locally built models are checked against the recorded checksum"""
+    model_path = model_store.models_dir / ModelStore.MODELS["u2net_int8"]["filename"]
+    model_path.write_bytes(b"quantized")
+    
+    # Not built by the store, so nothing to verify against
+    assert not model_store.verify_model("u2net_int8")
+    
+    model_store.verified_checksums["u2net_int8"] = model_store._calculate_sha256(model_path)
+    assert model_store.verify_model("u2net_int8")
+    
+    # Recorded checksums survive a restart
+    assert ModelStore(model_store.models_dir).verify_model("u2net_int8")
+    
+    model_path.write_bytes(b"tampered")
+    assert not model_store.verify_model("u2net_int8")
+
+
+def test_unchanged_model_is_not_hashed_again(model_store, monkeypatch):
+    """Test a verified file is only hashed again once it changes"""
+    model_path = model_store.models_dir / ModelStore.MODELS["u2net_int8"]["filename"]
+    model_path.write_bytes(b"quantized")
+    model_store.verified_checksums["u2net_int8"] = model_store._calculate_sha256(model_path)
+    assert model_store.verify_model("u2net_int8")
+    
+    hashed = []
+    calculate_hash = ModelStore._calculate_hash
+    monkeypatch.setattr(
+        ModelStore,
+        "_calculate_hash",
+        lambda self, path, algorithm: hashed.append(path) or calculate_hash(self, path, algorithm)
+    )
+    
+    assert ModelStore(model_store.models_dir).verify_model("u2net_int8")
+    assert model_store.verify_model("u2net_int8")
+    assert hashed == []
+    
+    model_path.write_bytes(b"requantized")
+    assert not model_store.verify_model("u2net_int8")
+    assert hashed == [model_path]
+
+
+def test_built_model_is_not_downloaded(model_store):
+    """Test download_model refuses locally built models"""
+    assert not model_store.download_model("u2net_int8")
+
+
+def test_register_local_model(model_store, tmp_path):
+    """Test models can be registered from local files"""
+    model_path = tmp_path / "custom.onnx"
+    model_path.write_bytes(b"custom model")
+    
+    assert model_store.register_local("custom", model_path)
+    assert model_store.get_model_path("custom") == model_path.resolve()
+    assert model_store.MODELS["custom"]["family"] == "u2net"
+    
+    # Registrations survive a restart, without touching the class table
+    assert "custom" not in ModelStore.MODELS
+    assert ModelStore(model_store.models_dir).verify_model("custom")
+    
+    model_path.write_bytes(b"changed")
+    assert model_store.get_model_path("custom") is None
+
+
+def test_register_local_rejects_builtin_names(model_store, tmp_path):
+    """Test registering cannot replace built-in models"""
+    model_path = tmp_path / "u2net.onnx"
+    model_path.write_bytes(b"not u2net")
+    
+    assert not model_store.register_local("u2net", model_path)
+    assert not model_store.register_local("missing", tmp_path / "missing.onnx")
+
+
+def test_quantize_requires_registered_variant(model_store):
+    """Test quantize only builds registered variants"""
+    assert model_store.quantize("u2netp") is None
+
+
+@pytest.mark.skipif(importlib.util.find_spec("onnx") is None, reason="onnx not installed")
+def test_quantize_writes_verified_model(model_store, tmp_path):
+    """Test quantizing a small fp32 model"""
+    import numpy as np
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+    
+    weights = numpy_helper.from_array(np.random.rand(4, 3, 3, 3).astype(np.float32), "w")
+    graph = helper.make_graph(
+        [helper.make_node("Conv", ["x", "w"], ["y"], pads=[1, 1, 1, 1])],
+        "conv",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [1, 3, 8, 8])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [1, 4, 8, 8])],
+        initializer=[weights]
+    )
+    source_path = model_store.models_dir / ModelStore.MODELS["u2net"]["filename"]
+    onnx.save(helper.make_model(graph, ir_version=8, opset_imports=[helper.make_opsetid("", 13)]), str(source_path))
+    
+    # Stand in for the verified download
+    model_store._record_checksum("u2net", source_path, ModelStore.MODELS["u2net"]["sha256"])
+    
+    model_path = model_store.quantize("u2net")
+    
+    assert model_path is not None and model_path.exists()
+    assert not model_path.with_name(model_path.name + ".tmp").exists()
+    assert model_store.verify_model("u2net_int8")
+
+
+@pytest.mark.skipif(importlib.util.find_spec("onnx") is None, reason="onnx not installed")
+def test_optimized_artifact_is_cached_and_rebuilt(model_store, tmp_path):
+    """Test the optimized model is built once and replaced when the model changes"""
+    import numpy as np
+    from onnx import TensorProto, helper, numpy_helper, save
+    
+    def save_model(path, scale):
+        weights = numpy_helper.from_array(np.full((1, 4), scale, dtype=np.float32), "w")
+        graph = helper.make_graph(
+            [
+                helper.make_node("Identity", ["x"], ["x1"]),
+                helper.make_node("Mul", ["x1", "w"], ["y"])
+            ],
+            "mul",
+            [helper.make_tensor_value_info("x", TensorProto.FLOAT, [1, 4])],
+            [helper.make_tensor_value_info("y", TensorProto.FLOAT, [1, 4])],
+            initializer=[weights]
+        )
+        save(helper.make_model(graph, ir_version=8, opset_imports=[helper.make_opsetid("", 13)]), str(path))
+    
+    model_path = tmp_path / "small.onnx"
+    save_model(model_path, 2.0)
+    assert model_store.register_local("small", model_path)
+    
+    artifact_path = model_store.get_optimized_model_path("small")
+    assert artifact_path is not None and artifact_path.exists()
+    assert model_store.get_optimized_model_path("small") == artifact_path
+    
+    # A new model file gets a new artifact, and the stale one is removed
+    save_model(model_path, 3.0)
+    assert model_store.register_local("small", model_path)
+    
+    rebuilt_path = model_store.get_optimized_model_path("small")
+    assert rebuilt_path is not None and rebuilt_path != artifact_path
+    assert rebuilt_path.exists()
+    assert not artifact_path.exists()
@@ -5,10 +5,20 @@ from pathlib import Path
 from PIL import Image
 import numpy as np
 
-from bgremover.app.core.pipeline import BackgroundRemovalPipeline
+from bgremover.app.core import pipeline as pipeline_module
+from bgremover.app.core.pipeline import BackgroundRemovalPipeline, get_pipeline
+from bgremover.app.core.model_store import get_model_store
+from bgremover.app.core.render_plan import RenderPlan
 from bgremover.app.core.settings import OutputSettings, QualitySettings
 
 
+@pytest.fixture
+def model_available():
+    """Skip unless the default model is downloaded and verified"""
+    if not get_model_store().verify_model("u2net"):
+        pytest.skip("Model not available")
+
+
 @pytest.fixture
 def test_image(tmp_path):
     """Create a test image"""
@@ -146,3 +156,198 @@ def test_canvas_resize(test_image, tmp_path):
             assert img.size == (200, 200)
     except Exception:
         pytest.skip("Model not available")
+
+
+def test_process_batch(model_available, test_image, output_settings, quality_settings, tmp_path):
+    """Test batched processing"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    input_paths = [test_image, test_image, test_image]
+    output_paths = [tmp_path / f"batch_{i}.png" for i in range(3)]
+    
+    results = pipeline.process_batch(
+        input_paths,
+        output_paths,
+        output_settings,
+        quality_settings,
+        batch_size=2
+    )
+    
+    assert results == [True, True, True]
+    for output_path in output_paths:
+        assert output_path.exists()
+        assert Image.open(output_path).mode == "RGBA"
+
+
+def test_process_batch_length_mismatch(test_image, output_settings, quality_settings, tmp_path):
+    """Test batched processing rejects mismatched path lists"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    with pytest.raises(ValueError):
+        pipeline.process_batch(
+            [test_image, test_image],
+            [tmp_path / "only_one.png"],
+            output_settings,
+            quality_settings
+        )
+
+
+def test_render_from_mask(output_settings, quality_settings):
+    """Test rendering from a precomputed mask"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    image = Image.new('RGB', (100, 100), color='red')
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[20:80, 20:80] = 255
+    
+    result = pipeline.render(image, mask, output_settings, quality_settings)
+    
+    assert result.mode == "RGBA"
+    assert result.size == (100, 100)
+    assert result.getpixel((50, 50))[3] == 255
+    assert result.getpixel((5, 5))[3] == 0
+
+
+def test_render_guided_matting(output_settings):
+    """Test guided matting keeps the image's colors under a soft alpha"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    image = Image.new('RGB', (100, 100), color='red')
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[20:80, 20:80] = 255
+    
+    result = pipeline.render(
+        image,
+        mask,
+        output_settings,
+        QualitySettings(alpha_matting=True, matting_mode="guided", smooth_edges=False)
+    )
+    
+    assert result.mode == "RGBA"
+    assert result.getpixel((50, 50)) == (255, 0, 0, 255)
+    assert result.getpixel((5, 5))[3] == 0
+
+
+def test_first_matting_latency_recorded_apart(output_settings):
+    """Test the first image of a matting method is timed apart from the rest"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    image = Image.new('RGB', (100, 100), color='red')
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[20:80, 20:80] = 255
+    quality_settings = QualitySettings(alpha_matting=True, matting_mode="guided")
+    
+    assert pipeline.matting_first_seconds == {}
+    pipeline.render(image, mask, output_settings, QualitySettings())
+    assert pipeline.matting_first_seconds == {}
+    
+    pipeline.render(image, mask, output_settings, quality_settings)
+    first = pipeline.matting_first_seconds["guided matting"]
+    pipeline.render(image, mask, output_settings, quality_settings)
+    
+    # Guided matting is kept apart from closed-form alpha matting
+    assert list(pipeline.matting_first_seconds) == ["guided matting"]
+    assert pipeline.matting_first_seconds["guided matting"] == first
+    assert pipeline._matting_images == {"guided matting": 1}
+    pipeline.log_latency_summary()
+
+
+def test_render_same_mask_multiple_settings(quality_settings):
+    """Test one mask feeding several renders"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    image = Image.new('RGB', (100, 100), color='red')
+    mask = np.full((100, 100), 255, dtype=np.uint8)
+    
+    colored = pipeline.render(
+        image,
+        mask,
+        OutputSettings(background_type="color", background_color="#0000FF"),
+        quality_settings
+    )
+    resized = pipeline.render(
+        image,
+        mask,
+        OutputSettings(canvas_width=200, canvas_height=150),
+        quality_settings
+    )
+    
+    assert colored.mode == "RGB"
+    assert resized.size == (200, 150)
+    assert image.mode == "RGB"
+
+
+def test_render_mask_size_mismatch(output_settings, quality_settings):
+    """Test rendering rejects a mask of the wrong size"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    image = Image.new('RGB', (100, 100), color='red')
+    mask = np.zeros((50, 50), dtype=np.uint8)
+    
+    with pytest.raises(ValueError):
+        pipeline.render(image, mask, output_settings, quality_settings)
+
+
+def test_pipeline_ready_without_warmup():
+    """Test readiness reflects model initialization"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    # Readiness never blocks once construction has returned
+    assert pipeline.wait_ready(timeout=0) == (pipeline.session is not None)
+    assert pipeline.is_ready() == (pipeline.session is not None)
+
+
+def test_pipeline_warmup_records_cold_start():
+    """Test warm-up inference is recorded as the cold start"""
+    pipeline = BackgroundRemovalPipeline(warmup=True)
+    
+    if pipeline.session is None:
+        assert pipeline.warmup() is None
+        pytest.skip("Model not available")
+    
+    assert pipeline.is_ready()
+    assert pipeline.cold_start_seconds is not None
+    assert pipeline.steady_state_latency() is None
+    
+    pipeline.predict_mask(Image.new('RGB', (64, 64), color='red'))
+    assert pipeline.steady_state_latency() is not None
+
+
+def test_render_with_compiled_plan(quality_settings):
+    """Test rendering from a plan compiled once matches compiling per image"""
+    pipeline = BackgroundRemovalPipeline()
+    
+    image = Image.new('RGB', (100, 100), color='red')
+    mask = np.zeros((100, 100), dtype=np.uint8)
+    mask[20:80, 20:80] = 255
+    output_settings = OutputSettings(format="jpg", canvas_width=120, canvas_height=120)
+    plan = RenderPlan.compile(output_settings, quality_settings)
+    
+    planned = pipeline.render(image, mask, output_settings, quality_settings, plan=plan)
+    direct = pipeline.render(image, mask, output_settings, quality_settings)
+    
+    assert planned.mode == "RGB"
+    assert np.array_equal(np.asarray(planned), np.asarray(direct))
+
+
+def test_get_pipeline_cache_choice(tmp_path, monkeypatch):
+    """Test the shared pipeline opens only the mask cache it is asked for"""
+    class FakePipeline:
+        def __init__(self, model_name, mask_cache=None, warmup=False):
+            self.model_name = model_name
+            self.mask_cache = mask_cache
+    
+    def no_default_cache():
+        raise AssertionError("default mask cache opened")
+    
+    monkeypatch.setattr(pipeline_module, "BackgroundRemovalPipeline", FakePipeline)
+    monkeypatch.setattr(pipeline_module, "get_mask_cache", no_default_cache)
+    monkeypatch.setattr(pipeline_module, "_pipeline_instance", None)
+    
+    pipeline = get_pipeline("u2net", cache_dir=None)
+    assert pipeline.mask_cache is None
+    
+    # Same model, other cache: the instance is kept and its cache replaced
+    assert get_pipeline("u2net", cache_dir=tmp_path / "cache") is pipeline
+    assert pipeline.mask_cache.cache_dir == tmp_path / "cache"
+    assert get_pipeline("u2net", cache_dir=tmp_path / "cache").mask_cache is pipeline.mask_cache
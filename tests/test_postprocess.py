@@ -0,0 +1,252 @@
+"""Test fused post-processing"""
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from bgremover.app.core.image_ops import ImageOperations
+from bgremover.app.core.postprocess import PostProcessor, STRIP_ROWS
+from bgremover.app.core.buffer_pool import BufferPool
+from bgremover.app.core.render_plan import RenderPlan
+from bgremover.app.core.settings import OutputSettings, QualitySettings
+
+
+@pytest.fixture
+def sample():
+    """Create a noisy image taller than one strip and a soft mask"""
+    rng = np.random.default_rng(0)
+    height, width = STRIP_ROWS + 37, 120
+    image = Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8))
+    
+    mask = np.zeros((height, width), dtype=np.uint8)
+    mask[40:-40, 20:-20] = 255
+    mask[30:40, 20:-20] = np.linspace(0, 255, 10, dtype=np.uint8)[:, None]
+    return image, mask
+
+
+def reference_cutout(image, mask):
+    """rembg's naive cutout"""
+    empty = Image.new("RGBA", image.size, 0)
+    return Image.composite(image, empty, Image.fromarray(mask))
+
+
+def test_to_buffer_matches_image(sample):
+    """Test the buffer holds the image's pixels with opaque alpha"""
+    image, _ = sample
+    buffer = PostProcessor.to_buffer(image)
+    
+    assert buffer.shape == (image.height, image.width, 4)
+    assert np.array_equal(buffer, np.asarray(image.convert("RGBA")))
+
+
+def test_cutout_matches_naive_cutout(sample):
+    """Test the in-place cutout equals rembg's composite"""
+    image, mask = sample
+    buffer = PostProcessor.to_buffer(image)
+    PostProcessor.cutout(buffer, mask)
+    
+    assert np.array_equal(buffer, np.asarray(reference_cutout(image, mask)))
+
+
+def test_color_background_matches_paste(sample):
+    """Test compositing over a color matches PIL's paste"""
+    image, mask = sample
+    cutout = reference_cutout(image, mask)
+    reference = Image.new("RGB", image.size, (10, 200, 30))
+    reference.paste(cutout, (0, 0), cutout)
+    
+    buffer = PostProcessor.to_buffer(image)
+    result = PostProcessor().run(
+        buffer,
+        OutputSettings(background_type="color", background_color="#0AC81E"),
+        QualitySettings(remove_small_objects=False, smooth_edges=False),
+        mask=mask
+    )
+    
+    assert result.mode == "RGB"
+    difference = np.abs(np.asarray(result).astype(int) - np.asarray(reference).astype(int))
+    assert difference.max() <= 1
+
+
+def test_image_background_matches_alpha_composite(sample, tmp_path):
+    """Test compositing over an image matches PIL's alpha_composite"""
+    image, mask = sample
+    background = Image.new("RGB", (60, 50), (40, 80, 160))
+    background_path = tmp_path / "background.png"
+    background.save(background_path)
+    
+    reference = Image.alpha_composite(
+        background.resize(image.size, Image.Resampling.LANCZOS).convert("RGBA"),
+        reference_cutout(image, mask)
+    )
+    
+    buffer = PostProcessor.to_buffer(image)
+    result = PostProcessor().run(
+        buffer,
+        OutputSettings(background_type="image", background_image=str(background_path)),
+        QualitySettings(remove_small_objects=False, smooth_edges=False),
+        mask=mask
+    )
+    
+    assert result.mode == "RGBA"
+    difference = np.abs(np.asarray(result).astype(int) - np.asarray(reference).astype(int))
+    assert difference.max() <= 1
+
+
+def test_feather_matches_apply_feather(sample):
+    """Test feathering the buffer matches ImageOperations.apply_feather"""
+    image, mask = sample
+    cutout = reference_cutout(image, mask)
+    reference = ImageOperations.apply_feather(cutout, cutout.getchannel("A"), 4)
+    
+    buffer = PostProcessor.to_buffer(image)
+    PostProcessor.cutout(buffer, mask)
+    PostProcessor.feather(buffer, 4)
+    
+    assert np.array_equal(buffer, np.asarray(reference))
+
+
+def test_noop_stages_are_skipped(sample):
+    """Test refinement is not run when the settings make it a no-op"""
+    image, mask = sample
+    calls = []
+    
+    def refine(alpha):
+        calls.append(alpha)
+        return alpha
+    
+    PostProcessor().run(
+        PostProcessor.to_buffer(image),
+        OutputSettings(),
+        QualitySettings(min_object_size=0, edge_smooth_kernel=1),
+        mask=mask,
+        refine=refine
+    )
+    assert calls == []
+    
+    PostProcessor().run(PostProcessor.to_buffer(image), OutputSettings(), QualitySettings(), mask=mask, refine=refine)
+    assert len(calls) == 1
+
+
+def test_result_shares_buffer(sample):
+    """Test a transparent result is the buffer itself, not a copy"""
+    image, mask = sample
+    buffer = PostProcessor.to_buffer(image)
+    result = PostProcessor().run(
+        buffer,
+        OutputSettings(),
+        QualitySettings(remove_small_objects=False, smooth_edges=False),
+        mask=mask
+    )
+    
+    buffer[0, 0] = (1, 2, 3, 4)
+    assert result.getpixel((0, 0)) == (1, 2, 3, 4)
+
+
+def test_translucent_image_background(sample, tmp_path):
+    """Test a background with its own alpha is composited like alpha_composite"""
+    image, mask = sample
+    background = Image.new("RGBA", (image.width, image.height), (200, 20, 90, 128))
+    
+    reference = Image.alpha_composite(background, reference_cutout(image, mask))
+    
+    buffer = PostProcessor.to_buffer(image)
+    PostProcessor.cutout(buffer, mask)
+    PostProcessor.blend_image(buffer, background)
+    
+    difference = np.abs(buffer.astype(int) - np.asarray(reference).astype(int))
+    assert difference.max() <= 1
+
+
+def test_jpeg_output_is_composited_once(sample):
+    """Test transparent JPEG output comes out of the render already on white"""
+    image, mask = sample
+    cutout = reference_cutout(image, mask)
+    reference = Image.new("RGB", image.size, (255, 255, 255))
+    reference.paste(cutout, (0, 0), cutout)
+    
+    result = PostProcessor().run(
+        PostProcessor.to_buffer(image),
+        OutputSettings(format="jpg"),
+        QualitySettings(remove_small_objects=False, smooth_edges=False),
+        mask=mask
+    )
+    
+    assert result.mode == "RGB"
+    difference = np.abs(np.asarray(result).astype(int) - np.asarray(reference).astype(int))
+    assert difference.max() <= 1
+
+
+
+def test_auto_crop_to_content(sample):
+    """Test the optional crop stage trims transparent borders before the background"""
+    image, mask = sample
+    
+    result = PostProcessor().run(
+        PostProcessor.to_buffer(image),
+        OutputSettings(auto_crop=True, background_type="color", background_color="#000000"),
+        QualitySettings(remove_small_objects=False, smooth_edges=False),
+        mask=mask
+    )
+    
+    # The ramp's first row is fully transparent
+    assert result.size == (image.width - 40, image.height - 71)
+    assert result.mode == "RGB"
+
+
+def test_canvas_on_color_matches_full_composite(sample):
+    """Test compositing only the resampled object matches compositing the whole image first"""
+    image, mask = sample
+    settings = OutputSettings(background_type="color", background_color="#204060", canvas_width=100, canvas_height=100)
+    quality = QualitySettings(remove_small_objects=False, smooth_edges=False)
+    
+    result = PostProcessor().run(PostProcessor.to_buffer(image), settings, quality, mask=mask)
+    
+    flat = Image.new("RGB", image.size, (32, 64, 96))
+    cutout = reference_cutout(image, mask)
+    flat.paste(cutout, (0, 0), cutout)
+    reference = ImageOperations.resize_with_padding(flat, (100, 100), bg_color=(32, 64, 96, 255))
+    
+    assert result.mode == "RGB"
+    # The orders differ only where Lanczos overshoot is clipped
+    difference = np.abs(np.asarray(result).astype(int) - np.asarray(reference).astype(int))
+    assert difference.mean() < 0.5
+
+
+def test_gradient_background(sample):
+    """Test a gradient background shows through transparent pixels"""
+    image, mask = sample
+    
+    result = PostProcessor().run(
+        PostProcessor.to_buffer(image),
+        OutputSettings(background_type="gradient", background_color="#000000", gradient_color="#FF0000"),
+        QualitySettings(remove_small_objects=False, smooth_edges=False),
+        mask=mask
+    )
+    
+    assert result.mode == "RGB"
+    assert result.getpixel((5, 0)) == (0, 0, 0)
+    assert result.getpixel((5, image.height - 1)) == (255, 0, 0)
+    assert result.getpixel((60, 100)) == image.getpixel((60, 100))
+
+
+def test_leased_buffers_reused(sample):
+    """Test rendering through a lease matches plain rendering and reuses its arrays"""
+    image, mask = sample
+    mask = mask.copy()
+    mask[:, :30] = 0
+    plan = RenderPlan.compile(OutputSettings(auto_crop=True), QualitySettings())
+    
+    def refine(alpha):
+        return ImageOperations.refine_mask_morphology(alpha, kernel_size=3, out=alpha)
+    
+    expected = PostProcessor().execute(PostProcessor.to_buffer(image), plan, mask, refine)
+    
+    pool = BufferPool(max_mb=16)
+    for _ in range(2):
+        with pool.lease() as lease:
+            result = PostProcessor().execute(PostProcessor.to_buffer(image, lease), plan, mask, refine, lease)
+            assert np.array_equal(np.asarray(result), np.asarray(expected))
+    
+    # Buffer, alpha scratch and cropped buffer
+    assert (pool.allocations, pool.reuses) == (3, 3)
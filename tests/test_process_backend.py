@@ -0,0 +1,44 @@
+"""Test process pool backend"""
+
+import pytest
+
+from bgremover.app.core import process_backend
+from bgremover.app.core.process_backend import ProcessPoolBackend
+from bgremover.app.core.settings import OutputSettings, QualitySettings
+
+
+def test_process_batch_length_mismatch(tmp_path):
+    """Test batched processing rejects mismatched path lists"""
+    backend = ProcessPoolBackend(max_workers=1)
+    try:
+        with pytest.raises(ValueError):
+            backend.process_batch(
+                [tmp_path / "a.png", tmp_path / "b.png"],
+                [tmp_path / "out.png"],
+                OutputSettings(),
+                QualitySettings()
+            )
+    finally:
+        backend.shutdown()
+
+
+def test_model_prepared_on_first_batch(tmp_path, monkeypatch):
+    """Test constructing the backend neither prepares the model nor starts workers"""
+    prepared = []
+    
+    class FakeStore:
+        def get_optimized_model_path(self, model_name):
+            prepared.append(model_name)
+            raise RuntimeError("model unavailable")
+    
+    monkeypatch.setattr(process_backend, "get_model_store", FakeStore)
+    
+    backend = ProcessPoolBackend(max_workers=1, model_name="u2netp")
+    assert prepared == []
+    
+    with pytest.raises(RuntimeError):
+        backend.process_batch([tmp_path / "a.png"], [tmp_path / "out.png"], OutputSettings(), QualitySettings())
+    assert prepared == ["u2netp"]
+    
+    # Nothing was started, so there is nothing to stop
+    backend.shutdown()
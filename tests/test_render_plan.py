@@ -0,0 +1,117 @@
+"""Test render plan compilation"""
+
+import pickle
+
+import numpy as np
+from PIL import Image
+
+from bgremover.app.core.render_plan import RenderPlan
+from bgremover.app.core.postprocess import PostProcessor
+from bgremover.app.core.settings import OutputSettings, QualitySettings
+
+
+def test_default_stages():
+    """Test the default settings cut out, refine and encode"""
+    plan = RenderPlan.compile(OutputSettings(), QualitySettings())
+    
+    assert plan.stage_names == ("cutout", "refine", "encode_png")
+    assert plan.background is None
+    assert plan.canvas_size is None
+    assert plan.smooth_kernel.shape == (5, 5)
+
+
+def test_colors_and_canvas_resolved_once():
+    """Test colors and the canvas are resolved at compile time"""
+    plan = RenderPlan.compile(
+        OutputSettings(background_type="color", background_color="#102030", canvas_width=64, canvas_height=48),
+        QualitySettings(remove_small_objects=False, smooth_edges=False)
+    )
+    
+    assert plan.background_color == (16, 32, 48)
+    assert plan.canvas_color == (16, 32, 48, 255)
+    assert plan.canvas_size == (64, 48)
+    # The canvas composites the color; no separate background stage
+    assert plan.stage_names == ("cutout", "canvas", "encode_png")
+
+
+def test_canvas_filled_once():
+    """Test every image is padded onto a copy of the plan's canvas"""
+    plan = RenderPlan.compile(OutputSettings(canvas_width=64, canvas_height=48, margin=4), QualitySettings())
+    buffer = np.full((20, 30, 4), (200, 10, 10, 255), dtype=np.uint8)
+    
+    first = PostProcessor().execute(buffer.copy(), plan)
+    second = PostProcessor().execute(buffer.copy(), plan)
+    
+    assert plan.canvas_template.size == (64, 48)
+    assert plan.canvas_template.mode == "RGBA"
+    assert first is not plan.canvas_template
+    assert np.array_equal(np.asarray(first), np.asarray(second))
+    # The template itself is never drawn on
+    assert np.asarray(plan.canvas_template).max() == 255
+    assert np.asarray(plan.canvas_template)[..., 3].max() == 0
+
+
+def test_transparent_jpeg_renders_on_white():
+    """Test JPEG output without a background gets a white one"""
+    plan = RenderPlan.compile(OutputSettings(format="jpg"), QualitySettings(alpha_matting=True, matting_mode="guided"))
+    
+    assert plan.background_color == (255, 255, 255)
+    assert plan.stage_names == ("guided_matting", "refine", "background_color", "encode_jpg")
+
+
+def test_plan_unaffected_by_later_changes():
+    """Test changing the settings after compiling does not change the plan"""
+    output_settings = OutputSettings(feather_edges=3)
+    plan = RenderPlan.compile(output_settings, QualitySettings())
+    
+    output_settings.feather_edges = 0
+    
+    assert plan.feather_radius == 3
+    assert plan.output_settings.feather_edges == 3
+
+
+def test_pickle_recompiles():
+    """Test pickling sends the settings and rebuilds the rest"""
+    plan = RenderPlan.compile(OutputSettings(canvas_width=2000, canvas_height=2000), QualitySettings())
+    
+    data = pickle.dumps(plan)
+    restored = pickle.loads(data)
+    
+    assert b"numpy" not in data
+    assert restored.stages == plan.stages
+    assert np.array_equal(restored.smooth_kernel, plan.smooth_kernel)
+    assert restored.canvas_template.size == plan.canvas_template.size
+
+
+def test_explain_lists_every_stage():
+    """Test the explanation covers every stage with a cost"""
+    plan = RenderPlan.compile(
+        OutputSettings(format="webp", feather_edges=2, canvas_width=100, canvas_height=100),
+        QualitySettings(refine_mode="proxy")
+    )
+    
+    text = plan.explain(4.0)
+    
+    for name in plan.stage_names:
+        assert name in text
+    assert [name for name, _ in plan.estimate_ms(4.0)] == list(plan.stage_names)
+    assert all(ms > 0 for _, ms in plan.estimate_ms(4.0))
+
+
+def test_execute_matches_run():
+    """Test executing a compiled plan gives the same image as run()"""
+    rng = np.random.default_rng(0)
+    image = Image.fromarray(rng.integers(0, 256, (80, 60, 3), dtype=np.uint8))
+    mask = np.zeros((80, 60), dtype=np.uint8)
+    mask[20:60, 10:50] = 255
+    output_settings = OutputSettings(background_type="color", background_color="#00FF00", canvas_width=50, canvas_height=50)
+    quality_settings = QualitySettings(remove_small_objects=False, smooth_edges=False)
+    
+    processor = PostProcessor()
+    plan = RenderPlan.compile(output_settings, quality_settings)
+    planned = processor.execute(PostProcessor.to_buffer(image), plan, mask=mask)
+    direct = processor.run(PostProcessor.to_buffer(image), output_settings, quality_settings, mask=mask)
+    
+    assert planned.mode == direct.mode == "RGB"
+    assert np.array_equal(np.asarray(planned), np.asarray(direct))
+    assert planned.getpixel((0, 0)) == (0, 255, 0)
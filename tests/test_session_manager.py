@@ -0,0 +1,231 @@
+"""Test session manager"""
+
+import threading
+import time
+import pytest
+
+from bgremover.app.core import session_manager as session_manager_module
+from bgremover.app.core.session_manager import SessionManager, compute_thread_layout
+from bgremover.app.core.settings import Settings
+
+
+class CountingSessionManager(SessionManager):
+    """Session manager that builds placeholder sessions slowly"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.created = []
+    
+    def _create_session(self, model_name: str, model_path=None, family="u2net"):
+        time.sleep(0.05)
+        self.created.append(model_name)
+        return object()
+
+
+def test_layout_splits_budget():
+    """Test the budget is shared between workers"""
+    layout = compute_thread_layout(16, 4)
+    
+    assert layout.budget == 16
+    assert layout.workers == 4
+    assert layout.intra_op_threads == 4
+    assert layout.inter_op_threads == 1
+    assert layout.opencv_threads == 4
+    assert layout.workers * layout.intra_op_threads <= layout.budget
+
+
+def test_layout_defaults_and_minimums():
+    """Test automatic budget and at least one thread per worker"""
+    assert compute_thread_layout(0, 1).budget >= 1
+    assert compute_thread_layout(2, 8).intra_op_threads == 1
+    assert compute_thread_layout(8, 0).workers == 1
+
+
+def test_default_gui_settings_give_inference_the_whole_budget():
+    """Test the thread backend's single infer stage gets every thread, not a share per worker"""
+    settings = Settings()
+    layout = compute_thread_layout(settings.thread_budget, settings.inference_workers())
+    
+    assert settings.backend == "thread" and settings.max_workers > 1
+    assert layout.workers == 1
+    assert layout.intra_op_threads == layout.budget
+
+
+def test_process_backend_splits_budget_between_processes():
+    """Test each worker process gets its share of the budget"""
+    settings = Settings(backend="process", max_workers=4, thread_budget=16)
+    layout = compute_thread_layout(settings.thread_budget, settings.inference_workers())
+    
+    assert layout.workers == 4
+    assert layout.intra_op_threads == 4
+
+
+def test_concurrent_get_session_builds_once():
+    """Test racing callers share a single session"""
+    manager = CountingSessionManager(thread_budget=4, workers=2)
+    sessions = []
+    
+    threads = [
+        threading.Thread(target=lambda: sessions.append(manager.get_session("u2net")))
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert manager.created == ["u2net"]
+    assert len(sessions) == 8
+    assert all(session is sessions[0] for session in sessions)
+
+
+def test_sessions_per_model():
+    """Test each model gets its own session"""
+    manager = CountingSessionManager()
+    
+    assert manager.get_session("u2net") is not manager.get_session("u2netp")
+    assert sorted(manager.created) == ["u2net", "u2netp"]
+
+
+@pytest.fixture
+def fake_memory(monkeypatch):
+    """Make every session build grow resident memory by 100 MB"""
+    resident = [1000.0]
+    
+    def resident_memory_mb():
+        return resident[0]
+    
+    monkeypatch.setattr(session_manager_module, "resident_memory_mb", resident_memory_mb)
+    monkeypatch.setattr(SessionManager, "_peak_memory_mb", staticmethod(lambda model_name: None))
+    
+    original = CountingSessionManager._create_session
+    
+    def create_session(self, model_name, model_path=None, family="u2net"):
+        resident[0] += 100.0
+        return original(self, model_name, model_path, family)
+    
+    monkeypatch.setattr(CountingSessionManager, "_create_session", create_session)
+    return resident
+
+
+def test_session_sizes_are_measured(fake_memory):
+    """Test each session's size is the memory its creation allocated"""
+    manager = CountingSessionManager()
+    manager.get_session("u2net")
+    
+    with manager.track_memory("u2net"):
+        fake_memory[0] += 50.0
+    
+    assert manager.cached_memory_mb() == 150.0
+
+
+def test_least_recently_used_session_is_evicted(fake_memory):
+    """Test sessions over the memory budget are dropped in LRU order"""
+    manager = CountingSessionManager(memory_budget_mb=250)
+    
+    first = manager.get_session("u2net")
+    manager.get_session("u2netp")
+    assert manager.get_session("u2net") is first
+    
+    # u2netp is now the least recently used
+    manager.get_session("silueta")
+    assert manager.evictions == 1
+    assert manager.get_session("u2net") is first
+    assert manager.hits == 2
+    
+    manager.get_session("u2netp")
+    assert manager.created == ["u2net", "u2netp", "silueta", "u2netp"]
+    assert manager.misses == 4
+    assert manager.cached_memory_mb() <= 250
+
+
+class FakeSession:
+    """Session stand-in that, unlike object(), can be weakly referenced"""
+
+
+def test_evicted_session_counted_once_released(fake_memory, monkeypatch):
+    """Test a session a pipeline still holds is not counted as evicted"""
+    def create_session(self, model_name, model_path=None, family="u2net"):
+        fake_memory[0] += 100.0
+        return FakeSession()
+    
+    monkeypatch.setattr(CountingSessionManager, "_create_session", create_session)
+    manager = CountingSessionManager(memory_budget_mb=150)
+    
+    held = manager.get_session("u2net")
+    manager.get_session("u2netp")
+    
+    # Dropped from the cache, but the pipeline's reference keeps it alive
+    assert manager.evictions == 0
+    assert manager.retired_memory_mb() == 100.0
+    
+    # Asking for it again reuses it instead of loading a second copy
+    assert manager.get_session("u2net") is held
+    assert manager.retired_memory_mb() == 0.0
+    
+    # u2netp was only held by the cache, so it is freed right away
+    assert manager.evictions == 1
+    
+    manager.get_session("u2netp")
+    del held
+    assert manager.evictions == 2
+    assert manager.retired_memory_mb() == 0.0
+
+
+def test_concurrent_builds_measured_apart(fake_memory):
+    """Test sessions built at the same time are each measured on their own"""
+    manager = CountingSessionManager()
+    
+    threads = [
+        threading.Thread(target=manager.get_session, args=(model_name,))
+        for model_name in ("u2net", "u2netp", "silueta")
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # Each build's 100 MB is counted once, not also towards the builds overlapping it
+    assert sorted(manager.created) == ["silueta", "u2net", "u2netp"]
+    assert manager.cached_memory_mb() == 300.0
+    manager.set_memory_budget(250)
+    assert manager.cached_memory_mb() == 200.0
+
+
+def test_measured_peak_bounds_session_size(fake_memory, monkeypatch):
+    """Test memory other threads allocate cannot grow a session past the model's measured peak"""
+    monkeypatch.setattr(SessionManager, "_peak_memory_mb", staticmethod(lambda model_name: 120.0))
+    manager = CountingSessionManager()
+    manager.get_session("u2net")
+    
+    with manager.track_memory("u2net"):
+        fake_memory[0] += 500.0
+    
+    assert manager.cached_memory_mb() == 120.0
+
+
+def test_measured_peak_used_without_resident_memory(fake_memory, monkeypatch):
+    """Test the model's measured peak is the size when resident memory cannot be read"""
+    monkeypatch.setattr(session_manager_module, "resident_memory_mb", lambda: None)
+    monkeypatch.setattr(SessionManager, "_peak_memory_mb", staticmethod(lambda model_name: 700.0))
+    manager = CountingSessionManager()
+    manager.get_session("u2net")
+    
+    with manager.track_memory("u2net"):
+        pass
+    
+    assert manager.cached_memory_mb() == 700.0
+
+
+def test_lowering_budget_evicts(fake_memory):
+    """Test shrinking the budget keeps only the most recent session"""
+    manager = CountingSessionManager()
+    manager.get_session("u2net")
+    manager.get_session("u2netp")
+    
+    manager.set_memory_budget(50)
+    
+    assert manager.cached_memory_mb() == 100.0
+    assert manager.evictions == 1
+    assert manager.get_session("u2netp") is not None
+    assert manager.created == ["u2net", "u2netp"]
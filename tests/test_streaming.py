@@ -0,0 +1,129 @@
+"""Test staged streaming pipeline"""
+
+import threading
+import pytest
+from pathlib import Path
+from PIL import Image
+import numpy as np
+
+from bgremover.app.core.streaming import StagedPipeline, StageConfig
+from bgremover.app.core.buffer_pool import BufferPool
+from bgremover.app.core.settings import OutputSettings, QualitySettings
+
+
+class FakePipeline:
+    """Pipeline stand-in that predicts a centered square mask"""
+    
+    def __init__(self):
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+        self.buffer_pool = BufferPool()
+    
+    def load_image(self, input_path: Path) -> Image.Image:
+        return Image.open(input_path).convert("RGB")
+    
+    def cache_keys_for(self, images):
+        return [None] * len(images)
+    
+    def predict_masks(self, images, cache_keys=None):
+        with self.lock:
+            self.batch_sizes.append(len(images))
+        masks = []
+        for image in images:
+            mask = np.zeros((image.height, image.width), dtype=np.uint8)
+            mask[10:-10, 10:-10] = 255
+            masks.append(mask)
+        return masks
+    
+    def render(self, image, mask, output_settings, quality_settings, cache_key=None, plan=None, lease=None):
+        # Shares the leased buffer, as the real pipeline's RGBA output does
+        shape = (image.height, image.width, 4)
+        buffer = lease.empty(shape) if lease is not None else np.empty(shape, dtype=np.uint8)
+        buffer[:, :, :3] = np.asarray(image)
+        buffer[:, :, 3] = mask
+        return Image.fromarray(buffer)
+    
+    def save_image(self, image, output_path, output_settings):
+        image.save(output_path, "PNG")
+
+
+@pytest.fixture
+def input_paths(tmp_path):
+    """Create test images"""
+    paths = []
+    for i in range(10):
+        path = tmp_path / f"input_{i}.png"
+        Image.new('RGB', (50, 40), color=(i * 20, 0, 0)).save(path)
+        paths.append(path)
+    return paths
+
+
+def test_stream_processes_all_images(input_paths, tmp_path):
+    """Test every image goes through all stages"""
+    pipeline = FakePipeline()
+    staged = StagedPipeline(pipeline, StageConfig(decode_workers=3, postprocess_workers=2, encode_workers=2, queue_size=2))
+    output_paths = [tmp_path / f"output_{i}.png" for i in range(len(input_paths))]
+    
+    completed = []
+    results = staged.process_batch(
+        input_paths,
+        output_paths,
+        OutputSettings(),
+        QualitySettings(),
+        batch_size=4,
+        on_result=lambda index, success: completed.append((index, success))
+    )
+    
+    assert results == [True] * len(input_paths)
+    assert sorted(completed) == [(i, True) for i in range(len(input_paths))]
+    assert sum(pipeline.batch_sizes) == len(input_paths)
+    assert max(pipeline.batch_sizes) <= 4
+    for output_path in output_paths:
+        assert Image.open(output_path).mode == "RGBA"
+
+
+def test_stream_reports_failed_decode(input_paths, tmp_path):
+    """Test unreadable inputs fail without stopping the stream"""
+    input_paths[3].write_bytes(b"not an image")
+    staged = StagedPipeline(FakePipeline())
+    output_paths = [tmp_path / f"output_{i}.png" for i in range(len(input_paths))]
+    
+    results = staged.process_batch(input_paths, output_paths, OutputSettings(), QualitySettings())
+    
+    assert results[3] is False
+    assert results.count(True) == len(input_paths) - 1
+
+
+def test_stream_stops_when_cancelled(input_paths, tmp_path):
+    """Test should_stop halts decoding of remaining images"""
+    staged = StagedPipeline(FakePipeline(), StageConfig(decode_workers=1))
+    output_paths = [tmp_path / f"output_{i}.png" for i in range(len(input_paths))]
+    
+    started = []
+    results = staged.process_batch(
+        input_paths,
+        output_paths,
+        OutputSettings(),
+        QualitySettings(),
+        on_start=started.append,
+        should_stop=lambda: len(started) >= 3
+    )
+    
+    assert len(started) == 3
+    assert results.count(True) == 3
+
+
+def test_stream_returns_buffers_after_saving(input_paths, tmp_path):
+    """Test leased buffers are reused only once their image has been saved"""
+    pipeline = FakePipeline()
+    staged = StagedPipeline(pipeline, StageConfig(postprocess_workers=1, encode_workers=1, queue_size=1))
+    output_paths = [tmp_path / f"output_{i}.png" for i in range(len(input_paths))]
+    
+    results = staged.process_batch(input_paths, output_paths, OutputSettings(), QualitySettings(), batch_size=1)
+    
+    assert results == [True] * len(input_paths)
+    pool = pipeline.buffer_pool
+    assert pool.allocations + pool.reuses == len(input_paths)
+    assert pool.reuses > 0
+    for i, output_path in enumerate(output_paths):
+        assert Image.open(output_path).getpixel((25, 20)) == (i * 20, 0, 0, 255)